@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "medicine_search.settings")
 
 application = get_asgi_application()
+
+# load in-memory search indexes before the first request
+from search.engines import warm_engines  # noqa: E402
+
+warm_engines()
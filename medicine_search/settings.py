@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # outermost, so its total covers the whole request; removes itself when disabled
+    "search.metrics.SearchMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -84,9 +86,34 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', '12345'),
         'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
         'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        # keep connections open between requests instead of reconnecting every time
+        'CONN_MAX_AGE': int(os.getenv('POSTGRES_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas for search traffic: POSTGRES_REPLICA_HOSTS=host1,host2[:port] adds aliases
+# replica_0, replica_1, ... with the primary's credentials. Imports and other writes stay on "default".
+for _i, _host in enumerate(h.strip() for h in os.getenv('POSTGRES_REPLICA_HOSTS', '').split(',') if h.strip()):
+    _name, _, _port = _host.partition(':')
+    DATABASES[f'replica_{_i}'] = {
+        **DATABASES['default'],
+        'HOST': _name,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ["search.replicas.SearchReplicaRouter"]
+
+# Replica selection for the search views (search/replicas.py): round-robin over healthy aliases,
+# skipping ones that refuse connections or lag more than MAX_LAG seconds; primary as the fallback
+SEARCH_REPLICAS = {
+    "ALIASES": [alias for alias in DATABASES if alias.startswith('replica_')],
+    "MAX_LAG": float(os.getenv("SEARCH_REPLICA_MAX_LAG", "30")),
+    "CHECK_INTERVAL": 5.0,
+    "RETRY_AFTER": 30.0,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,3 +155,153 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Search engines
+# Backend per search mode: "database" runs the ORM query, "memory" answers from an
+# in-process index built at worker start and rebuilt when import_data bumps the catalog version.
+# "partitioned" reads the per-initial partitions of search_medicine_part (search/partitions.py).
+# "prepared" runs each mode's fixed SQL as a server-side prepared statement (search/prepared.py).
+SEARCH_ENGINES = {
+    # "memory" orders names by code point, the database by its collation: opt in where they agree
+    "prefix": os.getenv("SEARCH_PREFIX_ENGINE", "database"),
+    # trigram inverted index, same similarity() semantics as pg_trgm
+    "substring": os.getenv("SEARCH_SUBSTRING_ENGINE", "database"),
+    "fuzzy": os.getenv("SEARCH_FUZZY_ENGINE", "database"),
+    "fulltext": os.getenv("SEARCH_FULLTEXT_ENGINE", "database"),
+    # "fused" runs one top-K query per index and merges them; "database" is the single OR'ed query
+    "unified": os.getenv("SEARCH_UNIFIED_ENGINE", "fused"),
+}
+
+# Fused unified search: candidates fetched per index, and threads running them concurrently
+SEARCH_FUSION_CANDIDATES = 50
+SEARCH_FUSION_PARALLEL = True
+SEARCH_FUSION_WORKERS = 4
+
+# Partitioned engine: substring/fuzzy/fulltext run one query per FANOUT group of partitions, concurrently
+SEARCH_PARTITIONS = {
+    "FANOUT": int(os.getenv("SEARCH_PARTITION_FANOUT", "4")),
+    "PARALLEL": True,
+}
+
+# Typo correction (search/spelling.py): symmetric-delete dictionary over the catalog's words, rebuilt
+# by import_data. SEARCH_FUZZY_ENGINE=symspell serves fuzzy/ from it; DID_YOU_MEAN adds the
+# correction stage to fused unified search and the HTML page
+SEARCH_SPELLING = {
+    "MAX_DISTANCE": 2,
+    # only the first PREFIX_LENGTH characters of a word are expanded into deletes
+    "PREFIX_LENGTH": 7,
+    "DID_YOU_MEAN": os.getenv("SEARCH_DID_YOU_MEAN", "1") == "1",
+}
+
+# /api/search/fulltext/prefix: matches taken from the GIN index before ranking (name hits first), and
+# ts_rank_cd weights for the D, C, B, A labels (A = name, B = short_composition)
+SEARCH_PREFIX_FULLTEXT = {
+    "CANDIDATES": 500,
+    "WEIGHTS": [0.1, 0.2, 0.4, 1.0],
+}
+
+# Seconds a worker trusts its cached catalog version before re-reading it from the DB
+SEARCH_CATALOG_VERSION_TTL = 5
+
+# Memory-mapped catalog snapshot (manage.py export_snapshot / import_data --snapshot), shared by
+# all workers on a host; the in-memory prefix index maps it instead of loading from the DB when current
+SEARCH_SNAPSHOT_PATH = os.getenv("SEARCH_SNAPSHOT_PATH") or None
+
+# HTTP caching of search responses: ETag = catalog version + normalized params (304 on If-None-Match),
+# Cache-Control: public, max-age per mode ("html" is the search page)
+SEARCH_HTTP_CACHE = {
+    "ENABLED": os.getenv("SEARCH_HTTP_CACHE_ENABLED", "1") == "1",
+    "DEFAULT_MAX_AGE": int(os.getenv("SEARCH_HTTP_MAX_AGE", "60")),
+    "MAX_AGE": {
+        "autocomplete": 300,
+        "typeahead": 300,
+        "substitutes": 300,
+    },
+}
+
+# Identical concurrent cache misses wait (at most WAIT seconds) for one in-flight search instead of
+# each running the query; counts per mode in /api/metrics
+SEARCH_SINGLE_FLIGHT = {
+    "ENABLED": os.getenv("SEARCH_SINGLE_FLIGHT_ENABLED", "1") == "1",
+    "WAIT": float(os.getenv("SEARCH_SINGLE_FLIGHT_WAIT", "2")),
+}
+
+# Rows fetched per server-side cursor round trip (and per NDJSON chunk) for ?stream=1 and /search/export
+SEARCH_STREAM_CHUNK_SIZE = 2000
+
+# Search result cache: in-process LRU plus an optional shared tier (a CACHES alias, e.g. Redis).
+# Keys include the catalog version, so import_data invalidates everything at once.
+SEARCH_CACHE = {
+    "ENABLED": os.getenv("SEARCH_CACHE_ENABLED", "1") == "1",
+    "MAX_ENTRIES": 5000,
+    "SHARED_CACHE": os.getenv("SEARCH_SHARED_CACHE") or None,
+    # seconds per mode; results only change on re-import, which bumps the version anyway
+    "TTL": {
+        "prefix": 600,
+        "substring": 600,
+        "fulltext": 600,
+        "fulltext_prefix": 600,
+        "fuzzy": 300,
+        "phonetic": 300,
+        "unified": 300,
+        "html": 300,
+    },
+    "DEFAULT_TTL": 60,
+}
+
+# POST /api/search/batch: max items per request
+SEARCH_BATCH_MAX_ITEMS = 100
+
+# Async search views (/api/async/...): bounded psycopg 3 pool per ASGI worker
+SEARCH_ASYNC_POOL = {
+    "MIN_SIZE": int(os.getenv("SEARCH_POOL_MIN_SIZE", "2")),
+    "MAX_SIZE": int(os.getenv("SEARCH_POOL_MAX_SIZE", "10")),
+    # seconds a request waits for a free connection before answering 503
+    "TIMEOUT": float(os.getenv("SEARCH_POOL_TIMEOUT", "5")),
+    "MAX_IDLE": 300.0,
+    "STATEMENT_TIMEOUT_MS": int(os.getenv("SEARCH_STATEMENT_TIMEOUT_MS", "2000")),
+    "ALIAS": os.getenv("SEARCH_POOL_ALIAS", "default"),
+}
+
+# /api/search/autocomplete: top-K names per prefix, precomputed by `manage.py build_autocomplete`
+SEARCH_AUTOCOMPLETE = {
+    "MAX_PREFIX": 4,
+    "TOP_K": 10,
+    # score = available * w + (not discontinued) * w - shortness * len(name)
+    "WEIGHTS": {"available": 1.0, "not_discontinued": 1.0, "shortness": 0.01},
+}
+
+# /api/search/typeahead: candidate rows fetched per prefix, and prefixes kept per worker
+SEARCH_TYPEAHEAD = {
+    "CANDIDATES": 200,
+    "MAX_ENTRIES": 2000,
+}
+
+# Filters and facet counts (?facets=1) on the search endpoints
+SEARCH_FACETS = {
+    # price facet buckets: <0, 0-50, 50-100, ..., 1000+
+    "PRICE_BUCKETS": [0, 50, 100, 250, 500, 1000],
+    # most frequent manufacturer/type values returned
+    "MAX_VALUES": 20,
+    # fused unified / symspell fuzzy: facets count this many of the engine's ranked ids
+    "MAX_CANDIDATES": 1000,
+}
+
+# Unified search router (search/router.py): query shape -> plan, e.g. {"multiword": "fused"}.
+# Shapes: short, stopwords, numeric, long, multiword, word.
+# Plans: exact, prefix, fulltext, trigram, prefix_fulltext, fused.
+SEARCH_ROUTES = {}
+
+# Per-request search metrics: Server-Timing header and Prometheus text at /api/metrics
+SEARCH_METRICS_ENABLED = os.getenv("SEARCH_METRICS_ENABLED", "1") == "1"
+
+# SEARCH_LOG_LEVEL=INFO logs the plan chosen for every unified query (logger "search.router")
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "search": {"handlers": ["console"], "level": os.getenv("SEARCH_LOG_LEVEL", "WARNING")},
+    },
+}
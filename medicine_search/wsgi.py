@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "medicine_search.settings")
 
 application = get_wsgi_application()
+
+# load in-memory search indexes before the first request
+from search.engines import warm_engines  # noqa: E402
+
+warm_engines()
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class SearchConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "search"
+
+    def ready(self):
+        from .cache import search_cache
+        from .catalog import catalog_updated
+        from .engines import connect_refresh_hooks
+        from .metrics import enabled as metrics_enabled, install_db_wrapper
+        from .typeahead import typeahead_cache
+        connect_refresh_hooks()
+        catalog_updated.connect(search_cache.clear, weak=False, dispatch_uid='search-cache-clear')
+        catalog_updated.connect(typeahead_cache.clear, weak=False, dispatch_uid='search-typeahead-clear')
+        if metrics_enabled():
+            # query count / DB time for SearchMetricsMiddleware, on every new connection
+            connection_created.connect(install_db_wrapper, dispatch_uid='search-metrics-db')
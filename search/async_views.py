@@ -0,0 +1,169 @@
+# search/async_views.py
+"""
+Async counterparts of the JSON search endpoints for ASGI deployments.
+
+They run hand-written SQL (same filters and ordering as the ORM views) on the
+bounded psycopg 3 pool from search/db.py, so a worker can keep many searches in
+flight while waiting on PostgreSQL. The unified endpoint picks its ids with the
+same query-shape router as the sync view (search/router.py), in a worker
+thread, and fetches the rows on the pool.
+
+Filtered requests (search/facets.py), and modes whose SEARCH_ENGINES entry is
+not "database" (memory indexes, partitions, prepared statements, SymSpell), run
+the sync view's `search()` in a worker thread instead, so the filters and the
+configured engine apply and both endpoints share cache entries.
+"""
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse, JsonResponse
+from rest_framework.exceptions import ValidationError
+
+from . import metrics
+from .batch import like_escape
+from .cache import search_cache
+from .db import PoolTimeout, fetch_all
+from .engines import DATABASE, FUSED, engine_for
+from .facets import parse_filters
+from .models import Medicine
+from .renderers import dumps
+from .replicas import replica_reads
+from .router import routed_ids
+from .serializers import parse_fields, serialize_rows
+from .views import (
+    DEFAULT_LIMIT, FullTextSearchView, FuzzySearchView, PrefixSearchView, SubstringSearchView,
+    UnifiedSearchView,
+)
+
+TABLE = Medicine._meta.db_table
+
+SQL = {
+    'prefix': f"""
+        SELECT {{columns}} FROM {TABLE}
+        WHERE lower(name) LIKE %(pattern)s
+        ORDER BY lower(name) LIMIT %(limit)s
+    """,
+    'substring': f"""
+        SELECT {{columns}} FROM {TABLE}
+        WHERE name ILIKE %(pattern)s
+        ORDER BY similarity(name, %(q)s) DESC, name LIMIT %(limit)s
+    """,
+    'fulltext': f"""
+        SELECT {{columns}} FROM {TABLE}
+        WHERE name_tsv @@ plainto_tsquery('simple', %(q)s)
+        ORDER BY ts_rank(name_tsv, plainto_tsquery('simple', %(q)s)) DESC LIMIT %(limit)s
+    """,
+    'fuzzy': f"""
+        SELECT {{columns}} FROM {TABLE}
+        WHERE name %% %(q)s
+        ORDER BY similarity(name, %(q)s) DESC LIMIT %(limit)s
+    """,
+}
+
+
+# filtered and non-database-engine searches go to the sync views
+SYNC_VIEWS = {view.mode: view for view in (
+    PrefixSearchView, SubstringSearchView, FullTextSearchView, FuzzySearchView, UnifiedSearchView)}
+
+
+def _sync_search(mode, q, params):
+    # runs on an executor thread: Django connections are per-thread, drop stale ones first
+    close_old_connections()
+    with replica_reads():
+        return SYNC_VIEWS[mode]().search(q, **params)
+
+
+def _routed_ids(q, limit, threshold):
+    # runs on an executor thread: Django connections are per-thread, drop stale ones first
+    close_old_connections()
+    with replica_reads():
+        return routed_ids(q, limit, threshold=threshold)
+
+
+def _cache_call(method, *args):
+    # the key's catalog version may be re-read through the ORM on this executor thread
+    close_old_connections()
+    return method(*args)
+
+
+async def unified_rows(q, limit, fields, threshold=0.2):
+    # the router's sources and stages run on the ORM, which is sync-only; not thread-sensitive,
+    # so concurrent requests route in parallel instead of queueing on one shared thread
+    ids = await sync_to_async(_routed_ids, thread_sensitive=False)(q, limit, threshold)
+    if not ids:
+        return []
+    rows = await fetch_all(f"SELECT id, {', '.join(fields)} FROM {TABLE} WHERE id = ANY(%s)", [ids])
+    by_pk = {row[0]: row[1:] for row in rows}
+    return [by_pk[pk] for pk in ids if pk in by_pk]
+
+
+async def _search(mode, q, params):
+    fields = params['fields']
+    if mode == 'unified':
+        rows = await unified_rows(q, params['limit'], fields)
+    else:
+        sql_params = {'q': q, **params}
+        if mode == 'prefix':
+            sql_params['pattern'] = like_escape(q.lower()) + '%'
+        elif mode == 'substring':
+            sql_params['pattern'] = f"%{like_escape(q)}%"
+        # fields were validated against MEDICINE_FIELDS, safe to inline
+        # fuzzy's `%` matches (index-backed) at the request's threshold, similarity() only ranks
+        rows = await fetch_all(SQL[mode].format(columns=', '.join(fields)), sql_params,
+                               threshold=params.get('threshold'))
+    return serialize_rows(rows, fields)
+
+
+def _async_search_view(mode):
+    async def view(request):
+        q = request.GET.get('q', '').strip()
+        if not q:
+            return JsonResponse([], safe=False)
+        metrics.set_mode(mode)
+        try:
+            params = {
+                'limit': int(request.GET.get('limit', DEFAULT_LIMIT)),
+                'fields': parse_fields(request.GET.get('fields')),
+            }
+            if mode == 'fuzzy':
+                params['threshold'] = float(request.GET.get('threshold', 0.3))
+            filters = parse_filters(request.GET)
+        except ValueError:
+            return JsonResponse({'detail': 'Invalid limit or threshold.'}, status=400)
+        except ValidationError as exc:
+            return JsonResponse(exc.detail, status=400)
+
+        if filters:
+            params['filters'] = filters
+        # the SQL below is the database engine's; any other engine answers through the sync view
+        sync = bool(filters) or (mode != 'unified' and engine_for(mode) != DATABASE)
+        if sync:
+            # the sync view's own search and cache entry
+            cache_mode = mode
+        else:
+            # async unified is always routed; don't share entries with the OR'ed database query
+            cache_mode = mode if mode != 'unified' or engine_for('unified') == FUSED else 'unified-fused'
+        # the cache may read the catalog version through the ORM, which is sync-only; an executor
+        # thread rather than the shared sync thread, so cache hits don't queue behind other requests
+        cache_call = sync_to_async(_cache_call, thread_sensitive=False)
+        data = await cache_call(search_cache.get, cache_mode, q, params)
+        if data is None:
+            try:
+                if sync:
+                    data = await sync_to_async(_sync_search, thread_sensitive=False)(mode, q, params)
+                else:
+                    data = await _search(mode, q, params)
+            except PoolTimeout:
+                return JsonResponse({'detail': 'Search is busy, retry shortly.'}, status=503)
+            await cache_call(search_cache.set, cache_mode, q, params, data)
+        metrics.add_rows(len(data))
+        return HttpResponse(dumps(data), content_type='application/json')
+
+    view.__name__ = f'async_{mode}_search'
+    return view
+
+
+async_prefix_search = _async_search_view('prefix')
+async_substring_search = _async_search_view('substring')
+async_fulltext_search = _async_search_view('fulltext')
+async_fuzzy_search = _async_search_view('fuzzy')
+async_unified_search = _async_search_view('unified')
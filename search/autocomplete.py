@@ -0,0 +1,71 @@
+# search/autocomplete.py
+"""
+Precomputed autocomplete: for every lowercased name prefix up to MAX_PREFIX
+characters, the TOP_K best names are stored in one `search_completion` row, so
+a keystroke is a single primary-key lookup instead of walking every match of a
+short prefix on the btree and sorting them.
+
+Names are ranked by a weighted score (all weights configurable):
+
+    available * available + not_discontinued * (not is_discontinued)
+        - shortness * length(name)
+
+ties broken by lower(name). Rows remember the catalog version they were built
+from; after a re-import they are ignored until `build_autocomplete` runs again.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Completion, Medicine
+
+DEFAULTS = {
+    "MAX_PREFIX": 4,
+    "TOP_K": 10,
+    "WEIGHTS": {"available": 1.0, "not_discontinued": 1.0, "shortness": 0.01},
+}
+
+BUILD_SQL = f"""
+    INSERT INTO {Completion._meta.db_table} (prefix, results, version)
+    SELECT prefix, jsonb_agg(jsonb_build_array(id, name) ORDER BY rn), %(version)s
+    FROM (
+        SELECT p.prefix, s.id, s.name,
+               row_number() OVER (PARTITION BY p.prefix ORDER BY s.score DESC, s.key, s.id) AS rn
+        FROM (
+            SELECT id, name, lower(name) AS key,
+                   %(available)s * available::int
+                   + %(not_discontinued)s * (NOT is_discontinued)::int
+                   - %(shortness)s * length(name) AS score
+            FROM {Medicine._meta.db_table}
+        ) s
+        CROSS JOIN LATERAL (
+            SELECT DISTINCT left(s.key, n) AS prefix
+            FROM generate_series(1, LEAST(%(max_prefix)s, length(s.key))) AS n
+        ) p
+    ) ranked
+    WHERE rn <= %(top_k)s
+    GROUP BY prefix
+"""
+
+
+def autocomplete_settings():
+    conf = {**DEFAULTS, **getattr(settings, "SEARCH_AUTOCOMPLETE", {})}
+    conf["WEIGHTS"] = {**DEFAULTS["WEIGHTS"], **conf["WEIGHTS"]}
+    return conf
+
+
+def build(version, max_prefix, top_k, weights):
+    """Replace the completion table in one transaction; returns the number of prefixes."""
+    params = {"version": version, "max_prefix": max_prefix, "top_k": top_k, **weights}
+    with transaction.atomic(), connection.cursor() as cursor:
+        # DELETE rather than TRUNCATE: readers keep seeing the old rows until commit
+        cursor.execute(f"DELETE FROM {Completion._meta.db_table}")
+        cursor.execute(BUILD_SQL, params)
+        return cursor.rowcount
+
+
+def lookup(prefix, version):
+    """Stored [[id, name], ...] for `prefix` (already lowercased), or None if absent or stale."""
+    row = Completion.objects.filter(pk=prefix).values_list('version', 'results').first()
+    if row is None or row[0] != version:
+        return None
+    return row[1]
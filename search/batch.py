@@ -0,0 +1,182 @@
+# search/batch.py
+"""
+Many searches in one request: items are grouped by mode and each group runs as
+a single `unnest(...) CROSS JOIN LATERAL (...)` query, i.e. one round trip per
+mode instead of one ORM queryset per item. The LATERAL bodies mirror the
+filters and ORDER BY of the single-query views' database engine, so rankings
+are the same. Fuzzy items match with pg_trgm's index-backed `%` at the lowest
+threshold in the group, then each keeps the names over its own threshold.
+Modes set to another engine (partitioned, prepared, symspell) rank
+differently, so their items run through the view's own `search()`.
+"""
+import sys
+from collections import defaultdict
+from contextlib import nullcontext
+
+from .cache import search_cache
+from .engines import DATABASE, MEMORY, engine_for
+from .models import Medicine
+from .replicas import read_connection, similarity_threshold
+from .serializers import MEDICINE_FIELDS, project_rows
+
+TABLE = Medicine._meta.db_table
+COLUMNS = ', '.join(f'm.{f}' for f in MEDICINE_FIELDS)
+
+BATCH_SQL = {
+    # lower(name) range on the text_pattern_ops btree == LIKE 'prefix%', but usable with outer refs
+    'prefix': f"""
+        SELECT b.ord, {COLUMNS}
+        FROM unnest(%s::text[], %s::text[], %s::int[]) WITH ORDINALITY AS b(lo, hi, lim, ord)
+        CROSS JOIN LATERAL (
+            SELECT t.*, lower(t.name) AS batch_key
+            FROM {TABLE} t
+            WHERE lower(t.name) ~>=~ b.lo AND lower(t.name) ~<~ b.hi
+            ORDER BY lower(t.name)
+            LIMIT b.lim
+        ) m
+        ORDER BY b.ord, m.batch_key
+    """,
+    'substring': f"""
+        SELECT b.ord, {COLUMNS}
+        FROM unnest(%s::text[], %s::text[], %s::int[]) WITH ORDINALITY AS b(term, pattern, lim, ord)
+        CROSS JOIN LATERAL (
+            SELECT t.*, similarity(t.name, b.term) AS batch_score
+            FROM {TABLE} t
+            WHERE t.name ILIKE b.pattern
+            ORDER BY batch_score DESC, t.name
+            LIMIT b.lim
+        ) m
+        ORDER BY b.ord, m.batch_score DESC, m.name
+    """,
+    'fulltext': f"""
+        SELECT b.ord, {COLUMNS}
+        FROM unnest(%s::text[], %s::int[]) WITH ORDINALITY AS b(term, lim, ord)
+        CROSS JOIN LATERAL (
+            SELECT t.*, ts_rank(t.name_tsv, plainto_tsquery('simple', b.term)) AS batch_score
+            FROM {TABLE} t
+            WHERE t.name_tsv @@ plainto_tsquery('simple', b.term)
+            ORDER BY batch_score DESC
+            LIMIT b.lim
+        ) m
+        ORDER BY b.ord, m.batch_score DESC
+    """,
+    'fuzzy': f"""
+        SELECT b.ord, {COLUMNS}
+        FROM unnest(%s::text[], %s::float8[], %s::int[]) WITH ORDINALITY AS b(term, thr, lim, ord)
+        CROSS JOIN LATERAL (
+            SELECT t.*, similarity(t.name, b.term) AS batch_score
+            FROM {TABLE} t
+            WHERE t.name %% b.term AND similarity(t.name, b.term) >= b.thr
+            ORDER BY batch_score DESC
+            LIMIT b.lim
+        ) m
+        ORDER BY b.ord, m.batch_score DESC
+    """,
+}
+
+MODES = tuple(BATCH_SQL)
+
+
+def like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def prefix_upper_bound(prefix):
+    """
+    Smallest string greater than every string starting with `prefix`. U+10FFFF
+    has no successor, so trailing ones are dropped and the character before
+    them is bumped. A prefix of nothing else gives an empty range; that
+    noncharacter does not occur in names.
+    """
+    stripped = prefix.rstrip(chr(sys.maxunicode))
+    if not stripped:
+        return prefix
+    code = ord(stripped[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        # surrogates cannot be sent to PostgreSQL; the next character is U+E000
+        code = 0xE000
+    return stripped[:-1] + chr(code)
+
+
+def _params(mode, items):
+    lims = [item['params']['limit'] for item in items]
+    terms = [item['q'] for item in items]
+    if mode == 'prefix':
+        los = [t.lower() for t in terms]
+        return [los, [prefix_upper_bound(lo) for lo in los], lims]
+    if mode == 'substring':
+        return [terms, [f"%{like_escape(t)}%" for t in terms], lims]
+    if mode == 'fulltext':
+        return [terms, lims]
+    return [terms, [item['params']['threshold'] for item in items], lims]
+
+
+def _memory_ids(mode, q, params):
+    from .prefix_index import prefix_index
+    from .trigram_index import trigram_index
+    if mode == 'prefix':
+        return prefix_index.search(q.lower(), params['limit'])
+    if mode == 'substring':
+        return trigram_index.substring(q, params['limit'])
+    return trigram_index.fuzzy(q, params['limit'], params['threshold'])
+
+
+def _view_search(mode, q, params):
+    from .views import FullTextSearchView, FuzzySearchView, PrefixSearchView, SubstringSearchView
+    views = {view.mode: view for view in (PrefixSearchView, SubstringSearchView, FullTextSearchView,
+                                          FuzzySearchView)}
+    return views[mode]().search(q, **params)
+
+
+def run_batch(items):
+    """
+    Answer normalized items ({'id', 'mode', 'q', 'params'}) and return {item id: rows}.
+
+    Cached results are served from `search_cache`; modes configured for an
+    in-memory engine resolve ids in-process and share one pk lookup. Modes on
+    any other non-database engine run the view's search per item, so results
+    (and the cache entries they share with the view) rank the same.
+    """
+    results = {}
+    pending = defaultdict(list)
+    for item in items:
+        cached = search_cache.get(item['mode'], item['q'], item['params'])
+        if cached is not None:
+            results[item['id']] = cached
+        else:
+            pending[item['mode']].append(item)
+
+    memory_items = {}
+    for mode, group in pending.items():
+        if mode in ('prefix', 'substring', 'fuzzy') and engine_for(mode) == MEMORY:
+            for item in group:
+                memory_items[item['id']] = (item, _memory_ids(mode, item['q'], item['params']))
+            continue
+        if engine_for(mode) != DATABASE:
+            for item in group:
+                results[item['id']] = _view_search(mode, item['q'], item['params'])
+                search_cache.set(mode, item['q'], item['params'], results[item['id']])
+            continue
+        rows = defaultdict(list)
+        if mode == 'fuzzy':
+            # `%` matches at the group's lowest threshold; each item's own is checked in the query
+            context = similarity_threshold(min(item['params']['threshold'] for item in group))
+        else:
+            context = nullcontext()
+        with context, read_connection().cursor() as cursor:
+            cursor.execute(BATCH_SQL[mode], _params(mode, group))
+            for ord_, *row in cursor.fetchall():
+                rows[ord_].append(row)
+        for ord_, item in enumerate(group, start=1):
+            results[item['id']] = project_rows(rows[ord_], item['params']['fields'])
+            search_cache.set(mode, item['q'], item['params'], results[item['id']])
+
+    if memory_items:
+        all_ids = list({pk for _, ids in memory_items.values() for pk in ids})
+        by_pk = {row[0]: row for row in Medicine.objects.filter(pk__in=all_ids).values_list(*MEDICINE_FIELDS)}
+        for item_id, (item, ids) in memory_items.items():
+            rows = [by_pk[pk] for pk in ids if pk in by_pk]
+            results[item_id] = project_rows(rows, item['params']['fields'])
+            search_cache.set(item['mode'], item['q'], item['params'], results[item_id])
+
+    return results
@@ -0,0 +1,232 @@
+# search/benchmark.py
+"""
+Building blocks for `run_benchmark`: query execution per mode, latency
+statistics, an HTTP load generator and baseline comparison.
+
+Reports are plain JSON so they can be committed as baselines:
+
+    {"meta": {...},
+     "queries": {"1": {"type", "query", "ms": {p50, p95, p99, ...}, "results": [...]}},
+     "modes": {"prefix": {"p50", "p95", "p99", "mean", "qps", "samples"}},
+     "http": {"prefix": {...}}}
+"""
+import json
+import math
+import statistics
+import time
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from .engines import DATABASE
+from .replicas import similarity_threshold
+from .router import plan_for
+from .views import FullTextSearchView, FuzzySearchView, PrefixSearchView, SubstringSearchView, UnifiedSearchView
+
+# HTTP path per search mode, relative to the API root
+HTTP_PATHS = {
+    'prefix': 'search/prefix',
+    'substring': 'search/substring',
+    'fulltext': 'search/fulltext',
+    'fuzzy': 'search/fussy',
+    'unified': 'unified/',
+}
+
+# the view timed per query type; other types run as substring
+VIEWS = {view.mode: view for view in (
+    PrefixSearchView, SubstringSearchView, FullTextSearchView, FuzzySearchView, UnifiedSearchView)}
+
+
+def load_queries(path):
+    """Benchmark items as dicts with id/type/query from either query file format."""
+    with open(path, 'r', encoding='utf8') as f:
+        qdoc = json.load(f)
+    if isinstance(qdoc, list):
+        # benchmark_queries format: [{"id", "q"}], substring semantics
+        tests = [{'id': t.get('id'), 'type': t.get('type', 'substring'), 'query': t.get('q', '')} for t in qdoc]
+    else:
+        tests = qdoc.get('tests') or qdoc.get('queries') or []
+    items, seen = [], set()
+    for idx, t in enumerate(tests, start=1):
+        # the list format always has an id key, None when the file gave none
+        qid = str(t['id'] if t.get('id') is not None else idx)
+        # If duplicated qid already exists, append _dupN
+        base_qid, dup = qid, 1
+        while qid in seen:
+            qid = f"{base_qid}_dup{dup}"
+            dup += 1
+        seen.add(qid)
+        items.append({**t, 'id': qid, 'query': (t.get('query') or '').strip()})
+    return items
+
+
+@contextmanager
+def engine_override(qtype, engine):
+    """Run with the engine of `qtype`'s view set to `engine`; the views read it through engine_for()."""
+    mode = VIEWS.get(qtype, SubstringSearchView).mode
+    engines = {**getattr(settings, 'SEARCH_ENGINES', {}), mode: engine}
+    with override_settings(SEARCH_ENGINES=engines):
+        yield
+
+
+def build_query(qtype, q, limit, engine, threshold=0.3):
+    """
+    What the endpoint runs, minus the cache: the view's `ordered()` names
+    QuerySet for the database engine, else the names its `search()` returns.
+    Call inside `engine_override(qtype, engine)`.
+    """
+    view = VIEWS.get(qtype, SubstringSearchView)()
+    extra = {'threshold': threshold} if view.mode == 'fuzzy' else {}
+    if engine == DATABASE:
+        return view.ordered(q, **extra)[:limit].values_list('name', flat=True)
+    return [row['name'] for row in view.search(q, limit, ['name'], **extra)]
+
+
+def _trigram_context(qtype, threshold):
+    # the fuzzy view's `%` match reads its threshold from the transaction
+    if VIEWS.get(qtype, SubstringSearchView).mode == 'fuzzy':
+        return similarity_threshold(threshold)
+    return nullcontext()
+
+
+def execute(qtype, q, limit, engine, threshold=0.3):
+    with _trigram_context(qtype, threshold):
+        return list(build_query(qtype, q, limit, engine, threshold))
+
+
+def explain(qtype, q, limit, engine, threshold=0.3):
+    """EXPLAIN (ANALYZE, BUFFERS) plan as parsed JSON, or None for in-memory engines."""
+    with engine_override(qtype, engine):
+        qs = build_query(qtype, q, limit, engine, threshold)
+    if isinstance(qs, list):
+        return None
+    with _trigram_context(qtype, threshold):
+        return json.loads(qs.explain(analyze=True, buffers=True, format='json'))
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of `values` (pct in 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    if lo == hi:
+        return ordered[int(k)]
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(samples_ms, wall_s=None):
+    """Latency stats in ms; qps from wall time when given, else from the summed latencies."""
+    if not samples_ms:
+        return {'samples': 0}
+    total_s = wall_s if wall_s is not None else sum(samples_ms) / 1000.0
+    return {
+        'samples': len(samples_ms),
+        'min': round(min(samples_ms), 3),
+        'mean': round(statistics.fmean(samples_ms), 3),
+        'p50': round(percentile(samples_ms, 50), 3),
+        'p95': round(percentile(samples_ms, 95), 3),
+        'p99': round(percentile(samples_ms, 99), 3),
+        'max': round(max(samples_ms), 3),
+        'qps': round(len(samples_ms) / total_s, 2) if total_s > 0 else None,
+    }
+
+
+def time_query(item, limit, engine, warmups, repeats):
+    """Run one benchmark item `warmups` times untimed and `repeats` times timed."""
+    threshold = float(item.get('threshold', 0.3))
+    args = (item.get('type'), item['query'], limit, engine, threshold)
+    samples, names = [], []
+    with engine_override(item.get('type'), engine):
+        for _ in range(warmups):
+            execute(*args)
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            names = execute(*args)
+            samples.append((time.perf_counter() - t0) * 1000.0)
+    return names, samples
+
+
+def http_load(base_url, items, limit, concurrency, requests_per_query, timeout=10.0):
+    """
+    Fire `requests_per_query` GETs per item at the HTTP endpoints from `concurrency`
+    threads. Returns per-mode stats (latency percentiles, achieved qps, errors).
+    """
+    jobs = []
+    for item in items:
+        path = HTTP_PATHS.get(item.get('type'))
+        if not path or not item['query']:
+            continue
+        params = {'q': item['query'], 'limit': limit}
+        if item.get('type') == 'fuzzy':
+            params['threshold'] = item.get('threshold', 0.3)
+        url = f"{base_url.rstrip('/')}/{path}?{urllib.parse.urlencode(params)}"
+        jobs.extend([(item['type'], url)] * requests_per_query)
+
+    def fetch(job):
+        mode, url = job
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as resp:
+                resp.read()
+                ok = resp.status == 200
+        except OSError:
+            ok = False
+        return mode, (time.perf_counter() - t0) * 1000.0, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(fetch, jobs))
+    wall = time.perf_counter() - started
+
+    by_mode, errors = defaultdict(list), defaultdict(int)
+    for mode, ms, ok in outcomes:
+        if ok:
+            by_mode[mode].append(ms)
+        else:
+            errors[mode] += 1
+    share = {mode: (len(by_mode[mode]) + errors[mode]) / max(len(outcomes), 1) for mode in set(by_mode) | set(errors)}
+    # modes interleave on the same pool, so attribute wall time by share of requests
+    return {
+        mode: {**summarize(by_mode[mode], wall * share[mode]), 'errors': errors[mode], 'concurrency': concurrency}
+        for mode in sorted(share)
+    }
+
+
+def compare(report, baseline, max_regression, metric='p95'):
+    """
+    Latency regressions and relevance drift of `report` against `baseline`.
+
+    Returns (regressions, drift): regressions lists modes whose `metric` grew by more
+    than `max_regression` (a fraction); drift maps query ids to the share of baseline
+    results still present.
+    """
+    regressions = []
+    for section in ('modes', 'http'):
+        for mode, old in baseline.get(section, {}).items():
+            new = report.get(section, {}).get(mode)
+            if not new or not old.get(metric) or new.get(metric) is None:
+                continue
+            change = new[metric] / old[metric] - 1.0
+            if change > max_regression:
+                regressions.append({
+                    'section': section, 'mode': mode, 'metric': metric,
+                    'baseline': old[metric], 'current': new[metric], 'change': round(change, 4),
+                })
+
+    drift = {}
+    for qid, old in baseline.get('queries', {}).items():
+        new = report.get('queries', {}).get(qid)
+        old_results = old.get('results') or []
+        if new is None or not old_results:
+            continue
+        kept = len(set(old_results) & set(new.get('results') or [])) / len(old_results)
+        if kept < 1.0:
+            drift[qid] = round(kept, 3)
+    return regressions, drift
@@ -0,0 +1,153 @@
+# search/cache.py
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .catalog import get_catalog_version
+from .singleflight import single_flight
+
+DEFAULTS = {
+    "ENABLED": True,
+    "MAX_ENTRIES": 5000,
+    "SHARED_CACHE": None,
+    "TTL": {},
+    "DEFAULT_TTL": 60,
+}
+
+
+# modes that match case-insensitively, so 'Parac' and 'parac' share an entry;
+# any other (substitutes looks up a medicine id) keeps q as given
+CASE_INSENSITIVE_MODES = frozenset({
+    'prefix', 'substring', 'fulltext', 'fulltext_prefix', 'fuzzy', 'phonetic', 'unified',
+    'autocomplete', 'typeahead', 'ingredient', 'html',
+})
+
+
+def normalize_query(q, mode):
+    q = q.strip()
+    # derived entries ('unified-fused', 'prefix-facets') follow their base mode
+    if mode.split('-')[0] in CASE_INSENSITIVE_MODES:
+        return q.lower()
+    return q
+
+
+class SearchCache:
+    """
+    Two-tier cache for search results.
+
+    Tier 1 is a bounded in-process LRU; tier 2 is an optional Django cache alias
+    (settings.SEARCH_CACHE["SHARED_CACHE"]) shared by all workers. Keys embed the
+    catalog version, so a re-import makes every old entry unreachable at once and
+    they simply age out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = Counter()
+        self.shared_hits = Counter()
+        self.misses = Counter()
+
+    @property
+    def conf(self):
+        return {**DEFAULTS, **getattr(settings, "SEARCH_CACHE", {})}
+
+    def make_key(self, mode, q, params):
+        raw = json.dumps([normalize_query(q, mode), sorted(params.items())], ensure_ascii=False)
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        return f"search:v{get_catalog_version()}:{mode}:{digest}"
+
+    def _store(self, key, value, ttl, max_entries):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, mode, q, params):
+        """Cached value or None; counts a hit or a miss."""
+        conf = self.conf
+        if not conf["ENABLED"]:
+            return None
+        key = self.make_key(mode, q, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits[mode] += 1
+                    return entry[1]
+                del self._entries[key]
+
+        shared = self._shared(conf)
+        if shared is not None:
+            value = shared.get(key)
+            if value is not None:
+                self.shared_hits[mode] += 1
+                self._store(key, value, self._ttl(conf, mode), conf["MAX_ENTRIES"])
+                return value
+
+        self.misses[mode] += 1
+        return None
+
+    def set(self, mode, q, params, value):
+        conf = self.conf
+        if not conf["ENABLED"]:
+            return
+        key = self.make_key(mode, q, params)
+        ttl = self._ttl(conf, mode)
+        self._store(key, value, ttl, conf["MAX_ENTRIES"])
+        shared = self._shared(conf)
+        if shared is not None:
+            shared.set(key, value, ttl)
+
+    def get_or_set(self, mode, q, params, compute):
+        """
+        Return the cached result for (mode, q, params) or compute, store and return it.
+        Identical concurrent misses share one computation (search/singleflight.py).
+        """
+        if not self.conf["ENABLED"]:
+            return single_flight.do(self.make_key(mode, q, params), compute, mode)
+        value = self.get(mode, q, params)
+        if value is None:
+            value = single_flight.do(self.make_key(mode, q, params),
+                                     lambda: self._compute_and_set(mode, q, params, compute), mode)
+        return value
+
+    def _compute_and_set(self, mode, q, params, compute):
+        value = compute()
+        self.set(mode, q, params, value)
+        return value
+
+    def _ttl(self, conf, mode):
+        return conf["TTL"].get(mode, conf["DEFAULT_TTL"])
+
+    def _shared(self, conf):
+        return caches[conf["SHARED_CACHE"]] if conf["SHARED_CACHE"] else None
+
+    def clear(self, **kwargs):
+        # also a catalog_updated receiver: entries of the old version are dead anyway
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        modes = set(self.hits) | set(self.shared_hits) | set(self.misses)
+        return {
+            "entries": len(self._entries),
+            "modes": {
+                mode: {
+                    "hits": self.hits[mode],
+                    "shared_hits": self.shared_hits[mode],
+                    "misses": self.misses[mode],
+                }
+                for mode in sorted(modes)
+            },
+        }
+
+
+search_cache = SearchCache()
@@ -0,0 +1,54 @@
+# search/catalog.py
+import time
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import CatalogVersion
+
+CATALOG_ROW_ID = 1
+
+# Sent in-process after the catalog version was bumped; receivers drop derived state
+# (in-memory indexes, caches). Other processes notice through get_catalog_version().
+catalog_updated = Signal()
+
+_lock = threading.Lock()
+_state = {"version": None, "checked_at": 0.0}
+
+
+def read_catalog_version():
+    """Current catalog version straight from the DB, bypassing the throttle."""
+    return (CatalogVersion.objects
+            .filter(pk=CATALOG_ROW_ID)
+            .values_list('version', flat=True)
+            .first()) or 0
+
+
+def get_catalog_version():
+    """Current catalog version, re-read from the DB at most every SEARCH_CATALOG_VERSION_TTL seconds."""
+    ttl = getattr(settings, "SEARCH_CATALOG_VERSION_TTL", 5)
+    now = time.monotonic()
+    if _state["version"] is not None and now - _state["checked_at"] < ttl:
+        return _state["version"]
+    with _lock:
+        if _state["version"] is not None and now - _state["checked_at"] < ttl:
+            return _state["version"]
+        version = read_catalog_version()
+        _state.update(version=version, checked_at=time.monotonic())
+    return version
+
+
+def bump_catalog_version():
+    """Increment the catalog version after a (re)import and notify in-process receivers."""
+    with transaction.atomic():
+        CatalogVersion.objects.get_or_create(pk=CATALOG_ROW_ID)
+        CatalogVersion.objects.filter(pk=CATALOG_ROW_ID).update(
+            version=F('version') + 1, updated_at=timezone.now())
+        version = CatalogVersion.objects.values_list('version', flat=True).get(pk=CATALOG_ROW_ID)
+    _state.update(version=version, checked_at=time.monotonic())
+    catalog_updated.send(sender=CatalogVersion, version=version)
+    return version
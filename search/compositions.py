@@ -0,0 +1,155 @@
+# search/compositions.py
+"""
+Normalized ingredients parsed from `short_composition`.
+
+    "Tramadol (37.5mg) + Paracetamol (325mg)"
+        -> [("tramadol", "37.5mg"), ("paracetamol", "325mg")]
+
+Each medicine gets one `search_medicine_ingredient` row per ingredient, plus a
+`composition_key` (md5 of its sorted ingredient/strength pairs) on the
+medicine itself: brands with the same key are substitutes for each other.
+Ingredient names are lowercased with whitespace collapsed; strengths also
+lose the space between number and unit ("10 mg" -> "10mg").
+
+Parentheses inside a name are not part of it. "(NA)" is a placeholder and is
+dropped. Anything else names the same ingredient another way, usually the salt
+or an abbreviation: "Vitamin B6 (Pyridoxine)" is the ingredient "vitamin b6"
+with the alias "pyridoxine". Aliases get ingredient rows of their own, so
+searching by either name finds the medicine, but they stay out of the
+composition_key.
+
+The parsing helpers are plain Python so loader.load_row can use them inside
+`import_data --fast` worker processes.
+"""
+import hashlib
+import re
+
+BATCH_SIZE = 5000
+
+_SEPARATOR = re.compile(r'\s+\+\s+')
+# trailing "(...)" group; only a strength when it starts with a number
+_PART = re.compile(r'^(.*?)\s*\(([^()]*)\)\s*$')
+# "paracetamol 500mg", "amoxycillin 250 mg", "ketoconazole 2% w/w"
+_QUERY_STRENGTH = re.compile(
+    r'^(.*?)\s+(\d[\d.]*\s*(?:[a-z%]+)(?:/[\d.]*\s*[a-z]+)?(?:\s+[wv]/[wv])?)$', re.IGNORECASE)
+_UNIT_SPACE = re.compile(r'(\d)\s+(?=[a-z%])')
+# "(...)" inside an ingredient name
+_PAREN = re.compile(r'\(([^()]*)\)')
+# parenthesized "not available" markers, not aliases
+_PLACEHOLDERS = frozenset({'', 'na', 'n/a', 'nil'})
+
+
+def normalize_name(name):
+    return ' '.join(name.lower().split())
+
+
+def normalize_strength(strength):
+    return _UNIT_SPACE.sub(r'\1', ' '.join(strength.lower().split())) or None
+
+
+def split_name(name):
+    """("vitamin b6", ["pyridoxine"]) for "Vitamin B6 (Pyridoxine)"; placeholders like "(NA)" are dropped."""
+    main = normalize_name(_PAREN.sub(' ', name))
+    aliases = []
+    for alias in map(normalize_name, _PAREN.findall(name)):
+        if alias not in _PLACEHOLDERS and alias != main and alias not in aliases:
+            aliases.append(alias)
+    if not main and aliases:
+        main = aliases.pop(0)
+    return main, aliases
+
+
+def _parse_part(part):
+    # (ingredient, aliases, strength or None)
+    m = _PART.match(part.strip())
+    if m and m.group(2).strip()[:1].isdigit():
+        name, strength = m.group(1), normalize_strength(m.group(2))
+    else:
+        name, strength = part, None
+    return (*split_name(name), strength)
+
+
+def _parse_parts(text):
+    if not text or not text.strip():
+        return []
+    return [p for p in map(_parse_part, _SEPARATOR.split(text.strip())) if p[0]]
+
+
+def parse_part(part):
+    """(ingredient, strength or None) for one "Name (strength)" component."""
+    name, _, strength = _parse_part(part)
+    return name, strength
+
+
+def parse_composition(text):
+    """[(ingredient, strength), ...] in listed order; empty for a missing composition."""
+    return [(name, strength) for name, _, strength in _parse_parts(text)]
+
+
+def ingredient_entries(text):
+    """[(position, ingredient, strength), ...]: each ingredient, then its aliases at the same position."""
+    return [(i, name, strength)
+            for i, (main, aliases, strength) in enumerate(_parse_parts(text))
+            for name in (main, *aliases)]
+
+
+def composition_key(text):
+    """Group id shared by every medicine with the same ingredients and strengths, in any order."""
+    parts = parse_composition(text)
+    if not parts:
+        return None
+    raw = '+'.join(sorted(f"{name}|{strength or ''}" for name, strength in parts))
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def parse_query(q):
+    """Split an ingredient search like "Paracetamol 500mg" into (ingredient, strength or None)."""
+    q = q.strip()
+    if '(' in q:
+        return parse_part(q)
+    m = _QUERY_STRENGTH.match(q)
+    if m:
+        return normalize_name(m.group(1)), normalize_strength(m.group(2))
+    return normalize_name(q), None
+
+
+def sync_ingredients(ids=None):
+    """
+    Rebuild ingredient rows (all medicines, or only `ids`) from short_composition
+    and fix any composition_key that disagrees with it. Returns rows written.
+    """
+    from django.db import connection, transaction
+    from .models import Medicine, MedicineIngredient
+
+    table = MedicineIngredient._meta.db_table
+    medicines = Medicine.objects.order_by()
+    if ids is not None:
+        medicines = medicines.filter(pk__in=ids)
+    written = 0
+    with transaction.atomic():
+        if ids is None:
+            with connection.cursor() as cursor:
+                cursor.execute(f"TRUNCATE {table}")
+        else:
+            for start in range(0, len(ids), BATCH_SIZE):
+                MedicineIngredient.objects.filter(medicine_id__in=ids[start:start + BATCH_SIZE]).delete()
+
+        objs, stale = [], []
+        rows = medicines.values_list('id', 'short_composition', 'composition_key')
+        for pk, text, stored_key in rows.iterator(chunk_size=BATCH_SIZE):
+            key = composition_key(text)
+            if key != stored_key:
+                stale.append(Medicine(pk=pk, composition_key=key))
+            objs.extend(
+                MedicineIngredient(medicine_id=pk, position=i, ingredient=name, strength=strength)
+                for i, name, strength in ingredient_entries(text))
+            if len(objs) >= BATCH_SIZE:
+                MedicineIngredient.objects.bulk_create(objs)
+                written += len(objs)
+                objs = []
+        if objs:
+            MedicineIngredient.objects.bulk_create(objs)
+            written += len(objs)
+        # rows loaded before composition_key existed, or keyed by an older parser
+        Medicine.objects.bulk_update(stale, ['composition_key'], batch_size=BATCH_SIZE)
+    return written
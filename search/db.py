@@ -0,0 +1,120 @@
+# search/db.py
+"""
+Connection helpers outside the Django ORM: libpq parameters for a DATABASES
+alias, and the bounded async connection pool used by the async search views.
+"""
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+from .metrics import add_db
+
+try:  # psycopg 3 is only needed by the async views
+    from psycopg.conninfo import make_conninfo
+    from psycopg_pool import AsyncConnectionPool, PoolTimeout
+except ImportError:  # pragma: no cover
+    make_conninfo = AsyncConnectionPool = None
+
+    class PoolTimeout(Exception):
+        pass
+
+# Django-only OPTIONS keys that are not libpq connection parameters
+_DJANGO_OPTIONS = ("isolation_level", "assume_role", "server_side_binding", "pool")
+
+POOL_DEFAULTS = {
+    "MIN_SIZE": 1,
+    "MAX_SIZE": 10,
+    "TIMEOUT": 5.0,
+    "MAX_IDLE": 300.0,
+    "STATEMENT_TIMEOUT_MS": 0,
+    # DATABASES alias the pool connects to, e.g. a read replica
+    "ALIAS": "default",
+}
+
+_pool = None
+_pool_lock = None
+
+
+def libpq_params(alias="default"):
+    """psycopg connect() keyword arguments for a DATABASES alias."""
+    s = connections[alias].settings_dict
+    params = {
+        "dbname": s["NAME"],
+        "user": s["USER"],
+        "password": s["PASSWORD"],
+        "host": s["HOST"],
+        "port": s["PORT"],
+    }
+    params.update({k: v for k, v in s.get("OPTIONS", {}).items() if k not in _DJANGO_OPTIONS})
+    return {k: v for k, v in params.items() if v not in (None, "")}
+
+
+def pool_settings():
+    return {**POOL_DEFAULTS, **getattr(settings, "SEARCH_ASYNC_POOL", {})}
+
+
+async def get_pool():
+    """The process-wide AsyncConnectionPool, opened on first use inside the running loop."""
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            if AsyncConnectionPool is None:
+                raise ImproperlyConfigured(
+                    "Async search views need psycopg 3 with the pool extra: "
+                    "pip install 'psycopg[binary,pool]'"
+                )
+            conf = pool_settings()
+            params = libpq_params(conf["ALIAS"])
+            if conf["STATEMENT_TIMEOUT_MS"]:
+                params["options"] = f"-c statement_timeout={int(conf['STATEMENT_TIMEOUT_MS'])}"
+            pool = AsyncConnectionPool(
+                make_conninfo(**params),
+                min_size=conf["MIN_SIZE"],
+                max_size=conf["MAX_SIZE"],
+                timeout=conf["TIMEOUT"],
+                max_idle=conf["MAX_IDLE"],
+                # search queries are read-only single statements
+                kwargs={"autocommit": True},
+                open=False,
+            )
+            await pool.open()
+            _pool = pool
+    return _pool
+
+
+async def close_pool():
+    """Close the pool; the next get_pool() opens a new one in the then running loop."""
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+
+
+async def fetch_all(sql, params=(), threshold=None):
+    """
+    Run one query on a pooled connection and return all rows as tuples. With a
+    `threshold`, the query runs in a transaction where pg_trgm's `%` operator
+    matches at that similarity (the pool's connections are autocommit, so the
+    setting ends with the query).
+    """
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        t0 = time.perf_counter()
+        if threshold is None:
+            cursor = await conn.execute(sql, params)
+            rows = await cursor.fetchall()
+        else:
+            async with conn.transaction():
+                await conn.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)",
+                                   [str(threshold)])
+                cursor = await conn.execute(sql, params)
+                rows = await cursor.fetchall()
+        add_db(time.perf_counter() - t0)
+        return rows
@@ -0,0 +1,123 @@
+# search/engines.py
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .catalog import get_catalog_version
+from .models import Medicine
+
+logger = logging.getLogger(__name__)
+
+DATABASE = 'database'   # run the ORM query against PostgreSQL
+MEMORY = 'memory'       # answer from an in-process index, hydrate rows by pk
+FUSED = 'fused'         # unified search: per-index candidate queries + rank fusion (search/fusion.py)
+PARTITIONED = 'partitioned'  # per-initial partitions of the search projection (search/partitions.py)
+PREPARED = 'prepared'   # fixed SQL as server-side prepared statements (search/prepared.py)
+SYMSPELL = 'symspell'   # fuzzy: correct the query's words, then prefix/full-text search (search/spelling.py)
+
+ENGINES = (DATABASE, MEMORY, FUSED, PARTITIONED, PREPARED, SYMSPELL)
+
+
+def engine_for(mode):
+    """Configured backend for a search mode (settings.SEARCH_ENGINES), defaults to the database."""
+    return getattr(settings, 'SEARCH_ENGINES', {}).get(mode, DATABASE)
+
+
+def memory_indexes():
+    """In-process indexes keyed by the search mode they serve."""
+    from .prefix_index import prefix_index
+    from .trigram_index import trigram_index
+    return {'prefix': prefix_index, 'substring': trigram_index, 'fuzzy': trigram_index}
+
+
+class CatalogIndex:
+    """
+    Base for in-process indexes over Medicine that follow the catalog version.
+
+    Subclasses implement `load()` returning an immutable snapshot; it is swapped in
+    as one object so readers never see a half-built index.
+    """
+    empty = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = (self.empty, None)
+
+    def load(self):
+        raise NotImplementedError
+
+    @property
+    def version(self):
+        return self._data[1]
+
+    @property
+    def snapshot(self):
+        self.ensure_fresh()
+        return self._data[0]
+
+    def build(self, version=None):
+        if version is None:
+            version = get_catalog_version()
+        self._data = (self.load(), version)
+
+    def refresh(self, **kwargs):
+        # catalog_updated receiver: drop the data, the next lookup rebuilds it
+        self._data = (self.empty, None)
+
+    def ensure_fresh(self):
+        version = get_catalog_version()
+        if self._data[1] == version:
+            return
+        with self._lock:
+            if self._data[1] != version:
+                self.build(version)
+
+
+def hydrate(ids):
+    """Fetch Medicine rows for `ids`, keeping the order of `ids`."""
+    if not ids:
+        return []
+    rows = Medicine.objects.in_bulk(ids)
+    return [rows[i] for i in ids if i in rows]
+
+
+def hydrate_rows(ids, fields):
+    """`values_list(*fields)` tuples for `ids`, in the order of `ids`, without model instances."""
+    if not ids:
+        return []
+    if 'id' in fields:
+        pk_at, columns = fields.index('id'), fields
+    else:
+        pk_at, columns = len(fields), [*fields, 'id']
+    rows = {row[pk_at]: row[:len(fields)]
+            for row in Medicine.objects.filter(pk__in=ids).values_list(*columns)}
+    return [rows[i] for i in ids if i in rows]
+
+
+def warm_engines():
+    """Build every in-memory index that is enabled in settings; called once per worker at startup."""
+    for mode, index in memory_indexes().items():
+        if engine_for(mode) != MEMORY:
+            continue
+        try:
+            index.ensure_fresh()
+            logger.info("search: %s index loaded (%d names)", mode, len(index))
+        except DatabaseError:
+            # DB not reachable yet (first deploy, migrations pending); the first request builds it
+            logger.warning("search: could not warm %s index, will build lazily", mode, exc_info=True)
+    from .spelling import spell_index, spelling_enabled
+    if spelling_enabled():
+        try:
+            spell_index.ensure_fresh()
+            logger.info("search: spelling dictionary loaded (%d terms)", len(spell_index))
+        except DatabaseError:
+            logger.warning("search: could not warm spelling dictionary, will build lazily", exc_info=True)
+
+
+def connect_refresh_hooks():
+    from .catalog import catalog_updated
+    from .spelling import spell_index
+    for index in [*memory_indexes().values(), spell_index]:
+        catalog_updated.connect(index.refresh, weak=False, dispatch_uid=f'search-refresh-{id(index)}')
@@ -0,0 +1,176 @@
+# search/facets.py
+"""
+Filters and facet counts shared by the search endpoints.
+
+Filters come from the query string and are pushed into each mode's SQL as one
+extra WHERE clause:
+
+    manufacturer=Cipla,Sun Pharma   type=allopathy   min_price=10   max_price=250
+    hide_discontinued=1             in_stock=1
+
+With `facets=1` the endpoints also count the whole matched set (not just the
+returned page) by manufacturer, type, price bucket, availability and
+discontinued status. All facets come from one `GROUPING SETS` aggregate over
+the mode's own match query, so it costs one extra scan of the matches and not
+one query per facet.
+
+Engines that rank a bounded candidate set instead of a match query (fused
+unified, symspell fuzzy) count the first MAX_CANDIDATES ids they return, so
+the facets describe the rows the engine can actually return.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework import serializers
+
+from .models import Medicine
+from .replicas import read_connection
+
+DEFAULTS = {
+    "PRICE_BUCKETS": [0, 50, 100, 250, 500, 1000],
+    "MAX_VALUES": 20,
+    "MAX_CANDIDATES": 1000,
+}
+
+_TRUE = ('1', 'true', 'yes', 'on')
+
+# facet name -> column of the matched rows
+FACET_COLUMNS = {
+    'manufacturer': 'manufacturer_name',
+    'type': 'type',
+    'price': 'price_bucket',
+    'available': 'available',
+    'is_discontinued': 'is_discontinued',
+}
+
+
+def facet_settings():
+    return {**DEFAULTS, **getattr(settings, "SEARCH_FACETS", {})}
+
+
+def flag(value):
+    return str(value).strip().lower() in _TRUE
+
+
+def _values(params, name):
+    # repeated (?type=a&type=b) or comma separated (?type=a,b)
+    raw = params.getlist(name) if hasattr(params, 'getlist') else [params.get(name) or '']
+    return sorted({v.strip() for item in raw for v in item.split(',') if v.strip()})
+
+
+def _price(params, name):
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        return str(Decimal(raw))
+    except InvalidOperation:
+        raise serializers.ValidationError({name: 'A number is required.'})
+
+
+def parse_filters(params):
+    """Normalized filters from query params; only the ones given, in a stable (cache key) form."""
+    filters = {}
+    for name in ('manufacturer', 'type'):
+        values = _values(params, name)
+        if values:
+            filters[name] = values
+    for name in ('min_price', 'max_price'):
+        value = _price(params, name)
+        if value is not None:
+            filters[name] = value
+    for name in ('hide_discontinued', 'in_stock'):
+        if flag(params.get(name, '')):
+            filters[name] = True
+    return filters
+
+
+def filter_q(filters, prefix=''):
+    """Q for `filters` on Medicine; `prefix` ('medicine__') when filtering a related model."""
+    q = Q()
+    if not filters:
+        return q
+    if 'manufacturer' in filters:
+        q &= Q(**{f'{prefix}manufacturer_name__in': filters['manufacturer']})
+    if 'type' in filters:
+        q &= Q(**{f'{prefix}type__in': filters['type']})
+    if 'min_price' in filters:
+        q &= Q(**{f'{prefix}price__gte': Decimal(filters['min_price'])})
+    if 'max_price' in filters:
+        q &= Q(**{f'{prefix}price__lte': Decimal(filters['max_price'])})
+    if filters.get('hide_discontinued'):
+        q &= Q(**{f'{prefix}is_discontinued': False})
+    if filters.get('in_stock'):
+        q &= Q(**{f'{prefix}available': True})
+    return q
+
+
+def candidate_facets(ids):
+    """facet_counts() over the ids a candidate-set engine returned (at most MAX_CANDIDATES)."""
+    return facet_counts(Medicine.objects.filter(pk__in=ids))
+
+
+def _bucket_labels(edges):
+    # width_bucket(): 0 below the first edge, i for [edges[i-1], edges[i]), len(edges) above the last
+    labels = {0: f"<{edges[0]}"}
+    for i in range(1, len(edges)):
+        labels[i] = f"{edges[i - 1]}-{edges[i]}"
+    labels[len(edges)] = f"{edges[-1]}+"
+    return labels
+
+
+def facet_counts(matches):
+    """
+    Facet counts over a Medicine queryset of matches (unsliced, filters applied),
+    in a single aggregate query:
+
+        {"total": 120, "manufacturer": [{"value": "Cipla Ltd", "count": 14}, ...],
+         "type": [...], "price": [{"value": "50-100", "count": 31}, ...],
+         "available": [...], "is_discontinued": [...]}
+    """
+    conf = facet_settings()
+    edges = sorted(conf["PRICE_BUCKETS"])
+    inner_sql, inner_params = (matches.order_by()
+                               .values('manufacturer_name', 'type', 'price', 'available', 'is_discontinued')
+                               .query.sql_with_params())
+    names = list(FACET_COLUMNS)
+    columns = [FACET_COLUMNS[n] for n in names]
+    sql = f"""
+        SELECT GROUPING({', '.join(columns)}), {', '.join(columns)}, count(*)
+        FROM (
+            SELECT manufacturer_name, type, available, is_discontinued,
+                   width_bucket(price, %s::numeric[]) AS price_bucket
+            FROM ({inner_sql}) matched
+        ) m
+        GROUP BY GROUPING SETS ({', '.join(f'({c})' for c in columns)}, ())
+    """
+    # GROUPING() sets a bit per column left out of the row's grouping set, first column highest
+    all_bits = (1 << len(columns)) - 1
+    by_grouping = {all_bits - (1 << (len(columns) - 1 - i)): i for i in range(len(columns))}
+
+    with read_connection().cursor() as cursor:
+        cursor.execute(sql, [edges, *inner_params])
+        rows = cursor.fetchall()
+
+    labels = _bucket_labels(edges)
+    result = {'total': 0, **{name: [] for name in names}}
+    for grouping, *values, count in rows:
+        if grouping == all_bits:
+            result['total'] = count
+            continue
+        i = by_grouping[grouping]
+        value = values[i]
+        if names[i] == 'price' and value is not None:
+            value = labels[value]
+        result[names[i]].append({'value': value, 'count': count})
+
+    for name in names:
+        if name == 'price':
+            order = {label: i for i, label in labels.items()}
+            result[name].sort(key=lambda f: order.get(f['value'], len(order)))
+        else:
+            result[name].sort(key=lambda f: (-f['count'], str(f['value'])))
+    result['manufacturer'] = result['manufacturer'][:conf["MAX_VALUES"]]
+    result['type'] = result['type'][:conf["MAX_VALUES"]]
+    return result
@@ -0,0 +1,154 @@
+# search/fusion.py
+"""
+Unified search as independent, index-friendly candidate queries plus rank fusion.
+
+Each source is a bounded top-K query that one index can answer on its own:
+
+    prefix    lower(name) LIKE 'q%'      -> lower(name) text_pattern_ops btree
+    fulltext  name_tsv @@ query          -> name_tsv GIN
+    substring name ILIKE '%q%'           -> name gin_trgm_ops GIN
+    trigram   name % q                   -> name gin_trgm_ops GIN
+    exact     lower(name) = q            -> lower(name) hash index
+
+search/router.py picks which sources a query needs; by default all but exact.
+The candidate lists are merged in Python with reciprocal rank fusion, on top of
+boosts that keep the old priority: exact > prefix > full-text rank > similarity.
+Only the final `limit` ids are hydrated into Medicine rows.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.db.models.functions import Lower
+
+from .engines import hydrate
+from .facets import filter_q
+from .models import Medicine
+from .replicas import similarity_threshold
+
+RRF_K = 60
+# per-source weight in the RRF sum: a full-text hit outranks a pure similarity hit
+SOURCE_WEIGHTS = {'exact': 1.0, 'prefix': 1.0, 'fulltext': 1.0, 'substring': 0.75, 'trigram': 0.5}
+ALL_SOURCES = ('prefix', 'fulltext', 'substring', 'trigram')
+# added on top of the RRF sum (which stays < 0.05), so they dominate the ordering
+EXACT_BOOST = 1.0
+PREFIX_BOOST = 0.5
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'SEARCH_FUSION_WORKERS', 4),
+            thread_name_prefix='search-fusion')
+    return _executor
+
+
+def exact_candidates(q, k, filters=None):
+    # lower(name) = q on the hash index
+    return list(Medicine.objects
+                .annotate(lower_name=Lower('name'))
+                .filter(lower_name=q.lower())
+                .filter(filter_q(filters))
+                .values_list('id', 'name')[:k])
+
+
+def prefix_candidates(q, k, filters=None):
+    return list(Medicine.objects
+                .annotate(lower_name=Lower('name'))
+                .filter(lower_name__startswith=q.lower())
+                .filter(filter_q(filters))
+                .order_by('lower_name')
+                .values_list('id', 'name')[:k])
+
+
+def fulltext_candidates(q, k, filters=None):
+    query = SearchQuery(q, config='simple')
+    return list(Medicine.objects
+                .annotate(rank=SearchRank(F('name_tsv'), query))
+                .filter(name_tsv=query)
+                .filter(filter_q(filters))
+                .order_by('-rank')
+                .values_list('id', 'name')[:k])
+
+
+def substring_candidates(q, k, filters=None):
+    # mid-word hits ("cetamol") that neither a prefix nor a whole-word match finds
+    return list(Medicine.objects
+                .filter(name__icontains=q)
+                .filter(filter_q(filters))
+                .annotate(sim=TrigramSimilarity('name', q))
+                .order_by('-sim', 'name')
+                .values_list('id', 'name')[:k])
+
+
+def trigram_candidates(q, k, threshold, filters=None):
+    # `%` only uses the GIN index at the configured threshold, so set it for the query's transaction
+    with similarity_threshold(threshold):
+        return list(Medicine.objects
+                    .filter(name__trigram_similar=q)
+                    .filter(filter_q(filters))
+                    .annotate(sim=TrigramSimilarity('name', q))
+                    .order_by('-sim', 'name')
+                    .values_list('id', 'name')[:k])
+
+
+def _run_source(fn, *args):
+    # runs on a pool thread: Django connections are per-thread, drop stale ones first
+    close_old_connections()
+    return fn(*args)
+
+
+def gather_candidates(q, k, threshold, filters=None, sources=ALL_SOURCES):
+    """Run the candidate queries for `sources`, concurrently when each can get its own connection."""
+    queries = {
+        'exact': (exact_candidates, q, k, filters),
+        'prefix': (prefix_candidates, q, k, filters),
+        'fulltext': (fulltext_candidates, q, k, filters),
+        'substring': (substring_candidates, q, k, filters),
+        'trigram': (trigram_candidates, q, k, threshold, filters),
+    }
+    queries = {name: queries[name] for name in sources}
+    parallel = getattr(settings, 'SEARCH_FUSION_PARALLEL', True)
+    if not parallel or len(queries) < 2 or connection.in_atomic_block:
+        # inside a transaction (e.g. tests) other connections cannot see our rows
+        return {name: fn(*args) for name, (fn, *args) in queries.items()}
+    executor = _get_executor()
+    # each task runs in a copy of this context so per-request metrics see its queries
+    futures = {name: executor.submit(copy_context().run, _run_source, fn, *args)
+               for name, (fn, *args) in queries.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def fuse(q, candidates, limit):
+    """Reciprocal rank fusion over `candidates` ({source: [(id, name), ...]}); returns ranked ids."""
+    lower_q = q.lower()
+    scores, names = {}, {}
+    for source, rows in candidates.items():
+        weight = SOURCE_WEIGHTS[source]
+        for rank, (pk, name) in enumerate(rows, start=1):
+            scores[pk] = scores.get(pk, 0.0) + weight / (RRF_K + rank)
+            names[pk] = name
+    for pk, name in names.items():
+        lower_name = name.lower()
+        if lower_name == lower_q:
+            scores[pk] += EXACT_BOOST
+        elif lower_name.startswith(lower_q):
+            scores[pk] += PREFIX_BOOST
+    # ties: shorter names first, like the original ordering on Length('name')
+    ranked = sorted(scores, key=lambda pk: (-scores[pk], len(names[pk]), names[pk]))
+    return ranked[:limit]
+
+
+def fused_ids(q, limit, threshold=0.2, filters=None):
+    k = max(limit, getattr(settings, 'SEARCH_FUSION_CANDIDATES', 50))
+    return fuse(q, gather_candidates(q, k, threshold, filters), limit)
+
+
+def fused_search(q, limit, threshold=0.2):
+    return hydrate(fused_ids(q, limit, threshold))
@@ -0,0 +1,63 @@
+# search/http_cache.py
+"""
+HTTP validators for search responses.
+
+Results only change when import_data bumps the catalog version, so a response
+is identified by (catalog version, mode, normalized query, params). That tuple
+is hashed into the ETag before any search runs. A request whose If-None-Match
+carries it gets a 304 straight away, with no search query and no serialization.
+The only database read is the catalog version, itself cached for
+SEARCH_CATALOG_VERSION_TTL seconds. `Cache-Control: public, max-age=N` comes
+from SEARCH_HTTP_CACHE["MAX_AGE"][mode], so CDNs and browsers can also skip
+the round trip for a while. A re-import changes every ETag.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+from .cache import normalize_query
+from .catalog import get_catalog_version
+
+DEFAULTS = {
+    "ENABLED": True,
+    "DEFAULT_MAX_AGE": 60,
+    "MAX_AGE": {},
+}
+
+
+def http_cache_settings():
+    return {**DEFAULTS, **getattr(settings, "SEARCH_HTTP_CACHE", {})}
+
+
+def etag_for(mode, q, params):
+    raw = json.dumps([mode, normalize_query(q, mode), sorted(params.items())], ensure_ascii=False, default=str)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+    return quote_etag(f"v{get_catalog_version()}-{digest}")
+
+
+def conditional(request, mode, q, params):
+    """
+    (etag, response): a 304 response when the client already holds this result,
+    else None. etag is None when HTTP caching is off.
+    """
+    if not http_cache_settings()["ENABLED"]:
+        return None, None
+    etag = etag_for(mode, q, params)
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        add_headers(response, mode, etag)
+    return etag, response
+
+
+def add_headers(response, mode, etag):
+    if etag is None:
+        return response
+    conf = http_cache_settings()
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=conf["MAX_AGE"].get(mode, conf["DEFAULT_MAX_AGE"]))
+    # JSON and the browsable API share a URL
+    patch_vary_headers(response, ['Accept'])
+    return response
@@ -0,0 +1,159 @@
+# search/loader.py
+"""
+Helpers for loading the DB_Dataset letter files.
+
+`iter_records` stream-parses a JSON array file one record at a time, so a file
+never has to fit in memory. The COPY helpers are used by `import_data --fast`;
+`copy_file` runs inside pool worker processes and only depends on psycopg2,
+not on a configured Django.
+"""
+import hashlib
+import json
+import time
+
+from .compositions import composition_key
+
+# column order shared by the ORM path, the COPY stream and the staging table
+MEDICINE_COLUMNS = [
+    'id', 'sku_id', 'name', 'manufacturer_name', 'marketer_name', 'type', 'price',
+    'pack_size_label', 'short_composition', 'is_discontinued', 'available',
+]
+
+# what import_data writes: the dataset fields, the composition group and their hash (last)
+LOAD_COLUMNS = MEDICINE_COLUMNS + ['composition_key', 'content_hash']
+
+STAGING_TABLE = 'search_medicine_staging'
+
+# same expression as the tsvectorupdate trigger (schema.sql): name weight A, composition weight B
+NAME_TSV_SQL = (
+    "setweight(to_tsvector('simple', coalesce({t}name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce({t}short_composition, '')), 'B')"
+)
+
+
+def record_row(record):
+    """Values for MEDICINE_COLUMNS from one dataset record, with import_data's defaults."""
+    return [
+        _str_or_none(record.get("id")),
+        _str_or_none(record.get("sku_id")),
+        record.get("name", ""),
+        record.get("manufacturer_name"),
+        record.get("marketer_name"),
+        record.get("type"),
+        record.get("price") or None,
+        record.get("pack_size_label"),
+        record.get("short_composition"),
+        record.get("is_discontinued", False),
+        record.get("available", True),
+    ]
+
+
+def record_hash(row):
+    """Stable md5 over a record_row(); equal hashes mean nothing searchable or displayed changed."""
+    raw = json.dumps(row, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def load_row(record):
+    """Values for LOAD_COLUMNS."""
+    row = record_row(record)
+    return row + [composition_key(row[8]), record_hash(row)]
+
+
+def _str_or_none(value):
+    return None if value is None else str(value)
+
+
+def iter_records(path, chunk_size=1 << 16):
+    """Yield the elements of a top-level JSON array file without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof, started = '', 0, False, False
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            # skip whitespace and separators
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf):
+                if not started:
+                    if buf[pos] != '[':
+                        raise ValueError(f"{path}: expected a JSON array")
+                    started = True
+                    pos += 1
+                    continue
+                if buf[pos] == ']':
+                    return
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    yield obj
+                    pos = end
+                    continue
+            elif eof:
+                if started:
+                    raise ValueError(f"{path}: unterminated JSON array")
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+
+
+def _copy_value(value):
+    # PostgreSQL COPY text format
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def copy_line(row):
+    return '\t'.join(_copy_value(v) for v in row) + '\n'
+
+
+def copy_file(path, conn_params, chunk_rows=20000):
+    """
+    Stream one letter file into the staging table with COPY FROM STDIN.
+
+    Runs in a pool worker with its own connection. Returns
+    (path, rows, parse_seconds, copy_seconds).
+    """
+    import io
+    import psycopg2
+
+    sql = f"COPY {STAGING_TABLE} ({', '.join(LOAD_COLUMNS)}) FROM STDIN"
+    rows = 0
+    parse_s = copy_s = 0.0
+    conn = psycopg2.connect(**conn_params)
+    try:
+        with conn, conn.cursor() as cursor:
+            buf, pending = io.StringIO(), 0
+            t0 = time.perf_counter()
+            for record in iter_records(path):
+                buf.write(copy_line(load_row(record)))
+                pending += 1
+                if pending >= chunk_rows:
+                    t1 = time.perf_counter()
+                    parse_s += t1 - t0
+                    buf.seek(0)
+                    cursor.copy_expert(sql, buf)
+                    t0 = time.perf_counter()
+                    copy_s += t0 - t1
+                    rows += pending
+                    buf, pending = io.StringIO(), 0
+            t1 = time.perf_counter()
+            parse_s += t1 - t0
+            if pending:
+                buf.seek(0)
+                cursor.copy_expert(sql, buf)
+                rows += pending
+            copy_s += time.perf_counter() - t1
+    finally:
+        conn.close()
+    return path, rows, parse_s, copy_s
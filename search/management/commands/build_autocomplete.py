@@ -0,0 +1,40 @@
+# search/management/commands/build_autocomplete.py
+import time
+from django.core.management.base import BaseCommand, CommandError
+from search import autocomplete
+from search.catalog import read_catalog_version
+from search.models import Completion
+
+class Command(BaseCommand):
+    help = "Precompute the top-K names per name prefix for /api/search/autocomplete (run after import_data)."
+
+    def add_arguments(self, parser):
+        conf = autocomplete.autocomplete_settings()
+        weights = conf['WEIGHTS']
+        parser.add_argument('--max-prefix', type=int, default=conf['MAX_PREFIX'],
+                            help='Longest prefix (characters) to precompute')
+        parser.add_argument('--top-k', type=int, default=conf['TOP_K'], help='Names stored per prefix')
+        parser.add_argument('--available-weight', type=float, default=weights['available'])
+        parser.add_argument('--not-discontinued-weight', type=float, default=weights['not_discontinued'])
+        parser.add_argument('--shortness-weight', type=float, default=weights['shortness'],
+                            help='Score subtracted per character of the name')
+
+    def handle(self, *args, **options):
+        max_prefix, top_k = options['max_prefix'], options['top_k']
+        max_len = Completion._meta.get_field('prefix').max_length
+        if not 1 <= max_prefix <= max_len:
+            raise CommandError(f"--max-prefix must be between 1 and {max_len}")
+        if top_k < 1:
+            raise CommandError("--top-k must be positive")
+
+        version = read_catalog_version()
+        weights = {
+            'available': options['available_weight'],
+            'not_discontinued': options['not_discontinued_weight'],
+            'shortness': options['shortness_weight'],
+        }
+        t0 = time.perf_counter()
+        count = autocomplete.build(version, max_prefix, top_k, weights)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Stored top {top_k} for {count} prefixes (up to {max_prefix} chars, catalog version {version}) "
+            f"in {time.perf_counter() - t0:.1f}s."))
@@ -0,0 +1,22 @@
+# search/management/commands/export_snapshot.py
+import time
+from django.core.management.base import BaseCommand, CommandError
+from search.catalog import read_catalog_version
+from search.snapshot import export_snapshot, snapshot_path
+
+class Command(BaseCommand):
+    help = "Write the memory-mapped catalog snapshot (search/snapshot.py) for the current catalog version."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=snapshot_path(),
+                            help='Snapshot file (default: SEARCH_SNAPSHOT_PATH)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path:
+            raise CommandError("No snapshot path: pass --path or set SEARCH_SNAPSHOT_PATH")
+        version = read_catalog_version()
+        t0 = time.perf_counter()
+        count = export_snapshot(path, version)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Wrote {count} rows to {path} (catalog version {version}) in {time.perf_counter() - t0:.1f}s."))
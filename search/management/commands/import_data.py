@@ -1,8 +1,21 @@
 import os
-import json
-from django.core.management.base import BaseCommand
-from search.models import Medicine
-from django.db import transaction
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand, CommandError
+from search.models import Medicine, MedicineIngredient, MedicinePhonetic
+from django.db import connection, transaction
+from search.catalog import bump_catalog_version, read_catalog_version
+from search.compositions import sync_ingredients
+from search.phonetic import sync_phonetic_keys
+from search.db import libpq_params
+from search.snapshot import export_snapshot, snapshot_path
+from search.spelling import rebuild_vocabulary
+from search.partitions import partition_key, projection_exists, rebuild_partitions, sync_deferred
+from search.loader import (
+    LOAD_COLUMNS, NAME_TSV_SQL, STAGING_TABLE, copy_file, iter_records, load_row,
+)
+
+BATCH_SIZE = 5000
 
 class Command(BaseCommand):
     help = "Import medicines from JSON files into PostgreSQL"
@@ -14,44 +27,326 @@ class Command(BaseCommand):
             help="Path to folder containing JSON files",
             required=True,
         )
+        parser.add_argument(
+            "--fast",
+            action="store_true",
+            help="COPY into a staging table from parallel workers, then merge set-wise; "
+                 "searches keep running (writes wait for the merge)",
+        )
+        parser.add_argument(
+            "--drop-indexes",
+            action="store_true",
+            help="With --fast, drop the secondary indexes for the merge and rebuild them after. "
+                 "Faster for a full reload, but the table is locked against reads until the "
+                 "rebuild commits: needs a maintenance window",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker processes for --fast (one file per worker)",
+        )
+        parser.add_argument(
+            "--delta",
+            action="store_true",
+            help="Sync against the stored rows: upsert changed/new records (see --prune for missing ones)",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="With --delta, delete stored rows missing from the dump (the dump must be complete)",
+        )
+        parser.add_argument(
+            "--max-delete-ratio",
+            type=float,
+            default=0.1,
+            help="With --prune, refuse to delete more than this fraction of the stored rows (default 0.1)",
+        )
+        parser.add_argument(
+            "--snapshot",
+            nargs="?",
+            const=snapshot_path() or "",
+            help="Also write the memory-mapped catalog snapshot, stamped with this import's version "
+                 "(default path: SEARCH_SNAPSHOT_PATH)",
+        )
 
     def handle(self, *args, **options):
         path = options["path"]
+        if options["drop_indexes"] and not options["fast"]:
+            raise CommandError("--drop-indexes only applies to --fast")
 
         if not os.path.exists(path):
             self.stderr.write(self.style.ERROR(f"Path {path} does not exist"))
             return
 
-        files = [f for f in os.listdir(path) if f.endswith(".json")]
+        files = sorted(f for f in os.listdir(path) if f.endswith(".json"))
         self.stdout.write(f"Found {len(files)} JSON files.")
+        file_paths = [os.path.join(path, f) for f in files]
+        # the partitioned search projection (search/partitions.py), if migrated
+        partitioned = projection_exists()
 
-        for file in files:
-            file_path = os.path.join(path, file)
-            self.stdout.write(f"Importing {file_path} ...")
-
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            # bulk insert in transactions for speed
-            objs = []
-            for record in data:
-                objs.append(
-                    Medicine(
-                        id=record.get("id"),
-                        sku_id=record.get("sku_id"),
-                        name=record.get("name", ""),
-                        manufacturer_name=record.get("manufacturer_name"),
-                        marketer_name=record.get("marketer_name"),
-                        type=record.get("type"),
-                        price=record.get("price") or None,
-                        pack_size_label=record.get("pack_size_label"),
-                        short_composition=record.get("short_composition"),
-                        is_discontinued=record.get("is_discontinued", False),
-                        available=record.get("available", True),
-                    )
+        if options["delta"]:
+            # few rows change: the projection trigger keeps the partitions in step row by row
+            if not self.delta_sync(file_paths, options["prune"], options["max_delete_ratio"]):
+                self.stdout.write(self.style.SUCCESS("✅ Catalog already up to date."))
+                return
+        elif options["fast"]:
+            keys = self.fast_import(file_paths, options["workers"], partitioned, options["drop_indexes"])
+            if partitioned:
+                self.rebuild_partitions(keys)
+        elif partitioned:
+            keys = set()
+            with sync_deferred():
+                for file_path in file_paths:
+                    keys |= self.import_file(file_path)
+            self.build_ingredients()
+            self.build_phonetic_keys()
+            self.rebuild_partitions(keys)
+        else:
+            for file_path in file_paths:
+                self.import_file(file_path)
+            self.build_ingredients()
+            self.build_phonetic_keys()
+
+        # every path: words come and go with any row, and one set-wise pass over the table is cheap
+        self.build_vocabulary()
+
+        # new catalog version -> in-memory indexes in every worker rebuild on their next lookup
+        if options["snapshot"] is not None:
+            # written before the bump, so workers that see the new version find its snapshot
+            self.write_snapshot(options["snapshot"], read_catalog_version() + 1)
+        version = bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"✅ Import completed (catalog version {version})."))
+
+    def import_file(self, file_path):
+        """Load one file; returns the search partitions its names fall in."""
+        self.stdout.write(f"Importing {file_path} ...")
+
+        # stream records and bulk insert in batches, so a file never sits in memory whole
+        objs = []
+        keys = set()
+        with transaction.atomic():
+            for record in iter_records(file_path):
+                objs.append(Medicine(**dict(zip(LOAD_COLUMNS, load_row(record)))))
+                keys.add(partition_key(objs[-1].name))
+                if len(objs) >= BATCH_SIZE:
+                    Medicine.objects.bulk_create(objs, ignore_conflicts=True)
+                    objs = []
+            if objs:
+                Medicine.objects.bulk_create(objs, ignore_conflicts=True)
+        return keys
+
+    def fast_import(self, file_paths, workers, partitioned=False, drop_indexes=False):
+        """
+        COPY + set-wise merge; returns the search partitions of the staged names.
+
+        The merge holds SHARE ROW EXCLUSIVE on the table (for DISABLE TRIGGER),
+        which blocks writers but not searches. `drop_indexes` also drops the
+        secondary indexes, and DROP INDEX takes ACCESS EXCLUSIVE: every read
+        then waits until the indexes are rebuilt and the transaction commits.
+        """
+        table = Medicine._meta.db_table
+        columns = ", ".join(LOAD_COLUMNS)
+
+        # 1) staging table without indexes, triggers or WAL
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+            cursor.execute(
+                f"CREATE UNLOGGED TABLE {STAGING_TABLE} "
+                f"AS SELECT {columns} FROM {table} WITH NO DATA"
+            )
+
+        # 2) stream-parse + COPY, one file per worker process
+        conn_params = libpq_params()
+        connection.close()  # never share the socket with forked workers
+        t0 = time.perf_counter()
+        total = 0
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(file_paths)))) as pool:
+            futures = [pool.submit(copy_file, p, conn_params) for p in file_paths]
+            for future in as_completed(futures):
+                file_path, rows, parse_s, copy_s = future.result()
+                total += rows
+                self.stdout.write(
+                    f"  {os.path.basename(file_path)}: {rows} rows, "
+                    f"parse {self.rate(rows, parse_s)}, copy {self.rate(rows, copy_s)}"
                 )
+        self.stage("load (parallel parse + COPY)", total, time.perf_counter() - t0)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # 3) turn off the per-row tsvector/projection triggers for the bulk merge, and on request
+            # drop the secondary indexes (ACCESS EXCLUSIVE: searches wait for the commit)
+            indexes = []
+            if drop_indexes:
+                cursor.execute(
+                    """
+                    SELECT i.relname, pg_get_indexdef(ix.indexrelid)
+                    FROM pg_index ix JOIN pg_class i ON i.oid = ix.indexrelid
+                    WHERE ix.indrelid = %s::regclass AND NOT ix.indisprimary AND NOT ix.indisunique
+                    """,
+                    [table],
+                )
+                indexes = cursor.fetchall()
+                for name, _ in indexes:
+                    cursor.execute(f'DROP INDEX "{name}"')
+            cursor.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+
+            # 4) merge set-wise, computing name_tsv in the same statement
+            t0 = time.perf_counter()
+            cursor.execute(
+                f"""
+                INSERT INTO {table} ({columns}, name_tsv)
+                SELECT DISTINCT ON (id) {columns}, {NAME_TSV_SQL.format(t='')}
+                FROM {STAGING_TABLE}
+                ORDER BY id
+                ON CONFLICT (id) DO NOTHING
+                """
+            )
+            inserted = cursor.rowcount
+            self.stage("merge + name_tsv", inserted, time.perf_counter() - t0)
+
+            cursor.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+
+            # 5) rebuild dropped indexes in one pass each over the loaded table
+            if indexes:
+                t0 = time.perf_counter()
+                cursor.execute("SET LOCAL maintenance_work_mem = '256MB'")
+                for _, definition in indexes:
+                    cursor.execute(definition)
+                self.stage(f"rebuild {len(indexes)} indexes", inserted, time.perf_counter() - t0)
+
+            keys = set()
+            if partitioned:
+                cursor.execute(f"SELECT DISTINCT search_partition_key(name) FROM {STAGING_TABLE}")
+                keys = {key for key, in cursor.fetchall()}
+            cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+
+        t0 = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {table}")
+        self.stage("analyze", inserted, time.perf_counter() - t0)
+
+        self.build_ingredients()
+        self.build_phonetic_keys()
+        return keys
+
+    def delta_sync(self, file_paths, prune=False, max_delete_ratio=0.1):
+        """
+        Apply only what changed since the last import: compare per-record content
+        hashes with the stored ones and upsert/delete in batches, so unchanged rows
+        never hit the tsvector trigger or the indexes. Returns the number of changes.
+
+        The dump is read twice: once keeping only each record's hash, then again
+        to upsert the changed records in batches, so it is never held in memory.
+        Stored rows missing from the dump are only deleted with `prune`, and not
+        at all when they exceed `max_delete_ratio` of the table (a partial dump).
+        """
+        t0 = time.perf_counter()
+        incoming = {}
+        for row in self.iter_rows(file_paths):
+            # first occurrence wins, like ignore_conflicts in the full import
+            incoming.setdefault(row[0], row[-1])
+        stored = dict(Medicine.objects.values_list("id", "content_hash").iterator(chunk_size=BATCH_SIZE))
+
+        inserts = {pk for pk in incoming if pk not in stored}
+        updates = {pk for pk, content_hash in incoming.items() if pk in stored and stored[pk] != content_hash}
+        missing = [pk for pk in stored if pk not in incoming]
+        self.stdout.write(f"Diffed {len(incoming)} records against {len(stored)} rows "
+                          f"in {time.perf_counter() - t0:.2f}s")
+
+        deletes = []
+        if missing and not prune:
+            self.stdout.write(self.style.WARNING(
+                f"{len(missing)} stored rows are missing from the dump; kept (use --prune to delete them)"))
+        elif missing:
+            if len(missing) > max_delete_ratio * len(stored):
+                raise CommandError(
+                    f"Refusing to delete {len(missing)} of {len(stored)} rows "
+                    f"(more than --max-delete-ratio {max_delete_ratio}); is the dump complete?")
+            deletes = missing
+
+        t0 = time.perf_counter()
+        upserts = inserts | updates
+        with transaction.atomic():
+            # second pass: only the changed records are built into model instances
+            pending = set(upserts)
+            batch = []
+            for row in self.iter_rows(file_paths) if pending else ():
+                if row[0] not in pending:
+                    continue
+                pending.discard(row[0])
+                batch.append(Medicine(**dict(zip(LOAD_COLUMNS, row))))
+                if len(batch) >= BATCH_SIZE or not pending:
+                    Medicine.objects.bulk_create(
+                        batch,
+                        update_conflicts=True,
+                        unique_fields=["id"],
+                        update_fields=LOAD_COLUMNS[1:],
+                    )
+                    batch = []
+                if not pending:
+                    break
+            for start in range(0, len(deletes), BATCH_SIZE):
+                Medicine.objects.filter(id__in=deletes[start:start + BATCH_SIZE]).delete()
+
+            # deleted medicines took their ingredient rows with them (cascade)
+            if MedicineIngredient.objects.exists():
+                written = sync_ingredients(list(upserts))
+            else:
+                # first sync since the ingredient table was added
+                written = sync_ingredients()
+            # same for the phonetic keys of the names
+            if MedicinePhonetic.objects.exists():
+                keyed = sync_phonetic_keys(list(upserts))
+            else:
+                keyed = sync_phonetic_keys()
+
+        changed = len(upserts) + len(deletes)
+        self.stdout.write(
+            f"Delta sync: {len(inserts)} inserted, {len(updates)} updated, {len(deletes)} deleted, "
+            f"{len(missing) - len(deletes)} missing kept, {len(incoming) - len(upserts)} unchanged, "
+            f"{written} ingredient rows, {keyed} phonetic keys "
+            f"({time.perf_counter() - t0:.2f}s)"
+        )
+        return changed
+
+    def iter_rows(self, file_paths):
+        for file_path in file_paths:
+            for record in iter_records(file_path):
+                yield load_row(record)
+
+    def build_ingredients(self):
+        t0 = time.perf_counter()
+        written = sync_ingredients()
+        self.stage("ingredients", written, time.perf_counter() - t0)
+
+    def build_phonetic_keys(self):
+        t0 = time.perf_counter()
+        written = sync_phonetic_keys()
+        self.stage("phonetic keys", written, time.perf_counter() - t0)
+
+    def build_vocabulary(self):
+        # spelling dictionary (search/spelling.py); workers reload it with the new catalog version
+        t0 = time.perf_counter()
+        terms = rebuild_vocabulary()
+        self.stage("spelling vocabulary", terms, time.perf_counter() - t0)
+
+    def write_snapshot(self, path, version):
+        if not path:
+            self.stderr.write(self.style.ERROR("No snapshot path: pass --snapshot PATH or set SEARCH_SNAPSHOT_PATH"))
+            return
+        t0 = time.perf_counter()
+        rows = export_snapshot(path, version)
+        self.stage(f"snapshot {path}", rows, time.perf_counter() - t0)
+
+    def rebuild_partitions(self, keys):
+        # only the partitions whose letters were loaded; each is reloaded and reindexed off to the side
+        t0 = time.perf_counter()
+        rows = rebuild_partitions(keys)
+        self.stage(f"search partitions {','.join(rows) or '-'}", sum(rows.values()),
+                   time.perf_counter() - t0)
 
-            with transaction.atomic():
-                Medicine.objects.bulk_create(objs, ignore_conflicts=True, batch_size=5000)
+    def rate(self, rows, seconds):
+        return f"{rows / seconds:,.0f} rows/s" if seconds > 0 else "n/a"
 
-        self.stdout.write(self.style.SUCCESS("✅ Import completed."))
+    def stage(self, label, rows, seconds):
+        self.stdout.write(f"{label}: {rows} rows in {seconds:.2f}s ({self.rate(rows, seconds)})")
@@ -1,10 +1,12 @@
 # search/management/commands/run_benchmark.py
-import json, time
-from django.core.management.base import BaseCommand
-from django.conf import settings
-from django.db.models import F
-from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity,SearchVector
-from search.models import Medicine
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from search import benchmark
+from search.engines import ENGINES, engine_for
 
 class Command(BaseCommand):
     help = "Run benchmark queries JSON and produce submission.json (format required)."
@@ -13,61 +15,98 @@ class Command(BaseCommand):
         parser.add_argument('--queries', default='dataset/benchmark_queries.json')
         parser.add_argument('--out', default='dataset/submission.json')
         parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--engine', choices=ENGINES, default=None,
+                            help='Force a backend for every mode (default: settings.SEARCH_ENGINES); '
+                                 'a mode without that engine runs its database query')
+        parser.add_argument('--warmups', type=int, default=2, help='Untimed runs per query')
+        parser.add_argument('--repeats', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--explain', action='store_true',
+                            help='Capture EXPLAIN (ANALYZE, BUFFERS) for each database query')
+        parser.add_argument('--http', metavar='BASE_URL', default=None,
+                            help='Also load-test the HTTP endpoints, e.g. http://127.0.0.1:8000/api/')
+        parser.add_argument('--concurrency', type=int, default=8, help='Threads for --http')
+        parser.add_argument('--http-requests', type=int, default=50, help='Requests per query for --http')
+        parser.add_argument('--report', default='benchmark_report.json', help='Machine-readable report')
+        parser.add_argument('--baseline', default=None, help='Earlier --report file to compare against')
+        parser.add_argument('--max-regression', type=float, default=0.2,
+                            help='Fail when a mode gets slower than baseline by more than this fraction')
+        parser.add_argument('--gate-metric', choices=['p50', 'p95', 'p99', 'mean'], default='p95')
 
     def handle(self, *args, **options):
         path = options['queries']
         out = options['out']
         limit = options['limit']
+        forced_engine = options['engine']
+        warmups, repeats = options['warmups'], max(1, options['repeats'])
 
-        with open(path, 'r', encoding='utf8') as f:
-            qdoc = json.load(f)
-
-        tests = qdoc.get('tests') or qdoc.get('queries') or []
+        items = benchmark.load_queries(path)
         submission = {"results": {}}
         timings = {}
+        report = {
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                "queries": path,
+                "limit": limit,
+                "warmups": warmups,
+                "repeats": repeats,
+                "engine": forced_engine,
+                "database": connection.vendor,
+            },
+            "queries": {},
+            "modes": {},
+        }
+        mode_samples = defaultdict(list)
 
-        for idx, t in enumerate(tests, start=1):
-            qid = str(t.get('id', idx))
-            qtype = t.get('type')
-            q = t.get('query','').strip()
+        for item in items:
+            qid, qtype, q = item['id'], item.get('type'), item['query']
             if not q:
                 submission["results"][qid] = []
                 continue
 
-            t0 = time.perf_counter()
-            if qtype == 'prefix':
-                qs = Medicine.objects.annotate(lower_name=F('name')).filter(name__istartswith=q)[:limit]
-            elif qtype == 'substring':
-                qs = Medicine.objects.annotate(sim=TrigramSimilarity('name', q)).filter(name__icontains=q).order_by('-sim','name')[:limit]
-            elif qtype == "fulltext":
-                sq = SearchQuery(q)  # ✅ wrap search string in SearchQuery
-                qs = (
-                    Medicine.objects
-                    .annotate(rank=SearchRank(F("name_tsv"), sq))
-                    .filter(name_tsv=sq)                # ✅ correct usage
-                    .order_by("-rank")[:limit]
-                )
-            elif qtype == 'fuzzy':
-                thr =  float(t.get('threshold', 0.3))
-                qs = Medicine.objects.annotate(sim=TrigramSimilarity('name', q)).filter(sim__gte=thr).order_by('-sim','name')[:limit]
-            else:
-                # fallback: substring
-                qs = Medicine.objects.filter(name__icontains=q)[:limit]
-            names = list(qs.values_list('name', flat=True))
-            t1 = time.perf_counter()
-            elapsed_ms = (t1 - t0) * 1000.0
-            timings[qid] = round(elapsed_ms, 2)
-
-            # If duplicated qid already exists, append _dupN
-            base_qid = qid
-            dup = 1
-            while qid in submission['results']:
-                qid = f"{base_qid}_dup{dup}"
-                dup += 1
-
+            engine = forced_engine or engine_for(qtype)
+            names, samples = benchmark.time_query(item, limit, engine, warmups, repeats)
+            stats = benchmark.summarize(samples)
+            mode_samples[qtype].extend(samples)
+            timings[qid] = round(stats['p50'], 2)
             submission['results'][qid] = names
+            report['queries'][qid] = {"type": qtype, "query": q, "engine": engine, "ms": stats, "results": names}
+            if qtype == 'unified':
+                # which router plan answered it, to tune settings.SEARCH_ROUTES
+                report['queries'][qid]['plan'], shape = benchmark.plan_for(q)
+                report['queries'][qid]['shape'] = shape.kind
+            if options['explain']:
+                report['queries'][qid]['explain'] = benchmark.explain(
+                    qtype, q, limit, engine, float(item.get('threshold', 0.3)))
 
-            self.stdout.write(self.style.SUCCESS(f"Query [{qtype}] id={qid} q='{q}' -> {len(names)} rows in {elapsed_ms:.2f} ms"))
+            self.stdout.write(self.style.SUCCESS(
+                f"Query [{qtype}] id={qid} q='{q}' -> {len(names)} rows "
+                f"p50 {stats['p50']:.2f} ms, p95 {stats['p95']:.2f} ms, p99 {stats['p99']:.2f} ms"
+            ))
+
+        plan_samples = defaultdict(list)
+        for qid, entry in report['queries'].items():
+            if 'plan' in entry:
+                plan_samples[entry['plan']].append(entry['ms']['p50'])
+        if plan_samples:
+            report['plans'] = {plan: benchmark.summarize(p50s) for plan, p50s in plan_samples.items()}
+
+        for mode, samples in mode_samples.items():
+            report['modes'][mode] = benchmark.summarize(samples)
+            s = report['modes'][mode]
+            self.stdout.write(f"[{mode}] p50 {s['p50']:.2f} / p95 {s['p95']:.2f} / p99 {s['p99']:.2f} ms, "
+                              f"{s['qps']} q/s over {s['samples']} runs")
+
+        if options['http']:
+            t0 = time.perf_counter()
+            report['http'] = benchmark.http_load(
+                options['http'], items, limit, options['concurrency'], options['http_requests'])
+            self.stdout.write(f"HTTP load ({options['concurrency']} threads) in {time.perf_counter() - t0:.1f}s:")
+            for mode, s in report['http'].items():
+                if s['samples']:
+                    self.stdout.write(f"  [{mode}] p50 {s['p50']:.2f} / p95 {s['p95']:.2f} / p99 {s['p99']:.2f} ms, "
+                                      f"{s['qps']} req/s, {s['errors']} errors")
+                else:
+                    self.stdout.write(f"  [{mode}] all {s['errors']} requests failed")
 
         with open(out, 'w', encoding='utf8') as f:
             json.dump(submission, f, indent=2, ensure_ascii=False)
@@ -75,4 +114,30 @@ class Command(BaseCommand):
         with open('benchmark_timings.json','w',encoding='utf8') as f:
             json.dump(timings, f, indent=2)
 
-        self.stdout.write(self.style.SUCCESS(f"Wrote submission to {out} and timings to benchmark_timings.json"))
+        with open(options['report'], 'w', encoding='utf8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote submission to {out}, timings (p50) to benchmark_timings.json and report to {options['report']}"))
+
+        if options['baseline']:
+            self.check_baseline(report, options)
+
+    def check_baseline(self, report, options):
+        with open(options['baseline'], 'r', encoding='utf8') as f:
+            baseline = json.load(f)
+        regressions, drift = benchmark.compare(
+            report, baseline, options['max_regression'], options['gate_metric'])
+
+        for qid, kept in sorted(drift.items()):
+            self.stdout.write(self.style.WARNING(
+                f"Relevance drift: query {qid} keeps {kept:.0%} of baseline results"))
+        for r in regressions:
+            self.stdout.write(self.style.ERROR(
+                f"Regression [{r['section']}/{r['mode']}] {r['metric']} "
+                f"{r['baseline']:.2f} -> {r['current']:.2f} ms (+{r['change']:.0%})"))
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} mode(s) regressed more than {options['max_regression']:.0%} "
+                f"on {options['gate_metric']} against {options['baseline']}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
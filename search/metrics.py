@@ -0,0 +1,278 @@
+# search/metrics.py
+"""
+Per-request search instrumentation.
+
+SearchMetricsMiddleware opens a RequestMetrics for each request; views tag it
+with their search mode, a connection-level execute wrapper adds query count and
+DB time, and the row serializer / JSON renderer add serialization time. Tagged
+requests get a `Server-Timing` header and feed in-process histograms that
+`metrics_view` exposes in the Prometheus text format.
+
+With SEARCH_METRICS_ENABLED = False the middleware removes itself at startup,
+no execute wrapper is installed and the recording helpers are no-ops.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20)
+ROW_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 500, 1000)
+
+_current = ContextVar('search_request_metrics', default=None)
+
+
+def enabled():
+    return getattr(settings, 'SEARCH_METRICS_ENABLED', True)
+
+
+class RequestMetrics:
+    __slots__ = ('mode', 'plan', 'queries', 'db_s', 'rows', 'serialize_s', 'started')
+
+    def __init__(self):
+        self.mode = None
+        self.plan = None
+        self.queries = 0
+        self.db_s = 0.0
+        self.rows = 0
+        self.serialize_s = 0.0
+        self.started = time.perf_counter()
+
+
+def set_mode(mode):
+    m = _current.get()
+    if m is not None:
+        m.mode = mode
+
+
+def set_plan(plan):
+    # strategy chosen by search/router.py
+    m = _current.get()
+    if m is not None:
+        m.plan = plan
+
+
+def add_rows(n):
+    m = _current.get()
+    if m is not None:
+        m.rows += n
+
+
+def add_db(seconds, queries=1):
+    # for queries that bypass Django's connection (async pool)
+    m = _current.get()
+    if m is not None:
+        m.queries += queries
+        m.db_s += seconds
+
+
+@contextmanager
+def timed_serialize():
+    m = _current.get()
+    if m is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        m.serialize_s += time.perf_counter() - t0
+
+
+def db_wrapper(execute, sql, params, many, context):
+    """Django execute wrapper; installed on every connection while metrics are enabled."""
+    m = _current.get()
+    if m is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        m.queries += 1
+        m.db_s += time.perf_counter() - t0
+
+
+def install_db_wrapper(sender, connection, **kwargs):
+    # connection_created receiver
+    if db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_wrapper)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    HISTOGRAMS = {
+        'search_request_duration_seconds': ('Total time per search request', SECONDS_BUCKETS),
+        'search_db_duration_seconds': ('Time spent in database queries per search request', SECONDS_BUCKETS),
+        'search_serialize_duration_seconds': ('Row serialization and rendering time per search request', SECONDS_BUCKETS),
+        'search_db_queries': ('Database queries per search request', QUERY_BUCKETS),
+        'search_rows_returned': ('Rows returned per search request', ROW_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._plans = Counter()
+
+    def observe(self, m, total_s):
+        values = {
+            'search_request_duration_seconds': total_s,
+            'search_db_duration_seconds': m.db_s,
+            'search_serialize_duration_seconds': m.serialize_s,
+            'search_db_queries': m.queries,
+            'search_rows_returned': m.rows,
+        }
+        with self._lock:
+            for name, value in values.items():
+                key = (name, m.mode)
+                hist = self._histograms.get(key)
+                if hist is None:
+                    hist = self._histograms[key] = Histogram(self.HISTOGRAMS[name][1])
+                hist.observe(value)
+            if m.plan is not None:
+                self._plans[(m.mode, m.plan)] += 1
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, (help_text, buckets) in self.HISTOGRAMS.items():
+                series = sorted((mode, h) for (n, mode), h in self._histograms.items() if n == name)
+                if not series:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for mode, hist in series:
+                    cumulative = 0
+                    for bound, count in zip((*buckets, '+Inf'), hist.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{mode="{mode}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{mode="{mode}"}} {hist.sum:.6f}')
+                    lines.append(f'{name}_count{{mode="{mode}"}} {hist.count}')
+            if self._plans:
+                lines.append("# HELP search_router_plans_total Unified search plans chosen by the query router")
+                lines.append("# TYPE search_router_plans_total counter")
+                for (mode, plan), count in sorted(self._plans.items()):
+                    lines.append(f'search_router_plans_total{{mode="{mode}",plan="{plan}"}} {count}')
+        lines.extend(_cache_lines())
+        return "\n".join(lines) + "\n"
+
+
+def _cache_lines():
+    # result cache, typeahead candidate cache and single-flight coalescing
+    from .cache import search_cache
+    stats = search_cache.stats()
+    lines = [
+        "# HELP search_cache_entries Entries in the in-process search result cache",
+        "# TYPE search_cache_entries gauge",
+        f"search_cache_entries {stats['entries']}",
+        "# HELP search_cache_requests_total Search cache lookups by outcome",
+        "# TYPE search_cache_requests_total counter",
+    ]
+    for mode, counts in stats['modes'].items():
+        for outcome in ('hits', 'shared_hits', 'misses'):
+            lines.append(f'search_cache_requests_total{{mode="{mode}",outcome="{outcome}"}} {counts[outcome]}')
+
+    from .typeahead import typeahead_cache
+    typeahead = typeahead_cache.stats()
+    lines += [
+        "# HELP search_typeahead_entries Candidate sets held for incremental typeahead",
+        "# TYPE search_typeahead_entries gauge",
+        f"search_typeahead_entries {typeahead['entries']}",
+        "# HELP search_typeahead_requests_total Typeahead lookups answered from cached candidates or the database",
+        "# TYPE search_typeahead_requests_total counter",
+    ]
+    for outcome in ('narrowed', 'fetched'):
+        lines.append(f'search_typeahead_requests_total{{outcome="{outcome}"}} {typeahead["outcomes"].get(outcome, 0)}')
+
+    from .singleflight import single_flight
+    flights = single_flight.stats()
+    lines += [
+        "# HELP search_single_flight_in_flight Searches currently computing with waiters allowed to join",
+        "# TYPE search_single_flight_in_flight gauge",
+        f"search_single_flight_in_flight {flights['in_flight']}",
+        "# HELP search_single_flight_requests_total Cache misses that ran the search (leader), shared "
+        "an in-flight result (collapsed) or gave up waiting (timeout)",
+        "# TYPE search_single_flight_requests_total counter",
+    ]
+    for mode, counts in sorted(flights['modes'].items()):
+        for outcome in ('leader', 'collapsed', 'timeout'):
+            lines.append(f'search_single_flight_requests_total{{mode="{mode}",outcome="{outcome}"}} '
+                         f'{counts.get(outcome, 0)}')
+    return lines
+
+
+registry = Registry()
+
+
+def server_timing(m, total_s):
+    value = (f'db;dur={m.db_s * 1000:.2f};desc="{m.queries} queries", '
+             f'ser;dur={m.serialize_s * 1000:.2f}, total;dur={total_s * 1000:.2f}')
+    if m.plan is not None:
+        value += f', plan;desc="{m.plan}"'
+    return value
+
+
+class SearchMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        m = RequestMetrics()
+        token = _current.set(m)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(m, response)
+
+    async def __acall__(self, request):
+        m = RequestMetrics()
+        token = _current.set(m)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(m, response)
+
+    def finish(self, m, response):
+        if m.mode is None:
+            # not a search view
+            return response
+        total_s = time.perf_counter() - m.started
+        response['Server-Timing'] = server_timing(m, total_s)
+        registry.observe(m, total_s)
+        return response
+
+
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
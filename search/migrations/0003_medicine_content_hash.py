@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2025-10-08 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0002_catalogversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="medicine",
+            name="content_hash",
+            field=models.CharField(
+                blank=True, editable=False, max_length=32, null=True
+            ),
+        ),
+    ]
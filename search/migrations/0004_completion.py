@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2025-10-09 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0003_medicine_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Completion",
+            fields=[
+                (
+                    "prefix",
+                    models.CharField(max_length=32, primary_key=True, serialize=False),
+                ),
+                ("results", models.JSONField()),
+                ("version", models.PositiveBigIntegerField()),
+            ],
+            options={
+                "db_table": "search_completion",
+            },
+        ),
+    ]
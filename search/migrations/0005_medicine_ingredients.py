@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2025-10-09 15:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0004_completion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MedicineIngredient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("position", models.PositiveSmallIntegerField()),
+                ("ingredient", models.TextField()),
+                ("strength", models.TextField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "search_medicine_ingredient",
+            },
+        ),
+        migrations.AddField(
+            model_name="medicine",
+            name="composition_key",
+            field=models.CharField(
+                blank=True, editable=False, max_length=32, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="medicine",
+            index=models.Index(
+                fields=["composition_key", "price"], name="search_medicine_comp_price"
+            ),
+        ),
+        migrations.AddField(
+            model_name="medicineingredient",
+            name="medicine",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="ingredients",
+                to="search.medicine",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="medicineingredient",
+            index=models.Index(
+                fields=["ingredient", "strength"],
+                name="search_ingredient_strength",
+                opclasses=["text_pattern_ops", "text_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2025-10-10 11:08
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0005_medicine_ingredients"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="medicine",
+            index=models.Index(
+                fields=["manufacturer_name", "price"], name="search_medicine_mfr_price"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="medicine",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Lower("name"),
+                    name="text_pattern_ops",
+                ),
+                condition=models.Q(("available", True), ("is_discontinued", False)),
+                name="search_medicine_live_lower",
+            ),
+        ),
+    ]
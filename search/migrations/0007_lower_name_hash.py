@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2025-10-10 16:52
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0006_facet_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="medicine",
+            index=django.contrib.postgres.indexes.HashIndex(
+                django.db.models.functions.text.Lower("name"),
+                name="search_medicine_lower_hash",
+            ),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.6 on 2025-10-11 09:14
+
+from django.db import migrations
+
+# letters, digits ('0') and a DEFAULT partition ('other'); see search/partitions.py
+PARTITIONS = "".join(
+    f"CREATE TABLE search_medicine_part_{c} PARTITION OF search_medicine_part FOR VALUES IN ('{c}');\n"
+    for c in "abcdefghijklmnopqrstuvwxyz0"
+)
+
+CREATE_SQL = f"""
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE OR REPLACE FUNCTION search_partition_key(name text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT CASE
+        WHEN left(name, 1) ~ '^[A-Za-z]$' THEN lower(left(name, 1))
+        WHEN left(name, 1) ~ '^[0-9]$' THEN '0'
+        ELSE '_'
+    END
+$$;
+
+CREATE TABLE search_medicine_part (
+    id varchar(128) NOT NULL,
+    name text NOT NULL,
+    lower_name text NOT NULL,
+    name_tsv tsvector,
+    initial text NOT NULL
+) PARTITION BY LIST (initial);
+
+{PARTITIONS}CREATE TABLE search_medicine_part_other PARTITION OF search_medicine_part DEFAULT;
+
+CREATE INDEX search_medicine_part_id ON search_medicine_part (id);
+CREATE INDEX search_medicine_part_lower ON search_medicine_part (lower_name text_pattern_ops);
+CREATE INDEX search_medicine_part_trgm ON search_medicine_part USING gin (name gin_trgm_ops);
+CREATE INDEX search_medicine_part_tsv ON search_medicine_part USING gin (name_tsv);
+
+-- runs after the tsvectorupdate BEFORE trigger, so NEW.name_tsv is already set
+CREATE OR REPLACE FUNCTION search_medicine_part_sync() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM search_medicine_part
+        WHERE initial = search_partition_key(OLD.name) AND id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO search_medicine_part (id, name, lower_name, name_tsv, initial)
+        VALUES (NEW.id, NEW.name, lower(NEW.name), NEW.name_tsv, search_partition_key(NEW.name));
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+-- only updates of the projected columns; e.g. composition_key backfills leave it alone
+CREATE TRIGGER search_medicine_part_sync AFTER INSERT OR DELETE OR UPDATE OF name, short_composition
+    ON search_medicine FOR EACH ROW EXECUTE FUNCTION search_medicine_part_sync();
+
+INSERT INTO search_medicine_part (id, name, lower_name, name_tsv, initial)
+SELECT id, name, lower(name), name_tsv, search_partition_key(name)
+FROM search_medicine;
+
+ANALYZE search_medicine_part;
+"""
+
+DROP_SQL = """
+DROP TRIGGER IF EXISTS search_medicine_part_sync ON search_medicine;
+DROP FUNCTION IF EXISTS search_medicine_part_sync();
+DROP TABLE IF EXISTS search_medicine_part;
+DROP FUNCTION IF EXISTS search_partition_key(text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0007_lower_name_hash"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SQL, DROP_SQL),
+    ]
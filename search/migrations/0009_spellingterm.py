@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2025-10-12 10:31
+
+from django.db import migrations, models
+
+# search/spelling.py VOCABULARY_SQL: the words of the rows already imported
+VOCABULARY_SQL = """
+INSERT INTO search_spelling_term (term, frequency)
+SELECT term, count(*)
+FROM search_medicine m,
+     regexp_split_to_table(lower(concat_ws(' ', m.name, m.short_composition)), '[^[:alnum:]]+') AS term
+WHERE term ~ '^[[:alpha:]]+$' AND length(term) >= 4
+GROUP BY term;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0008_medicine_partitions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpellingTerm",
+            fields=[
+                ("term", models.TextField(primary_key=True, serialize=False)),
+                ("frequency", models.PositiveIntegerField()),
+            ],
+            options={
+                "db_table": "search_spelling_term",
+            },
+        ),
+        # import_data rebuilds it from then on
+        migrations.RunSQL(VOCABULARY_SQL, migrations.RunSQL.noop),
+    ]
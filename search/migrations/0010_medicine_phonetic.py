@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2025-10-12 15:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0009_spellingterm"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MedicinePhonetic",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.TextField()),
+                (
+                    "medicine",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="phonetic_keys",
+                        to="search.medicine",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "search_medicine_phonetic",
+                "indexes": [
+                    models.Index(fields=["key", "medicine"], name="search_phonetic_key")
+                ],
+            },
+        ),
+    ]
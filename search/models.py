@@ -1,5 +1,8 @@
 # search/models.py
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.contrib.postgres.indexes import HashIndex, OpClass
 from django.contrib.postgres.search import SearchVectorField
 
 class Medicine(models.Model):
@@ -19,9 +22,97 @@ class Medicine(models.Model):
     # tsvector column (to be populated via trigger)
     name_tsv = SearchVectorField(null=True, blank=True, editable=False)
 
+    # md5 of the imported field values, lets import_data --delta skip unchanged rows
+    content_hash = models.CharField(max_length=32, blank=True, null=True, editable=False)
+
+    # md5 of the normalized ingredient/strength set (search/compositions.py); equal keys = substitutes
+    composition_key = models.CharField(max_length=32, blank=True, null=True, editable=False)
+
     class Meta:
         db_table = 'search_medicine'
+        indexes = [
+            # substitutes: one group, already in price order
+            models.Index(fields=['composition_key', 'price'], name='search_medicine_comp_price'),
+            # facet filters: manufacturer=..., optionally with a price range
+            models.Index(fields=['manufacturer_name', 'price'], name='search_medicine_mfr_price'),
+            # prefix search with in_stock=1&hide_discontinued=1: only the sellable rows
+            models.Index(OpClass(Lower('name'), name='text_pattern_ops'), name='search_medicine_live_lower',
+                         condition=Q(available=True, is_discontinued=False)),
+            # exact-name probe of the unified router (search/router.py)
+            HashIndex(Lower('name'), name='search_medicine_lower_hash'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.id})"
 
+class MedicineIngredient(models.Model):
+    # one row per component of short_composition and per alias of it ("pyridoxine"), rebuilt by import_data
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='ingredients')
+    position = models.PositiveSmallIntegerField()
+    # normalized: lowercase, single spaces, without "(...)"
+    ingredient = models.TextField()
+    # normalized, e.g. "500mg", "2% w/w"; null when the composition gives none
+    strength = models.TextField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'search_medicine_ingredient'
+        indexes = [
+            # equality and LIKE 'prefix%' on ingredient, optionally narrowed by strength
+            models.Index(fields=['ingredient', 'strength'], name='search_ingredient_strength',
+                         opclasses=['text_pattern_ops', 'text_ops']),
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient} {self.strength or ''}".strip()
+
+class MedicinePhonetic(models.Model):
+    # one row per phonetic key of the words of name, rebuilt by import_data (search/phonetic.py)
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='phonetic_keys')
+    key = models.TextField()
+
+    class Meta:
+        db_table = 'search_medicine_phonetic'
+        indexes = [
+            # key = ANY(...) lookups, answered from the index alone
+            models.Index(fields=['key', 'medicine'], name='search_phonetic_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.medicine_id})"
+
+class CatalogVersion(models.Model):
+    # single row, bumped by import_data so every worker can tell the catalog changed
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'search_catalog_version'
+
+    def __str__(self):
+        return f"catalog v{self.version}"
+
+class Completion(models.Model):
+    # top-K autocomplete entries per lowercased name prefix, rebuilt by build_autocomplete
+    prefix = models.CharField(max_length=32, primary_key=True)
+    # [[id, name], ...] in rank order
+    results = models.JSONField()
+    # catalog version the row was built from; stale rows are ignored
+    version = models.PositiveBigIntegerField()
+
+    class Meta:
+        db_table = 'search_completion'
+
+    def __str__(self):
+        return f"{self.prefix!r} ({len(self.results)})"
+
+class SpellingTerm(models.Model):
+    # distinct lowercased words of name and short_composition, rebuilt by import_data (search/spelling.py)
+    term = models.TextField(primary_key=True)
+    # occurrences across the catalog; ranks equally close corrections
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = 'search_spelling_term'
+
+    def __str__(self):
+        return f"{self.term} ({self.frequency})"
@@ -0,0 +1,244 @@
+# search/partitions.py
+"""
+Search projection of the catalog, list-partitioned by the leading character of the name.
+
+`search_medicine` stays the system of record: medicine ingredients reference its
+primary key and every import path upserts on `id`, neither of which a
+partitioned table allows (its unique keys must contain the partition key). The
+search columns are projected into `search_medicine_part` instead, partitioned
+on `initial`:
+
+    a .. z   names starting with that letter (case-folded)
+    0        names starting with a digit
+    other    everything else (DEFAULT partition)
+
+Each partition carries its own lower(name) btree, trigram GIN and tsvector GIN
+(migration 0008), so:
+
+    prefix                   prunes to the one partition of the query's first character
+    substring, fuzzy, fulltext
+                             fan out over groups of partitions on a thread pool and
+                             merge the per-group top-K in Python
+
+Writes to `search_medicine` reach the projection through the
+`search_medicine_part_sync` row trigger. import_data defers that trigger and
+rebuilds only the partitions of the names it loaded (`rebuild_partitions`):
+re-importing one letter file rebuilds one partition and its indexes, which are
+built on a fresh table and swapped in, so searches never see a partly loaded letter.
+
+Enable per mode with SEARCH_ENGINES = {"prefix": "partitioned", ...}.
+"""
+import heapq
+import string
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from contextvars import copy_context
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from .models import Medicine
+from .replicas import read_connection, similarity_threshold
+
+PARENT = 'search_medicine_part'
+SYNC_TRIGGER = 'search_medicine_part_sync'
+DEFAULT_KEY = '_'
+KEYS = (*string.ascii_lowercase, '0', DEFAULT_KEY)
+
+DEFAULTS = {
+    # concurrent queries per fanned-out search, each over len(KEYS) / FANOUT partitions
+    "FANOUT": 4,
+    "PARALLEL": True,
+}
+
+# per-partition indexes, same definitions as the partitioned indexes of migration 0008,
+# so an attached partition's indexes become partitions of those
+INDEXES = (
+    "CREATE INDEX ON {table} (id)",
+    "CREATE INDEX ON {table} (lower_name text_pattern_ops)",
+    "CREATE INDEX ON {table} USING gin (name gin_trgm_ops)",
+    "CREATE INDEX ON {table} USING gin (name_tsv)",
+)
+
+_executor = None
+
+
+def partition_settings():
+    return {**DEFAULTS, **getattr(settings, "SEARCH_PARTITIONS", {})}
+
+
+def partition_key(name):
+    """Partition of a name (or query); must agree with the search_partition_key() SQL function."""
+    first = name[:1]
+    if not first:
+        return DEFAULT_KEY
+    if first in string.ascii_letters:
+        return first.lower()
+    if first in string.digits:
+        return '0'
+    return DEFAULT_KEY
+
+
+def partition_table(key):
+    return f"{PARENT}_other" if key == DEFAULT_KEY else f"{PARENT}_{key}"
+
+
+def partition_bound(key):
+    return "DEFAULT" if key == DEFAULT_KEY else f"FOR VALUES IN ('{key}')"
+
+
+def partition_groups(fanout):
+    """KEYS split into `fanout` groups, one query each."""
+    fanout = max(1, min(fanout, len(KEYS)))
+    return [list(KEYS[i::fanout]) for i in range(fanout)]
+
+
+def projection_exists():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [PARENT])
+        return cursor.fetchone()[0]
+
+
+# --- maintenance -------------------------------------------------------------
+
+@contextmanager
+def sync_deferred():
+    """
+    Turn off the per-row projection trigger for a bulk load; the caller rebuilds
+    the partitions it touched with `rebuild_partitions` afterwards.
+    """
+    table = Medicine._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {table} DISABLE TRIGGER {SYNC_TRIGGER}")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {table} ENABLE TRIGGER {SYNC_TRIGGER}")
+
+
+def rebuild_partition(key):
+    """
+    Reload one partition from search_medicine: fill and index a new table
+    off to the side, then swap it for the old partition. Returns the number of rows.
+
+    search_medicine is locked SHARE ROW EXCLUSIVE from the fill through the
+    swap. Writes wait, so none can reach the old partition through the sync
+    trigger after the copy and be lost with it. Reads of both tables continue.
+    """
+    table = partition_table(key)
+    staging = f"{table}_new"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {Medicine._meta.db_table} IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(f"CREATE TABLE {staging} (LIKE {PARENT} INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"""
+            INSERT INTO {staging} (id, name, lower_name, name_tsv, initial)
+            SELECT id, name, lower(name), name_tsv, %s
+            FROM {Medicine._meta.db_table}
+            WHERE search_partition_key(name) = %s
+            """,
+            [key, key],
+        )
+        rows = cursor.rowcount
+        cursor.execute("SET LOCAL maintenance_work_mem = '256MB'")
+        for definition in INDEXES:
+            cursor.execute(definition.format(table=staging))
+        if key != DEFAULT_KEY:
+            # lets ATTACH skip its validation scan
+            cursor.execute(f"ALTER TABLE {staging} ADD CONSTRAINT {staging}_bound CHECK (initial = '{key}')")
+        cursor.execute(f"ANALYZE {staging}")
+
+        # readers of the parent wait only for the swap, not for the load and index builds
+        cursor.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {table}")
+        cursor.execute(f"ALTER TABLE {PARENT} ATTACH PARTITION {staging} {partition_bound(key)}")
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+    with connection.cursor() as cursor:
+        if key != DEFAULT_KEY:
+            cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {staging}_bound")
+    return rows
+
+
+def rebuild_partitions(keys):
+    """{key: rows} after rebuilding each partition in `keys`."""
+    return {key: rebuild_partition(key) for key in sorted(set(keys))}
+
+
+# --- search ------------------------------------------------------------------
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=partition_settings()["FANOUT"],
+            thread_name_prefix='search-partition')
+    return _executor
+
+
+def _like_escape(q):
+    return q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _query(sql, params, threshold=None):
+    # runs on a pool thread: Django connections are per-thread, drop stale ones first
+    close_old_connections()
+    # `%` only uses the trigram GIN index at the configured threshold, so set it for this transaction
+    with similarity_threshold(threshold) if threshold is not None else nullcontext():
+        with read_connection().cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+def fan_out(where, where_params, score, score_params, limit, threshold=None):
+    """
+    Top `limit` ids over all partitions: one `ORDER BY score DESC, name LIMIT limit`
+    query per group of partitions, merged in Python on the same key. `where` and
+    `score` are SQL fragments with their own placeholder params.
+    """
+    sql = (f"SELECT id, name, {score} AS score FROM {PARENT} "
+           f"WHERE initial = ANY(%s) AND {where} "
+           f"ORDER BY score DESC, name LIMIT %s")
+    conf = partition_settings()
+    tasks = [(sql, [*score_params, group, *where_params, limit], threshold)
+             for group in partition_groups(conf["FANOUT"])]
+    if not conf["PARALLEL"] or len(tasks) < 2 or connection.in_atomic_block:
+        # inside a transaction (e.g. tests) other connections cannot see our rows
+        results = [_query(*task) for task in tasks]
+    else:
+        executor = _get_executor()
+        # each task runs in a copy of this context so per-request metrics see its queries
+        futures = [executor.submit(copy_context().run, _query, *task) for task in tasks]
+        results = [future.result() for future in futures]
+    merged = heapq.nsmallest(limit, (row for rows in results for row in rows),
+                             key=lambda row: (-row[2], row[1]))
+    return [pk for pk, _, _ in merged]
+
+
+def prefix_ids(q, limit):
+    """Ids of names starting with `q`, ordered like the prefix search; reads one partition."""
+    with read_connection().cursor() as cursor:
+        cursor.execute(
+            f"SELECT id FROM {PARENT} WHERE initial = %s AND lower_name LIKE %s "
+            f"ORDER BY lower_name LIMIT %s",
+            # the key of the query as typed, not lowercased, to agree with the row's key
+            [partition_key(q), _like_escape(q.lower()) + '%', limit],
+        )
+        return [pk for pk, in cursor.fetchall()]
+
+
+def substring_ids(q, limit):
+    return fan_out("name ILIKE %s", [f"%{_like_escape(q)}%"],
+                   "similarity(name, %s)", [q], limit)
+
+
+def fuzzy_ids(q, limit, threshold=0.3):
+    return fan_out("name %% %s AND similarity(name, %s) >= %s", [q, q, threshold],
+                   "similarity(name, %s)", [q], limit, threshold=threshold)
+
+
+def fulltext_ids(q, limit):
+    # matched and ranked with the 'simple' config the projection's vectors are built with
+    return fan_out("name_tsv @@ plainto_tsquery('simple', %s)", [q],
+                   "ts_rank(name_tsv, plainto_tsquery('simple', %s))", [q], limit)
@@ -0,0 +1,173 @@
+# search/phonetic.py
+"""
+Phonetic keys for brand names as they are heard, not as they are spelled.
+
+    "Zyloric" / "Ziloric"            -> SLRK
+    "Cefixime" / "Sefixime"          -> SFKSM
+    "Erythromycin" / "Eritromicin"   -> ARTRMSN
+
+A word is first normalized for spellings that drug names use interchangeably
+(AFFIXES: ph/f, th/t, y/i, x-/z-, ae/oe). It is then encoded Metaphone-style:
+vowels dropped except a leading one, c/k/q and s/z/soft c merged, repeated
+sounds collapsed. As in Double Metaphone, a word that can be read two ways
+("ch", soft "g") gets an alternate key as well.
+
+import_data stores one `search_medicine_phonetic` row per key of every word of
+every name (btree on key). The phonetic mode matches the rows whose words all
+have a key of the query's words. That is an exact index lookup, and only the
+matches are ranked with trigram similarity. No similarity threshold has to be
+lowered to catch sound-alike spellings.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+BATCH_SIZE = 5000
+
+# shorter words (and numbers) carry no usable sound
+MIN_WORD_LENGTH = 3
+
+VOWELS = frozenset('aeiou')
+
+# applied in order to the lowercased word before encoding
+AFFIXES = (
+    (re.compile(r'^x'), 'z'),               # xylo- / zylo-
+    (re.compile(r'ph'), 'f'),               # cephalexin / cefalexin, sulpha / sulfa
+    (re.compile(r'th'), 't'),               # erythro- / eritro-
+    (re.compile(r'ae|oe'), 'e'),            # haemo- / hemo-, oestr- / estr-
+    (re.compile(r'(?<=.)y|^y(?![aeiou])'), 'i'),  # zyloric / ziloric, -mycin / -micin
+)
+
+# same word split as pg_trgm / trigram_index
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def normalize(word):
+    word = word.lower()
+    for pattern, replacement in AFFIXES:
+        word = pattern.sub(replacement, word)
+    return word
+
+
+def _encode(word, alternate):
+    codes, last = [], None
+    i, n = 0, len(word)
+    while i < n:
+        c = word[i]
+        nxt = word[i + 1] if i + 1 < n else ''
+        step = 1
+        if c in VOWELS:
+            code = 'A' if i == 0 else ''
+        elif c == 'c':
+            if nxt == 'h':
+                # chlor-, chrom-: hard in most drug names
+                code, step = ('X' if alternate else 'K'), 2
+            elif nxt in ('e', 'i'):
+                code = 'S'
+            else:
+                code = 'K'
+        elif c in ('k', 'q'):
+            code = 'K'
+        elif c == 'g':
+            if nxt == 'h':
+                code, step = 'K', 2
+            elif nxt in ('e', 'i'):
+                code = 'K' if alternate else 'J'
+            else:
+                code = 'K'
+        elif c == 's':
+            if nxt == 'h':
+                code, step = 'X', 2
+            else:
+                code = 'S'
+        elif c == 'z':
+            code = 'S'
+        elif c == 'x':
+            code = 'KS'
+        elif c == 'd':
+            code = 'T'
+        elif c == 'v':
+            code = 'F'
+        elif c == 'h':
+            code = 'H' if i == 0 and nxt in VOWELS else ''
+        elif c == 'w':
+            code = 'W' if nxt in VOWELS else ''
+        elif c.isalpha():
+            code = c.upper()
+        else:
+            code = ''
+        if code and code != last:
+            codes.append(code)
+        # a vowel separates repeated consonants ("anan" keeps both N)
+        last = code
+        i += step
+    return ''.join(codes)
+
+
+def phonetic_keys(word):
+    """Primary key of `word`, plus the alternate when it differs; () for short or non-alphabetic words."""
+    if len(word) < MIN_WORD_LENGTH or not word.isalpha():
+        return ()
+    word = normalize(word)
+    primary, alternate = _encode(word, False), _encode(word, True)
+    return (primary,) if alternate == primary else (primary, alternate)
+
+
+def name_keys(name):
+    """Every key of every word of `name`, without duplicates."""
+    return {key for word in _WORD_RE.findall(name or '') for key in phonetic_keys(word)}
+
+
+def query_keys(q):
+    """One set of keys per usable word of `q`; a match needs a key from each set."""
+    keys = []
+    for word in _WORD_RE.findall(q):
+        word_keys = set(phonetic_keys(word))
+        if word_keys and word_keys not in keys:
+            keys.append(word_keys)
+    return keys
+
+
+def phonetic_matches(q):
+    """Medicines whose name has a word sounding like each word of `q`; none if `q` has no usable word."""
+    from .models import Medicine, MedicinePhonetic
+
+    keys = query_keys(q)
+    if not keys:
+        return Medicine.objects.none()
+    qs = Medicine.objects.all()
+    for word_keys in keys:
+        # one semi-join per word on the (key, medicine) btree
+        qs = qs.filter(Exists(MedicinePhonetic.objects.filter(medicine=OuterRef('pk'), key__in=word_keys)))
+    return qs
+
+
+def sync_phonetic_keys(ids=None):
+    """Rebuild phonetic rows (all medicines, or only `ids`) from the names. Returns rows written."""
+    from .models import Medicine, MedicinePhonetic
+
+    table = MedicinePhonetic._meta.db_table
+    medicines = Medicine.objects.order_by()
+    if ids is not None:
+        medicines = medicines.filter(pk__in=ids)
+    written = 0
+    with transaction.atomic():
+        if ids is None:
+            with connection.cursor() as cursor:
+                cursor.execute(f"TRUNCATE {table}")
+        else:
+            for start in range(0, len(ids), BATCH_SIZE):
+                MedicinePhonetic.objects.filter(medicine_id__in=ids[start:start + BATCH_SIZE]).delete()
+
+        objs = []
+        for pk, name in medicines.values_list('id', 'name').iterator(chunk_size=BATCH_SIZE):
+            objs.extend(MedicinePhonetic(medicine_id=pk, key=key) for key in sorted(name_keys(name)))
+            if len(objs) >= BATCH_SIZE:
+                MedicinePhonetic.objects.bulk_create(objs)
+                written += len(objs)
+                objs = []
+        if objs:
+            MedicinePhonetic.objects.bulk_create(objs)
+            written += len(objs)
+    return written
@@ -0,0 +1,158 @@
+# search/prefix_fulltext.py
+"""
+Prefix-aware full-text search for search-as-you-type.
+
+`plainto_tsquery` only matches whole words, so "canc" finds nothing until
+"cancer" is typed out. Here the input is parsed into a `to_tsquery('simple',
+...)` string whose last word is a prefix match (`'canc':*`):
+
+    dolo 65              'dolo' & '65':*
+    crocin OR dolo       'crocin' | 'dolo':*
+    "dolo 650" tab       ('dolo' <-> '650') & 'tab':*
+    paracetamol -syrup   'paracetamol' & !'syrup'
+    dolo OR -syrup       'dolo' & !'syrup'
+
+Only runs of letters and digits reach the tsquery, each one quoted, so
+operators, quotes and punctuation typed by the user cannot produce a syntax
+error. AND is implicit and binds tighter than OR, as in tsquery itself. A
+query of only excluded words matches nothing, since it could not use the index.
+An OR branch of only excluded words would match nearly every row, so its words
+are excluded from the whole query instead.
+
+A prefix like "pa" matches thousands of rows, and ranking all of them only to
+keep 20 is what made full text too slow to type into. So ranking runs in two
+phases:
+
+1. Take at most CANDIDATES matches, unranked, straight from the GIN index.
+   Matches in the name (weight A) are taken first, and matches only in
+   short_composition (weight B) fill the remaining room.
+2. Rank only those with `ts_rank_cd`, weighted by WEIGHTS, so a name hit
+   outranks a composition hit as the trigger's setweight() intends.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from django.db.models.functions import Length
+
+from .facets import filter_q
+from .models import Medicine
+
+DEFAULTS = {
+    "CANDIDATES": 500,
+    # ts_rank_cd weights for D, C, B, A labels: A = name, B = short_composition (see loader.NAME_TSV_SQL)
+    "WEIGHTS": [0.1, 0.2, 0.4, 1.0],
+}
+
+# "quoted phrase" (closing quote optional while typing), or any other run of non-space characters
+_TERM_RE = re.compile(r'(-?)"([^"]*)("?)|(\S+)')
+# what the 'simple' parser keeps as one lexeme: words, and numbers like 0.5
+_LEXEME_RE = re.compile(r'\d+(?:\.\d+)+|[^\W_]+')
+
+OPERATORS = {'or': '|', '|': '|', 'and': '&', '&': '&'}
+
+
+def prefix_fulltext_settings():
+    return {**DEFAULTS, **getattr(settings, "SEARCH_PREFIX_FULLTEXT", {})}
+
+
+def _phrase(words, prefix=False, weight=''):
+    """tsquery for consecutive `words`; the last one as a prefix when `prefix`."""
+    parts = [f"'{word}':{weight}" if weight else f"'{word}'" for word in words]
+    if prefix:
+        parts[-1] = f"'{words[-1]}':*{weight}"
+    return ' <-> '.join(parts)
+
+
+def parse(q, weight=''):
+    """
+    `to_tsquery('simple', ...)` text for user input `q`, or None if it has no
+    words. With `weight` (e.g. 'A') every word only matches that label, so
+    the result matches a subset of what the unweighted query matches.
+    """
+    terms = []  # [operator, negated, words]
+    operator = '&'
+    closed = False
+    for match in _TERM_RE.finditer(q.lower()):
+        negated, phrase, closing, word = match.groups()
+        if word is not None and word in OPERATORS:
+            operator = OPERATORS[word]
+            continue
+        if word is not None and word.startswith('-') and len(word) > 1:
+            negated, word = '-', word[1:]
+        words = _LEXEME_RE.findall(phrase if word is None else word)
+        if not words:
+            continue
+        terms.append([operator, bool(negated), words])
+        operator = '&'
+        # a finished phrase is not a word being typed
+        closed = word is None and bool(closing)
+    if all(negated for _, negated, _ in terms):
+        return None
+
+    prefix_at = None if closed or terms[-1][1] else len(terms) - 1
+    branches = []  # [[negated, text], ...] per OR branch
+    for i, (operator, negated, words) in enumerate(terms):
+        # an excluded word stays excluded from every label
+        text = _phrase(words, prefix=i == prefix_at, weight='' if negated else weight)
+        if negated:
+            text = f"!({text})" if len(words) > 1 else f"!{text}"
+        elif len(words) > 1:
+            text = f"({text})"
+        if i == 0 or operator == '|':
+            branches.append([])
+        branches[-1].append((negated, text))
+
+    kept, excluded = [], []
+    for branch in branches:
+        if all(negated for negated, _ in branch):
+            excluded.extend(text for _, text in branch)
+        else:
+            kept.append(' & '.join(text for _, text in branch))
+    query = ' | '.join(kept)
+    if excluded:
+        query = ' & '.join([f"({query})" if len(kept) > 1 else query, *excluded])
+    return query
+
+
+def tsquery(text):
+    return SearchQuery(text, config='simple', search_type='raw')
+
+
+def matches(q, filters=None):
+    """Every medicine matching the parsed query, unranked."""
+    text = parse(q)
+    if text is None:
+        return Medicine.objects.none()
+    return Medicine.objects.filter(name_tsv=tsquery(text)).filter(filter_q(filters))
+
+
+def ranked(qs, q):
+    """`qs` ordered by weighted cover density rank, then shorter names."""
+    conf = prefix_fulltext_settings()
+    rank = SearchRank(F('name_tsv'), tsquery(parse(q)), weights=conf["WEIGHTS"], cover_density=True)
+    return qs.annotate(rank=rank).order_by('-rank', Length('name'), 'name')
+
+
+def candidate_ids(q, filters=None):
+    """Phase 1: up to CANDIDATES matching ids, name (weight A) matches first, without ranking."""
+    cap = prefix_fulltext_settings()["CANDIDATES"]
+    named = Medicine.objects.filter(name_tsv=tsquery(parse(q, weight='A'))).filter(filter_q(filters))
+    ids = list(named.values_list('id', flat=True)[:cap])
+    if len(ids) < cap:
+        seen = set(ids)
+        # the name matches come back again; fetch enough to still fill the room
+        rest = matches(q, filters).values_list('id', flat=True)[:cap + len(ids)]
+        ids += [pk for pk in rest if pk not in seen][:cap - len(ids)]
+    return ids
+
+
+def prefix_fulltext_ids(q, limit, filters=None):
+    """Phase 2: the `limit` best of the capped candidates by ts_rank_cd."""
+    if parse(q) is None:
+        return []
+    ids = candidate_ids(q, filters)
+    if not ids:
+        return []
+    return list(ranked(Medicine.objects.filter(pk__in=ids), q).values_list('id', flat=True)[:limit])
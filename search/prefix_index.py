@@ -0,0 +1,50 @@
+# search/prefix_index.py
+from bisect import bisect_left
+
+from django.db.models.functions import Lower
+
+from .catalog import get_catalog_version
+from .engines import CatalogIndex
+from .models import Medicine
+from .snapshot import load_snapshot
+
+# sorts after every real character, so `prefix + _HIGH` bounds all keys starting with prefix
+_HIGH = '\U0010ffff'
+
+
+class PrefixIndex(CatalogIndex):
+    """
+    Sorted in-process array of (lower(name), id) pairs.
+
+    A prefix lookup is two binary searches plus a slice; only the ids of the
+    first `limit` matches leave the index, the rows themselves are fetched by pk.
+    With a current catalog snapshot (search/snapshot.py) the arrays are the
+    snapshot's mapped keys and ids, shared with the other workers, not a copy.
+    """
+    empty = ((), ())
+
+    def __len__(self):
+        return len(self._data[0][0])
+
+    def build(self, version=None):
+        if version is None:
+            version = get_catalog_version()
+        mapped = load_snapshot(version)
+        self._data = ((mapped.keys, mapped.ids) if mapped is not None else self.load(), version)
+
+    def load(self):
+        rows = sorted(Medicine.objects
+                      .annotate(lower_name=Lower('name'))
+                      .values_list('lower_name', 'id')
+                      .iterator(chunk_size=5000))
+        return tuple(r[0] for r in rows), tuple(r[1] for r in rows)
+
+    def search(self, prefix, limit):
+        """Ids of the first `limit` names starting with `prefix` (already lowercased), in key order."""
+        keys, ids = self.snapshot
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + _HIGH, lo)
+        return list(ids[lo:min(hi, lo + limit)])
+
+
+prefix_index = PrefixIndex()
@@ -0,0 +1,112 @@
+# search/prepared.py
+"""
+Server-side prepared statements for the single-query search modes.
+
+With SEARCH_ENGINES[mode] = "prepared", a search skips the ORM. It runs a fixed
+statement through `EXECUTE`, prepared once per database connection with
+`PREPARE`. With persistent connections (CONN_MAX_AGE) a request then pays
+neither the ORM compile nor PostgreSQL's parse and analysis. After a few
+executions PostgreSQL also caches a generic plan. The statements mirror the
+batch LATERAL bodies (search/batch.py), which rank like the ORM views:
+
+    prefix     lower(name) ~>=~ lo AND ~<~ hi     text_pattern_ops btree, even in a generic plan
+    substring  name ILIKE '%q%'                   trigram GIN
+    fulltext   name_tsv @@ plainto_tsquery(q)      tsvector GIN
+    fuzzy      name % q                           trigram GIN, at the transaction's similarity threshold
+
+Rows come back with every MEDICINE_FIELDS column and are projected to
+`fields=` in Python. Filtered searches use the ORM path.
+
+This needs session-level state: no transaction-pooling PgBouncer, and Django's
+default client-side parameter binding (EXECUTE takes no bind parameters).
+"""
+from django.db import DatabaseError
+
+from .batch import like_escape, prefix_upper_bound
+from .models import Medicine
+from .replicas import read_connection, similarity_threshold
+from .serializers import MEDICINE_FIELDS, project_rows
+
+TABLE = Medicine._meta.db_table
+COLUMNS = ', '.join(f't.{f}' for f in MEDICINE_FIELDS)
+
+# mode -> (statement name, parameter types, body)
+STATEMENTS = {
+    'prefix': ('search_prefix', '(text, text, int)', f"""
+        SELECT {COLUMNS} FROM {TABLE} t
+        WHERE lower(t.name) ~>=~ $1 AND lower(t.name) ~<~ $2
+        ORDER BY lower(t.name)
+        LIMIT $3
+    """),
+    'substring': ('search_substring', '(text, text, int)', f"""
+        SELECT {COLUMNS} FROM {TABLE} t
+        WHERE t.name ILIKE $2
+        ORDER BY similarity(t.name, $1) DESC, t.name
+        LIMIT $3
+    """),
+    'fulltext': ('search_fulltext', '(text, int)', f"""
+        SELECT {COLUMNS} FROM {TABLE} t
+        WHERE t.name_tsv @@ plainto_tsquery('simple', $1)
+        ORDER BY ts_rank(t.name_tsv, plainto_tsquery('simple', $1)) DESC
+        LIMIT $2
+    """),
+    # PREPARE runs without bind parameters, so `%` needs no escaping
+    'fuzzy': ('search_fuzzy', '(text, int)', f"""
+        SELECT {COLUMNS} FROM {TABLE} t
+        WHERE t.name % $1
+        ORDER BY similarity(t.name, $1) DESC
+        LIMIT $2
+    """),
+}
+
+
+def _args(mode, q, limit, threshold):
+    if mode == 'prefix':
+        lo = q.lower()
+        return [lo, prefix_upper_bound(lo), limit]
+    if mode == 'substring':
+        return [q, f"%{like_escape(q)}%", limit]
+    # fuzzy's threshold is not an argument: `%` reads pg_trgm.similarity_threshold
+    return [q, limit]
+
+
+def _prepared_names(conn, cursor):
+    # statements live as long as the DB-API connection; start over when Django reconnected
+    state = getattr(conn, '_search_prepared', None)
+    if state is None or state[0] is not conn.connection:
+        cursor.execute("SELECT name FROM pg_prepared_statements")
+        state = conn._search_prepared = (conn.connection, {name for name, in cursor.fetchall()})
+    return state[1]
+
+
+def _execute(conn, mode, args):
+    name, types, body = STATEMENTS[mode]
+    with conn.cursor() as cursor:
+        prepared = _prepared_names(conn, cursor)
+        if name not in prepared:
+            cursor.execute(f"PREPARE {name} {types} AS {body}")
+            prepared.add(name)
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(args))})", args)
+        return cursor.fetchall()
+
+
+def _run(conn, mode, args, threshold):
+    if mode != 'fuzzy':
+        return _execute(conn, mode, args)
+    with similarity_threshold(threshold, using=conn.alias):
+        return _execute(conn, mode, args)
+
+
+def prepared_search(mode, q, limit, fields, threshold=None):
+    """Serialized rows for one search of `mode`, from its prepared statement."""
+    conn = read_connection()
+    args = _args(mode, q, limit, threshold)
+    try:
+        rows = _run(conn, mode, args, threshold)
+    except DatabaseError:
+        # e.g. DISCARD ALL by a pooler dropped our statements; re-prepare once
+        if conn.in_atomic_block:
+            raise
+        conn._search_prepared = None
+        rows = _run(conn, mode, args, threshold)
+    return project_rows(rows, fields)
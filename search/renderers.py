@@ -0,0 +1,53 @@
+# search/renderers.py
+from rest_framework.renderers import JSONRenderer
+
+from .metrics import timed_serialize
+
+try:  # optional: much faster encoder, same bytes for our payloads
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _orjson_dumps(data):
+    ret = orjson.dumps(data)
+    # DRF escapes these two for JavaScript compatibility; match it byte for byte
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+def dumps(data):
+    """Compact UTF-8 JSON bytes, identical to DRF's JSONRenderer for str/int/bool/None payloads."""
+    with timed_serialize():
+        if orjson is not None:
+            return _orjson_dumps(data)
+        return JSONRenderer().render(data)
+
+
+def dumps_lines(items):
+    """NDJSON bytes: one compact JSON document per item, each followed by a newline."""
+    with timed_serialize():
+        if orjson is not None:
+            return b''.join(_orjson_dumps(item) + b'\n' for item in items)
+        renderer = JSONRenderer()
+        return b''.join(renderer.render(item) + b'\n' for item in items)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that hands plain payloads to orjson when it is installed."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed_serialize():
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return _orjson_dumps(data)
+        except TypeError:
+            # lazy strings, Decimals etc. (e.g. error payloads): let DRF's encoder handle them
+            return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,166 @@
+# search/replicas.py
+"""
+Read-replica routing for search traffic.
+
+Search views run inside `replica_reads()` (`reads_from_replica` on a view).
+It picks one healthy alias from SEARCH_REPLICAS["ALIASES"], round-robin, for
+the whole request. Within it, SearchReplicaRouter sends every ORM read to that
+alias, and raw search SQL uses `read_connection()`. Outside it (import_data,
+build_autocomplete, admin) nothing changes. Reads and writes use `default`,
+so imports stay on the primary and never compare against a lagging copy.
+
+A replica is skipped when it cannot be connected to, or when its replay lag
+exceeds MAX_LAG seconds. The lag is checked at most every CHECK_INTERVAL
+seconds. A skipped replica is retried after RETRY_AFTER seconds. With no
+healthy replica the reads fall back to the primary.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+DEFAULTS = {
+    "ALIASES": [],
+    "MAX_LAG": 30.0,
+    "CHECK_INTERVAL": 5.0,
+    "RETRY_AFTER": 30.0,
+}
+
+# alias pinned for the current request; copied into pool threads with the context
+_alias = ContextVar('search_read_alias', default=None)
+
+
+def replica_settings():
+    return {**DEFAULTS, **getattr(settings, "SEARCH_REPLICAS", {})}
+
+
+class ReplicaHealth:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._down_until = {}
+        self._checked_at = {}
+        self._cycle = None
+        self._aliases = None
+
+    def mark_down(self, alias, reason):
+        conf = replica_settings()
+        with self._lock:
+            self._down_until[alias] = time.monotonic() + conf["RETRY_AFTER"]
+        logger.warning("search: replica %s unavailable for %ss (%s)", alias, conf["RETRY_AFTER"], reason)
+
+    def _usable(self, alias, conf):
+        now = time.monotonic()
+        if self._down_until.get(alias, 0) > now:
+            return False
+        try:
+            # a no-op on an open persistent connection
+            connections[alias].ensure_connection()
+            if now - self._checked_at.get(alias, float('-inf')) >= conf["CHECK_INTERVAL"]:
+                self._checked_at[alias] = now
+                lag = self._lag(alias)
+                if lag is not None and lag > conf["MAX_LAG"]:
+                    self.mark_down(alias, f"replay lag {lag:.1f}s")
+                    return False
+        except DatabaseError as exc:
+            self.mark_down(alias, exc)
+            return False
+        return True
+
+    def _lag(self, alias):
+        with connections[alias].cursor() as cursor:
+            # NULL on a primary, and when nothing has been replayed yet
+            cursor.execute("SELECT extract(epoch FROM now() - pg_last_xact_replay_timestamp())")
+            lag = cursor.fetchone()[0]
+        return None if lag is None else float(lag)
+
+    def choose(self):
+        """A healthy replica alias, or the primary."""
+        conf = replica_settings()
+        aliases = list(conf["ALIASES"])
+        if not aliases:
+            return PRIMARY
+        if aliases != self._aliases:
+            self._aliases, self._cycle = aliases, itertools.cycle(aliases)
+        for _ in aliases:
+            alias = next(self._cycle)
+            if self._usable(alias, conf):
+                return alias
+        return PRIMARY
+
+    def stats(self):
+        now = time.monotonic()
+        return {alias: self._down_until.get(alias, 0) <= now for alias in replica_settings()["ALIASES"]}
+
+
+replica_health = ReplicaHealth()
+
+
+@contextmanager
+def replica_reads():
+    """Route this context's search reads (ORM and `read_connection()`) to one replica."""
+    token = _alias.set(replica_health.choose())
+    try:
+        yield
+    finally:
+        _alias.reset(token)
+
+
+def reads_from_replica(view):
+    """View decorator: run the view inside `replica_reads()`."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def read_alias():
+    return _alias.get() or PRIMARY
+
+
+def read_connection():
+    """Connection for raw search SQL: a replica inside `replica_reads()`, else the primary."""
+    return connections[read_alias()]
+
+
+@contextmanager
+def similarity_threshold(threshold, using=None):
+    """
+    Transaction on the read connection (or `using`) in which pg_trgm's `%`
+    operator matches names with similarity >= `threshold`. The setting is
+    local to the transaction, so it never carries over to later requests on a
+    persistent connection (set_limit() would, and is deprecated).
+    """
+    using = using or read_alias()
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", [str(threshold)])
+        yield
+
+
+class SearchReplicaRouter:
+    """DATABASE_ROUTERS entry: search reads to replicas inside `replica_reads()`, everything else to default."""
+
+    def db_for_read(self, model, **hints):
+        return _alias.get()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema by replication
+        return db == PRIMARY
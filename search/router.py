@@ -0,0 +1,146 @@
+# search/router.py
+"""
+Query-shape router for unified search.
+
+Every unified query used to run the same three candidate queries. Some shapes
+gain nothing from some of them: pg_trgm cannot narrow a 1-2 character query
+(it has at most one full trigram), a strength like "500" or "650mg" is a
+token match rather than a typo, and a query that spells out a full product
+name is usually an exact hit. The router classifies the query and runs only
+the candidate sources (search/fusion.py) of the cheapest plan that still
+answers it:
+
+    shape       example                   default plan
+    short       "pa"                      prefix            lower(name) btree
+    stopwords   "tablet"                  prefix            btree, not a huge tsquery match
+    numeric     "500", "650mg"            fulltext          name_tsv GIN
+    long        "augmentin 625 duo tab"   exact             hash lookup + btree + tsquery
+    multiword   "dolo 650"                prefix_fulltext   btree + tsquery
+    word        "paracetmol"              fused             btree + tsquery + ILIKE + trigram
+
+A plan that returns fewer than `limit` rows is widened with the remaining
+sources. A query with a word that is neither in the catalog vocabulary nor
+the start of a vocabulary word gets a "did you mean" stage: the corrected
+query (search/spelling.py) runs on the prefix/full-text path, and its hits
+rank ahead of the original's, which can only be fuzzy guesses.
+
+Routes are overridable with settings.SEARCH_ROUTES. Each decision is logged
+on the `search.router` logger and counted in the metrics, so routes can be
+tuned against `run_benchmark` reports (which record the plan per query).
+"""
+import logging
+import re
+from collections import namedtuple
+
+from django.conf import settings
+
+from . import metrics
+from .engines import hydrate
+from .fusion import ALL_SOURCES, fuse, gather_candidates
+from .spelling import did_you_mean, spelled_ids
+
+logger = logging.getLogger(__name__)
+
+# plan -> candidate sources merged by fusion.fuse
+PLANS = {
+    'exact': ('exact', 'prefix', 'fulltext'),
+    'prefix': ('prefix',),
+    'fulltext': ('fulltext',),
+    'trigram': ('trigram',),
+    'prefix_fulltext': ('prefix', 'fulltext'),
+    'fused': ALL_SOURCES,
+}
+
+ROUTES = {
+    'short': 'prefix',
+    'stopwords': 'prefix',
+    'numeric': 'fulltext',
+    'long': 'exact',
+    'multiword': 'prefix_fulltext',
+    'word': 'fused',
+}
+
+# dosage forms, units and filler words: they match thousands of names and carry no intent alone
+STOP_WORDS = frozenset({
+    'tablet', 'tablets', 'tab', 'capsule', 'capsules', 'cap', 'syrup', 'injection', 'inj',
+    'cream', 'gel', 'drop', 'drops', 'suspension', 'ointment', 'solution', 'powder',
+    'mg', 'mcg', 'ml', 'gm', 'g', 'iu',
+    'of', 'and', 'the', 'for', 'with', 'in',
+})
+
+# shapes whose short answers stay as they are: trigram cannot help a 1-2 character query
+WIDEN_NEVER = frozenset({'short'})
+
+SHORT_QUERY = 2
+LONG_QUERY_TOKENS = 3
+
+# same word split as pg_trgm / trigram_index
+_WORD = re.compile(r'[^\W_]+')
+
+QueryShape = namedtuple('QueryShape', 'kind length tokens content_tokens has_digits')
+
+
+def classify(q):
+    """QueryShape for a raw query; `kind` is one of the ROUTES keys."""
+    q = q.strip().lower()
+    tokens = _WORD.findall(q)
+    content = [t for t in tokens if t not in STOP_WORDS]
+    has_digits = any(c.isdigit() for c in q)
+    if len(q) <= SHORT_QUERY or not tokens:
+        kind = 'short'
+    elif not content:
+        kind = 'stopwords'
+    elif all(any(c.isdigit() for c in t) for t in content):
+        kind = 'numeric'
+    elif len(content) >= LONG_QUERY_TOKENS:
+        kind = 'long'
+    elif len(content) == 2:
+        kind = 'multiword'
+    else:
+        kind = 'word'
+    return QueryShape(kind, len(q), len(tokens), len(content), has_digits)
+
+
+def plan_for(q):
+    """(plan name, shape) the router would use for `q`."""
+    shape = classify(q)
+    routes = {**ROUTES, **getattr(settings, 'SEARCH_ROUTES', {})}
+    plan = routes.get(shape.kind, 'fused')
+    if plan not in PLANS:
+        plan = 'fused'
+    return plan, shape
+
+
+def routed_ids(q, limit, threshold=0.2, filters=None):
+    """
+    Ranked ids for a unified query, using only the sources its plan needs. If a
+    narrow plan comes back short of `limit`, the remaining sources run too
+    (e.g. a typo in a multi-word query), so routing never costs recall. Then
+    the "did you mean" stage runs if a word of `q` has a correction.
+    """
+    plan, shape = plan_for(q)
+    k = max(limit, getattr(settings, 'SEARCH_FUSION_CANDIDATES', 50))
+    candidates = gather_candidates(q, k, threshold, filters, sources=PLANS[plan])
+    ids = fuse(q, candidates, limit)
+    if len(ids) < limit and shape.kind not in WIDEN_NEVER:
+        rest = tuple(source for source in ALL_SOURCES if source not in candidates)
+        if rest:
+            candidates.update(gather_candidates(q, k, threshold, filters, sources=rest))
+            ids = fuse(q, candidates, limit)
+            plan = f"{plan}+widened"
+    corrected = did_you_mean(q)
+    if corrected is not None:
+        spelled = spelled_ids(corrected, limit, filters)
+        if spelled:
+            seen = set(spelled)
+            ids = [*spelled, *(pk for pk in ids if pk not in seen)][:limit]
+            plan = f"{plan}+corrected"
+    logger.info("unified plan=%s shape=%s length=%d tokens=%d content_tokens=%d digits=%s results=%d q=%r",
+                plan, shape.kind, shape.length, shape.tokens, shape.content_tokens, shape.has_digits,
+                len(ids), q)
+    metrics.set_plan(plan)
+    return ids
+
+
+def routed_search(q, limit, threshold=0.2):
+    return hydrate(routed_ids(q, limit, threshold))
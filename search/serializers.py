@@ -1,10 +1,62 @@
 # search/serializers.py
+from decimal import Decimal, ROUND_HALF_UP
+
 from rest_framework import serializers
+from .metrics import timed_serialize
 from .models import Medicine
 
+MEDICINE_FIELDS = ['id', 'sku_id', 'name', 'manufacturer_name', 'marketer_name',
+                   'type', 'price', 'pack_size_label', 'short_composition',
+                   'is_discontinued', 'available']
+
+_CENTS = Decimal('0.01')
+
+
 class MedicineSerializer(serializers.ModelSerializer):
     class Meta:
         model = Medicine
-        fields = ['id', 'sku_id', 'name', 'manufacturer_name', 'marketer_name',
-                  'type', 'price', 'pack_size_label', 'short_composition',
-                  'is_discontinued', 'available']
+        fields = MEDICINE_FIELDS
+
+
+def parse_fields(raw):
+    """Validated column list for a `fields=` query parameter; empty means every field."""
+    if not raw:
+        return list(MEDICINE_FIELDS)
+    requested = {f.strip() for f in raw.split(',') if f.strip()}
+    unknown = sorted(requested.difference(MEDICINE_FIELDS))
+    if unknown:
+        raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+    # serializer order, so the full set renders exactly like MedicineSerializer
+    return [f for f in MEDICINE_FIELDS if f in requested]
+
+
+def serialize_rows(rows, fields):
+    """
+    `values_list(*fields)` tuples -> dicts identical to MedicineSerializer output,
+    without building model instances or running DRF field machinery.
+    """
+    with timed_serialize():
+        return _serialize_rows(rows, fields)
+
+
+def project_rows(rows, fields):
+    """Serialized `fields` of rows that carry every MEDICINE_FIELDS column."""
+    if fields != MEDICINE_FIELDS:
+        at = [MEDICINE_FIELDS.index(f) for f in fields]
+        rows = [[row[i] for i in at] for row in rows]
+    return serialize_rows(rows, fields)
+
+
+def _serialize_rows(rows, fields):
+    if 'price' not in fields:
+        return [dict(zip(fields, row)) for row in rows]
+    price_at = fields.index('price')
+    data = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        price = row[price_at]
+        if price is not None:
+            # what DecimalField(decimal_places=2).to_representation() produces
+            item['price'] = '{:f}'.format(Decimal(price).quantize(_CENTS, rounding=ROUND_HALF_UP))
+        data.append(item)
+    return data
@@ -0,0 +1,87 @@
+# search/singleflight.py
+"""
+Single-flight coalescing of identical concurrent searches.
+
+When a query trends, many identical requests reach a worker within a few
+milliseconds, before the first one has filled the result cache. Each one
+would run the same ranking query. `SingleFlight.do(key, compute)` lets the
+first caller for a key run `compute`. Callers that arrive while it is running
+wait for that result and share it. A waiter gives up after
+SEARCH_SINGLE_FLIGHT["WAIT"] seconds and computes on its own, so one stuck
+query never stalls everyone behind it. If the leader fails, its waiters get
+the same exception.
+
+Coalescing is per process; across workers the shared cache tier does the job.
+Outcomes per mode are exported by /api/metrics as
+search_single_flight_requests_total{outcome="leader"|"collapsed"|"timeout"}.
+"""
+import threading
+from collections import Counter
+
+from django.conf import settings
+
+DEFAULTS = {
+    "ENABLED": True,
+    "WAIT": 2.0,
+}
+
+
+class _Call:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.outcomes = Counter()
+
+    @property
+    def conf(self):
+        return {**DEFAULTS, **getattr(settings, "SEARCH_SINGLE_FLIGHT", {})}
+
+    def do(self, key, compute, mode=None):
+        """compute(), or the result of the identical call already in flight for `key`."""
+        conf = self.conf
+        if not conf["ENABLED"]:
+            return compute()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(conf["WAIT"]):
+                self.outcomes[(mode, 'collapsed')] += 1
+                if call.error is not None:
+                    raise call.error
+                return call.value
+            self.outcomes[(mode, 'timeout')] += 1
+            return compute()
+
+        self.outcomes[(mode, 'leader')] += 1
+        try:
+            call.value = compute()
+            return call.value
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        modes = {}
+        for (mode, outcome), count in self.outcomes.items():
+            modes.setdefault(mode or '', {})[outcome] = count
+        return {"in_flight": len(self._calls), "modes": modes}
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,212 @@
+# search/snapshot.py
+"""
+Versioned binary snapshot of the searchable catalog, memory-mapped read-only.
+
+Building the in-process indexes from PostgreSQL costs every worker a full
+table read at start and a private copy of every name. `export_snapshot`
+instead writes the searchable columns once to a compact file. Each worker
+mmaps it read-only, so all workers on a host share one copy in the page
+cache, and opening it takes milliseconds.
+
+Layout (little-endian, sections 8-byte aligned):
+
+    header    magic "MEDSNAP1", format u32, rows u32, catalog version u64,
+              then (offset u64, length u64) per section, in SECTIONS order
+    ids       u32 offsets[rows + 1] + UTF-8 blob
+    names     u32 offsets[rows + 1] + UTF-8 blob
+    keys      u32 offsets[rows + 1] + UTF-8 blob    lower(name)
+    prices    i64[rows]   price in cents, -1 when unknown
+    flags     u8[rows]    AVAILABLE | DISCONTINUED bits
+
+Rows are sorted by key in byte order (= code point order, = Python str order),
+so a prefix lookup is a binary search over the mapped keys. The header carries
+the catalog version of the import that produced the file (`import_data
+--snapshot`); a worker only uses a snapshot whose version is current, and
+otherwise falls back to building from the database.
+"""
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db.models.functions import Collate, Lower
+
+from .models import Medicine
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MEDSNAP1'
+FORMAT = 1
+SECTIONS = ('id_offsets', 'ids', 'name_offsets', 'names', 'key_offsets', 'keys', 'prices', 'flags')
+HEADER = struct.Struct('<8sIIQ' + 'QQ' * len(SECTIONS))
+
+AVAILABLE = 1
+DISCONTINUED = 2
+
+_mapped = {}
+
+
+def snapshot_path():
+    return getattr(settings, 'SEARCH_SNAPSHOT_PATH', None)
+
+
+# --- writing -----------------------------------------------------------------
+
+class _Strings:
+    def __init__(self):
+        self.offsets = array('I', [0])
+        self.blob = bytearray()
+
+    def add(self, value):
+        self.blob += value.encode('utf-8')
+        self.offsets.append(len(self.blob))
+
+
+def _cents(price):
+    if price is None:
+        return -1
+    return int((Decimal(price) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def write_snapshot(path, version, rows):
+    """
+    Write `rows` of (id, name, key, price, available, is_discontinued), already in
+    byte order of key, to `path`. The file is swapped in atomically, so workers
+    that mapped the previous one keep a consistent copy until they reopen.
+    """
+    ids, names, keys = _Strings(), _Strings(), _Strings()
+    prices, flags = array('q'), bytearray()
+    for pk, name, key, price, available, discontinued in rows:
+        ids.add(pk)
+        names.add(name)
+        keys.add(key)
+        prices.append(_cents(price))
+        flags.append((AVAILABLE if available else 0) | (DISCONTINUED if discontinued else 0))
+    count = len(prices)
+    if max(len(ids.blob), len(names.blob), len(keys.blob)) >= 2 ** 32:
+        raise ValueError("snapshot string section over 4 GiB")
+
+    payload = [ids.offsets, ids.blob, names.offsets, names.blob, keys.offsets, keys.blob, prices, flags]
+    if sys.byteorder != 'little':
+        for part in payload:
+            if isinstance(part, array):
+                part.byteswap()
+
+    table, chunks, offset = [], [], HEADER.size
+    for part in payload:
+        data = part.tobytes() if isinstance(part, array) else bytes(part)
+        pad = -offset % 8
+        chunks.append(b'\0' * pad + data)
+        offset += pad
+        table += [offset, len(data)]
+        offset += len(data)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT, count, version, *table))
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return count
+
+
+def export_snapshot(path, version):
+    """Snapshot of the current Medicine table, stamped with catalog `version`; returns the row count."""
+    rows = (Medicine.objects
+            .annotate(key=Lower('name'))
+            # byte order, so Python's bisect over the mapped keys agrees with the file
+            .order_by(Collate('key', 'C'), 'id')
+            .values_list('id', 'name', 'key', 'price', 'available', 'is_discontinued')
+            .iterator(chunk_size=5000))
+    return write_snapshot(path, version, rows)
+
+
+# --- reading -----------------------------------------------------------------
+
+class StringColumn(Sequence):
+    """Read-only sequence of str over an offsets table and a UTF-8 blob, decoded on access."""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+
+
+class Snapshot:
+    """A mapped snapshot file; columns are views into the shared mapping, nothing is copied."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, self.count, self.version, *table = HEADER.unpack_from(self._map)
+        if magic != MAGIC or fmt != FORMAT:
+            raise ValueError(f"{path}: not a format {FORMAT} catalog snapshot")
+        view = memoryview(self._map)
+        sections = {name: view[table[2 * i]:table[2 * i] + table[2 * i + 1]]
+                    for i, name in enumerate(SECTIONS)}
+        self.ids = StringColumn(sections['id_offsets'].cast('I'), sections['ids'])
+        self.names = StringColumn(sections['name_offsets'].cast('I'), sections['names'])
+        self.keys = StringColumn(sections['key_offsets'].cast('I'), sections['keys'])
+        self.prices = sections['prices'].cast('q')
+        self.flags = sections['flags']
+
+    def __len__(self):
+        return self.count
+
+    def price(self, i):
+        cents = self.prices[i]
+        return None if cents < 0 else Decimal(cents) / 100
+
+    def available(self, i):
+        return bool(self.flags[i] & AVAILABLE)
+
+    def is_discontinued(self, i):
+        return bool(self.flags[i] & DISCONTINUED)
+
+
+def load_snapshot(version):
+    """
+    The Snapshot at SEARCH_SNAPSHOT_PATH if it was built for catalog `version`,
+    else None. Mapped once per worker and per file.
+    """
+    path = snapshot_path()
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (path, stat.st_ino, stat.st_mtime_ns)
+    snapshot = _mapped.get(key)
+    if snapshot is None:
+        try:
+            snapshot = Snapshot(path)
+        except (OSError, ValueError, struct.error):
+            logger.warning("search: unreadable catalog snapshot %s", path, exc_info=True)
+            return None
+        # the previous file's mapping goes away with its last reader
+        _mapped.clear()
+        _mapped[key] = snapshot
+    if snapshot.version != version:
+        logger.info("search: snapshot %s is for catalog version %d, current is %d",
+                    path, snapshot.version, version)
+        return None
+    return snapshot
@@ -0,0 +1,192 @@
+# search/spelling.py
+"""
+Typo correction with a symmetric-delete (SymSpell) dictionary.
+
+import_data rebuilds `search_spelling_term`: every distinct lowercased word of
+Medicine.name and short_composition, with the number of times it occurs. Each
+worker loads that vocabulary and precomputes, for every term, the strings
+obtained by deleting up to MAX_DISTANCE characters from its first PREFIX_LENGTH
+characters. Deletes are symmetric, so a misspelled token and the term it came
+from always share one of them. Correcting a token therefore means generating
+its own few dozen deletes and looking each one up in a dict. The candidates
+are verified with a bounded Damerau-Levenshtein distance, and the closest,
+most frequent term wins.
+
+`correct(q)` only replaces words that are not terms and not the start of one,
+so a query that is still being typed is left alone. The corrected query is
+searched on the prefix and full-text paths (`spelled_ids`). That is the
+`symspell` fuzzy engine. The unified router runs the same path as a
+"did you mean" stage (search/router.py).
+"""
+import re
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .engines import FUSED, SYMSPELL, CatalogIndex, engine_for
+from .fusion import fulltext_candidates, prefix_candidates
+from .models import SpellingTerm
+
+DEFAULTS = {
+    "MAX_DISTANCE": 2,
+    "PREFIX_LENGTH": 7,
+    "DID_YOU_MEAN": True,
+}
+
+# shorter words are too ambiguous to correct, and are left out of the vocabulary
+MIN_TERM_LENGTH = 4
+# words up to this length get a single edit, whatever MAX_DISTANCE says
+SHORT_TERM_LENGTH = 5
+
+# same word split as pg_trgm / trigram_index; the SQL below splits the same way
+_WORD_RE = re.compile(r'[^\W_]+')
+
+VOCABULARY_SQL = f"""
+    INSERT INTO search_spelling_term (term, frequency)
+    SELECT term, count(*)
+    FROM search_medicine m,
+         regexp_split_to_table(lower(concat_ws(' ', m.name, m.short_composition)), '[^[:alnum:]]+') AS term
+    WHERE term ~ '^[[:alpha:]]+$' AND length(term) >= {MIN_TERM_LENGTH}
+    GROUP BY term
+"""
+
+_Vocabulary = namedtuple('_Vocabulary', 'terms sorted_terms deletes')
+
+
+def spelling_settings():
+    return {**DEFAULTS, **getattr(settings, "SEARCH_SPELLING", {})}
+
+
+def spelling_enabled():
+    """Whether any search path uses the dictionary (and workers should load it)."""
+    return engine_for('fuzzy') == SYMSPELL or (
+        engine_for('unified') == FUSED and spelling_settings()["DID_YOU_MEAN"])
+
+
+def rebuild_vocabulary():
+    """Replace the vocabulary with the words of the current catalog; returns the term count."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("DELETE FROM search_spelling_term")
+        cursor.execute(VOCABULARY_SQL)
+        return cursor.rowcount
+
+
+def deletes(word, distance):
+    """`word` and every string made by deleting up to `distance` of its characters."""
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - found
+        found |= frontier
+    return found
+
+
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein (optimal string alignment) distance, or limit + 1 once it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        prev2, prev = prev, row
+    return prev[-1]
+
+
+class SpellIndex(CatalogIndex):
+    """
+    Symmetric-delete map over the spelling vocabulary.
+
+    Terms are numbered 0..N-1 in descending frequency; `deletes` maps each
+    delete of a term's prefix to the numbers of the terms that produce it.
+    """
+    empty = _Vocabulary((), (), {})
+
+    def __len__(self):
+        return len(self._data[0].terms)
+
+    def load(self):
+        conf = spelling_settings()
+        max_distance, prefix_length = conf["MAX_DISTANCE"], conf["PREFIX_LENGTH"]
+        rows = SpellingTerm.objects.order_by('-frequency', 'term').values_list('term', flat=True)
+        terms, delete_map = [], {}
+        for n, term in enumerate(rows.iterator(chunk_size=5000)):
+            terms.append(term)
+            for key in deletes(term[:prefix_length], max_distance):
+                delete_map.setdefault(key, []).append(n)
+        return _Vocabulary(terms, sorted(terms), delete_map)
+
+    def is_known(self, token):
+        """`token` is a term, or the start of one."""
+        sorted_terms = self.snapshot.sorted_terms
+        i = bisect_left(sorted_terms, token)
+        return i < len(sorted_terms) and sorted_terms[i].startswith(token)
+
+    def lookup(self, token):
+        """The closest vocabulary term to `token` (ties: most frequent), or None."""
+        conf = spelling_settings()
+        vocabulary = self.snapshot
+        limit = 1 if len(token) <= SHORT_TERM_LENGTH else conf["MAX_DISTANCE"]
+        best, best_key = None, None
+        seen = set()
+        for key in deletes(token[:conf["PREFIX_LENGTH"]], limit):
+            for n in vocabulary.deletes.get(key, ()):
+                if n in seen:
+                    continue
+                seen.add(n)
+                term = vocabulary.terms[n]
+                distance = edit_distance(token, term, limit)
+                if distance > limit:
+                    continue
+                # terms are numbered by descending frequency
+                if best_key is None or (distance, n) < best_key:
+                    best, best_key = term, (distance, n)
+        return best
+
+    def correct(self, q):
+        """`q` with every unknown word replaced by its closest term; unchanged when nothing applies."""
+        def replace(match):
+            word = match.group(0)
+            token = word.lower()
+            if len(token) < MIN_TERM_LENGTH or not token.isalpha() or self.is_known(token):
+                return word
+            return self.lookup(token) or word
+        return _WORD_RE.sub(replace, q)
+
+
+spell_index = SpellIndex()
+
+
+def did_you_mean(q):
+    """The corrected query when it differs from `q` (ignoring case), else None."""
+    if not spelling_settings()["DID_YOU_MEAN"]:
+        return None
+    corrected = spell_index.correct(q)
+    return corrected if corrected.lower() != q.lower() else None
+
+
+def spelled_ids(q, limit, filters=None):
+    """
+    Ids for an already corrected query: one word goes to the prefix path first,
+    several to full text first; the other path fills up a short result.
+    """
+    paths = [prefix_candidates, fulltext_candidates]
+    if len(_WORD_RE.findall(q)) > 1:
+        paths.reverse()
+    ids, seen = [], set()
+    for candidates in paths:
+        for pk, _ in candidates(q, limit, filters):
+            if pk not in seen:
+                seen.add(pk)
+                ids.append(pk)
+        if len(ids) >= limit:
+            break
+    return ids[:limit]
@@ -0,0 +1,61 @@
+# search/streaming.py
+"""
+NDJSON streaming for result sets too large to build in memory.
+
+`?stream=1` on the search endpoints and `/search/export` write one JSON object
+per line through a StreamingHttpResponse. Rows come from a server-side cursor
+(`QuerySet.iterator()`) as `values_list` tuples, SEARCH_STREAM_CHUNK_SIZE at a
+time, and each chunk is serialized and sent before the next is fetched. A
+worker never holds more than one chunk however many rows match, and the first
+line goes out as soon as the first chunk arrives.
+
+The cursor lives in a transaction opened by the response iterator, so it is
+not materialized up front as a WITH HOLD cursor would be in autocommit. Behind a
+transaction-pooling PgBouncer, set DISABLE_SERVER_SIDE_CURSORS and rows are
+fetched client-side instead (still in chunks, but buffered by the driver).
+Under ASGI Django consumes sync streaming iterators whole before sending, so
+serve exports from the WSGI workers.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+
+from .renderers import dumps_lines
+from .replicas import similarity_threshold
+from .serializers import serialize_rows
+
+CONTENT_TYPE = 'application/x-ndjson'
+
+
+def chunk_size():
+    return getattr(settings, 'SEARCH_STREAM_CHUNK_SIZE', 2000)
+
+
+def ndjson_chunks(qs, fields, columns=None, threshold=None):
+    """
+    NDJSON bytes for `qs.values_list(*columns)` rows serialized as `fields`, one
+    chunk per item. `threshold` is the pg_trgm similarity a `%` match in `qs` needs.
+    """
+    size = chunk_size()
+    if threshold is None:
+        context = transaction.atomic(using=qs.db)
+    else:
+        context = similarity_threshold(threshold, using=qs.db)
+    with context:
+        rows = qs.values_list(*(columns or fields)).iterator(chunk_size=size)
+        while True:
+            batch = list(islice(rows, size))
+            if not batch:
+                break
+            yield dumps_lines(serialize_rows(batch, fields))
+
+
+def ndjson_response(qs, fields, columns=None, filename=None, threshold=None):
+    # pin the database now: the body is produced after the view (and its replica routing) returned
+    qs = qs.using(qs.db)
+    response = StreamingHttpResponse(ndjson_chunks(qs, fields, columns, threshold), content_type=CONTENT_TYPE)
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,72 @@
+# search/tests/base.py
+"""
+A small catalog for the view tests, loaded the way import_data loads the
+dataset. The view tests need PostgreSQL with pg_trgm, like the app itself.
+"""
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from search.compositions import sync_ingredients
+from search.engines import memory_indexes
+from search.loader import LOAD_COLUMNS, NAME_TSV_SQL, load_row
+from search.models import Medicine
+from search.phonetic import sync_phonetic_keys
+from search.spelling import rebuild_vocabulary, spell_index
+
+
+def medicine(pk, name, composition, manufacturer, price, **extra):
+    return {
+        "id": pk, "name": name, "short_composition": composition, "manufacturer_name": manufacturer,
+        "type": "allopathy", "price": price, "pack_size_label": "strip of 10 tablets", **extra,
+    }
+
+
+CATALOG = [
+    medicine("m1", "Dolo 650 Tablet", "Paracetamol (650mg)", "Micro Labs Ltd", "30.91"),
+    medicine("m2", "Crocin Advance Tablet", "Paracetamol (500mg)", "GlaxoSmithKline", "20.00"),
+    medicine("m3", "Dolonex DT Tablet", "Piroxicam (20mg)", "Pfizer Ltd", "49.50"),
+    medicine("m4", "Zyloric 100mg Tablet", "Allopurinol (100mg)", "RPG Life Sciences", "40.00"),
+    medicine("m5", "Augmentin 625 Duo Tablet", "Amoxycillin (500mg) + Clavulanic Acid (125mg)",
+             "GlaxoSmithKline", "223.42"),
+    medicine("m6", "Calpol 120mg Syrup", "Paracetamol (120mg/5ml)", "GlaxoSmithKline", "35.00",
+             available=False),
+    medicine("m7", "Becosules Capsule", "Vitamin B6 (Pyridoxine) (3mg) + Vitamin B12 (15mcg)",
+             "Pfizer Ltd", "45.00", is_discontinued=True),
+    medicine("m8", "Pacimol 650 Tablet", "Paracetamol (650mg)", "Ipca Laboratories Ltd", "28.00"),
+]
+
+
+def load_catalog():
+    Medicine.objects.bulk_create(
+        Medicine(**dict(zip(LOAD_COLUMNS, load_row(record)))) for record in CATALOG)
+    with connection.cursor() as cursor:
+        # the tsvectorupdate trigger comes from schema.sql, not from the migrations
+        cursor.execute(f"UPDATE search_medicine SET name_tsv = {NAME_TSV_SQL.format(t='')}")
+    sync_ingredients()
+    sync_phonetic_keys()
+    rebuild_vocabulary()
+
+
+@override_settings(
+    # candidate queries on pool threads would not see the test transaction's rows
+    SEARCH_FUSION_PARALLEL=False,
+    # engine overrides in one test must not serve another test's cached rows
+    SEARCH_CACHE={"ENABLED": False},
+)
+class SearchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        load_catalog()
+
+    def setUp(self):
+        # in-process indexes are per worker; start each test from this catalog
+        for index in (*memory_indexes().values(), spell_index):
+            index.refresh()
+
+    def get(self, path, **params):
+        response = self.client.get(f"/api/{path}", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def ids(self, path, **params):
+        return [row["id"] for row in self.get(path, fields="id,name", **params).json()]
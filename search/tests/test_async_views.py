@@ -0,0 +1,49 @@
+from django.test import TransactionTestCase, override_settings
+
+from search.db import close_pool
+from search.engines import memory_indexes
+
+from .base import load_catalog
+
+
+@override_settings(SEARCH_CACHE={"ENABLED": False})
+class AsyncSearchViewTests(TransactionTestCase):
+    """The pool's connections only see committed rows, hence TransactionTestCase; needs psycopg 3."""
+
+    def setUp(self):
+        load_catalog()
+        for index in memory_indexes().values():
+            index.refresh()
+
+    async def test_same_results_as_the_sync_views(self):
+        try:
+            for path, params in (
+                ("search/prefix", {"q": "dolo"}),
+                ("search/substring", {"q": "tab"}),
+                ("search/fulltext", {"q": "paracetamol"}),
+                ("search/fuzzy", {"q": "dolo tablet", "threshold": "0.3"}),
+                ("unified/", {"q": "paracetmol"}),
+                # filters run the sync view's query
+                ("search/substring", {"q": "tab", "manufacturer": "GlaxoSmithKline"}),
+                ("unified/", {"q": "tablet", "hide_discontinued": "1", "max_price": "40"}),
+            ):
+                sync_path = "search/fussy" if path == "search/fuzzy" else path
+                with self.subTest(path=path, params=params):
+                    response = await self.async_client.get(f"/api/async/{path}", params)
+                    self.assertEqual(response.status_code, 200, response.content)
+                    expected = await self.async_client.get(f"/api/{sync_path}", params)
+                    self.assertEqual(response.json(), expected.json())
+        finally:
+            await close_pool()
+
+    @override_settings(SEARCH_ENGINES={"prefix": "memory", "fuzzy": "symspell"})
+    async def test_configured_engine(self):
+        for path, sync_path in (("search/prefix", "search/prefix"), ("search/fuzzy", "search/fussy")):
+            with self.subTest(path=path):
+                response = await self.async_client.get(f"/api/async/{path}", {"q": "dolonx"})
+                expected = await self.async_client.get(f"/api/{sync_path}", {"q": "dolonx"})
+                self.assertEqual(response.json(), expected.json())
+
+    async def test_invalid_filter(self):
+        response = await self.async_client.get("/api/async/search/prefix", {"q": "dolo", "min_price": "x"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,61 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+from search import autocomplete
+from search.models import Completion
+
+from .base import SearchTestCase
+
+
+class AutocompleteSettingsTests(SimpleTestCase):
+    @override_settings(SEARCH_AUTOCOMPLETE={"TOP_K": 5, "WEIGHTS": {"shortness": 0}})
+    def test_weights_merge_with_defaults(self):
+        conf = autocomplete.autocomplete_settings()
+        self.assertEqual((conf["TOP_K"], conf["MAX_PREFIX"]), (5, autocomplete.DEFAULTS["MAX_PREFIX"]))
+        self.assertEqual(conf["WEIGHTS"], {"available": 1.0, "not_discontinued": 1.0, "shortness": 0})
+
+
+class AutocompleteTests(SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        call_command("build_autocomplete", stdout=StringIO())
+        self.version = Completion.objects.values_list("version", flat=True).first()
+        patcher = patch("search.views.get_catalog_version", return_value=self.version)
+        self.addCleanup(patcher.stop)
+        patcher.start()
+
+    def test_build_ranks_by_score(self):
+        version = self.version
+        # Calpol is unavailable, so the longer Crocin name ranks first
+        self.assertEqual(autocomplete.lookup("c", version),
+                         [["m2", "Crocin Advance Tablet"], ["m6", "Calpol 120mg Syrup"]])
+        self.assertEqual(autocomplete.lookup("dolo", version),
+                         [["m1", "Dolo 650 Tablet"], ["m3", "Dolonex DT Tablet"]])
+        # prefixes stop at MAX_PREFIX characters
+        self.assertIsNone(autocomplete.lookup("dolon", version))
+        self.assertIsNone(autocomplete.lookup("c", version + 1))
+
+    def test_view_serves_the_stored_rows(self):
+        self.assertEqual(self.get("search/autocomplete", q="C").json(), [
+            {"id": "m2", "name": "Crocin Advance Tablet"},
+            {"id": "m6", "name": "Calpol 120mg Syrup"},
+        ])
+        self.assertEqual(self.get("search/autocomplete", q="c", fields="name", limit=1).json(),
+                         [{"name": "Crocin Advance Tablet"}])
+
+    def test_view_falls_back_to_prefix_search(self):
+        # by name, as the prefix search orders
+        rows = self.get("search/autocomplete", q="c", fields="id,price").json()
+        self.assertEqual([row["id"] for row in rows], ["m6", "m2"])
+        self.assertEqual(self.ids("search/autocomplete", q="dolon"), ["m3"])
+        with patch("search.views.get_catalog_version", return_value=-1):
+            self.assertEqual(self.ids("search/autocomplete", q="c"), ["m6", "m2"])
+
+    def test_command_validates_arguments(self):
+        with self.assertRaises(CommandError):
+            call_command("build_autocomplete", "--top-k", "0", stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("build_autocomplete", "--max-prefix", "33", stdout=StringIO())
@@ -0,0 +1,66 @@
+import sys
+
+from django.test import SimpleTestCase, override_settings
+
+from search.batch import like_escape, prefix_upper_bound
+
+from .base import SearchTestCase
+
+MAX = chr(sys.maxunicode)
+
+
+class PrefixUpperBoundTests(SimpleTestCase):
+    def test_bumps_the_last_character(self):
+        self.assertEqual(prefix_upper_bound("dolo"), "dolp")
+        self.assertEqual(prefix_upper_bound("a "), "a!")
+
+    def test_last_code_point(self):
+        self.assertEqual(prefix_upper_bound("a" + MAX), "b")
+        self.assertEqual(prefix_upper_bound("a" + MAX * 2), "b")
+        # nothing is greater: an empty range
+        self.assertEqual(prefix_upper_bound(MAX), MAX)
+
+    def test_skips_surrogates(self):
+        self.assertEqual(prefix_upper_bound("퟿"), "")
+
+    def test_like_escape(self):
+        self.assertEqual(like_escape("50%_a\\b"), "50\\%\\_a\\\\b")
+
+
+class BatchSearchViewTests(SearchTestCase):
+    ITEMS = [
+        {"id": "p", "mode": "prefix", "q": "Dolo"},
+        {"id": "s", "mode": "substring", "q": "tab"},
+        {"id": "t", "mode": "fulltext", "q": "tablet"},
+        {"id": "f", "mode": "fuzzy", "q": "dolo tablet", "threshold": 0.3},
+        {"id": "e", "mode": "prefix", "q": "   "},
+    ]
+    PATHS = {"prefix": "search/prefix", "substring": "search/substring", "fulltext": "search/fulltext",
+             "fuzzy": "search/fussy"}
+
+    def batch(self, items):
+        response = self.client.post("/api/search/batch", {"items": items}, content_type="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()["results"]
+
+    def assert_like_single_queries(self):
+        results = self.batch(self.ITEMS)
+        self.assertEqual(results["e"], [])
+        for item in self.ITEMS[:-1]:
+            with self.subTest(mode=item["mode"]):
+                extra = {"threshold": item["threshold"]} if "threshold" in item else {}
+                single = self.get(self.PATHS[item["mode"]], q=item["q"], **extra).json()
+                self.assertEqual(results[item["id"]], single)
+
+    @override_settings(SEARCH_ENGINES={})
+    def test_database_engine_matches_single_queries(self):
+        self.assert_like_single_queries()
+
+    @override_settings(SEARCH_ENGINES={"prefix": "memory", "substring": "memory", "fuzzy": "symspell"})
+    def test_other_engines_match_single_queries(self):
+        self.assert_like_single_queries()
+
+    def test_unsupported_mode(self):
+        response = self.client.post("/api/search/batch", {"items": [{"mode": "unified", "q": "dolo"}]},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from search.benchmark import compare, engine_override, execute, load_queries, percentile, summarize
+from search.engines import DATABASE, MEMORY, engine_for
+
+from .base import SearchTestCase
+
+
+class StatisticsTests(SimpleTestCase):
+    def test_percentile(self):
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(percentile([5], 99), 5)
+        self.assertEqual(percentile([4, 1, 3, 2], 50), 2.5)
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 100), 5)
+        self.assertAlmostEqual(percentile(range(1, 101), 95), 95.05)
+
+    def test_summarize(self):
+        self.assertEqual(summarize([]), {"samples": 0})
+        stats = summarize([1.0, 2.0, 3.0, 4.0])
+        self.assertEqual((stats["samples"], stats["min"], stats["max"], stats["mean"]), (4, 1.0, 4.0, 2.5))
+        # 4 queries in 10 ms of summed latency
+        self.assertEqual(stats["qps"], 400.0)
+        self.assertEqual(summarize([1.0, 2.0], wall_s=0.5)["qps"], 4.0)
+
+
+class LoadQueriesTests(SimpleTestCase):
+    def load(self, doc):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(doc, f)
+        self.addCleanup(os.unlink, f.name)
+        return load_queries(f.name)
+
+    def test_query_list(self):
+        self.assertEqual(self.load([{"id": 1, "q": " dolo "}, {"q": "tab"}]), [
+            {"id": "1", "type": "substring", "query": "dolo"},
+            {"id": "2", "type": "substring", "query": "tab"},
+        ])
+
+    def test_tests_document_and_duplicate_ids(self):
+        items = self.load({"tests": [{"id": "a", "type": "prefix", "query": "do"},
+                                     {"id": "a", "type": "fuzzy", "query": "dolo", "threshold": 0.4},
+                                     {"id": "a", "type": "fulltext"}]})
+        self.assertEqual([item["id"] for item in items], ["a", "a_dup1", "a_dup2"])
+        self.assertEqual(items[1]["threshold"], 0.4)
+        self.assertEqual(items[2]["query"], "")
+
+
+class CompareTests(SimpleTestCase):
+    BASELINE = {
+        "modes": {"prefix": {"p95": 2.0}, "fuzzy": {"p95": 10.0}},
+        "http": {"prefix": {"p95": 5.0}},
+        "queries": {"1": {"results": ["A", "B"]}, "2": {"results": ["C"]}, "3": {"results": []}},
+    }
+
+    def test_regressions_and_drift(self):
+        report = {
+            "modes": {"prefix": {"p95": 2.1}, "fuzzy": {"p95": 13.0}},
+            "http": {"prefix": {"p95": None}},
+            "queries": {"1": {"results": ["A", "X"]}, "2": {"results": ["C"]}},
+        }
+        regressions, drift = compare(report, self.BASELINE, 0.1)
+        self.assertEqual(regressions, [{"section": "modes", "mode": "fuzzy", "metric": "p95",
+                                        "baseline": 10.0, "current": 13.0, "change": 0.3}])
+        self.assertEqual(drift, {"1": 0.5})
+
+    def test_engine_override(self):
+        with override_settings(SEARCH_ENGINES={"fuzzy": "symspell"}):
+            with engine_override("prefix", MEMORY):
+                self.assertEqual((engine_for("prefix"), engine_for("fuzzy")), (MEMORY, "symspell"))
+            # unknown query types time the substring view
+            with engine_override("exact", MEMORY):
+                self.assertEqual(engine_for("substring"), MEMORY)
+            self.assertEqual(engine_for("prefix"), DATABASE)
+
+
+class ExecuteTests(SearchTestCase):
+    def test_database_and_memory_engines_agree(self):
+        for qtype, q in (("prefix", "d"), ("substring", "dolo")):
+            with self.subTest(qtype=qtype):
+                with engine_override(qtype, DATABASE):
+                    expected = execute(qtype, q, 20, DATABASE)
+                self.assertTrue(expected)
+                with engine_override(qtype, MEMORY):
+                    self.assertCountEqual(execute(qtype, q, 20, MEMORY), expected)
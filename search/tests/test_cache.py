@@ -0,0 +1,78 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from search.cache import SearchCache, normalize_query, search_cache
+
+from .base import SearchTestCase
+
+PARAMS = {"limit": 10, "fields": ["id"]}
+
+
+class NormalizeQueryTests(SimpleTestCase):
+    def test_text_modes_ignore_case(self):
+        self.assertEqual(normalize_query("  Parac ", "prefix"), "parac")
+        self.assertEqual(normalize_query("Parac", "unified-fused"), "parac")
+        self.assertEqual(normalize_query("Parac", "fuzzy-facets"), "parac")
+
+    def test_other_modes_keep_case(self):
+        self.assertEqual(normalize_query(" AbC12 ", "substitutes"), "AbC12")
+
+
+@override_settings(SEARCH_CACHE={"MAX_ENTRIES": 2, "DEFAULT_TTL": 60, "TTL": {"fuzzy": 0}})
+class SearchCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = SearchCache()
+        patcher = patch("search.cache.get_catalog_version", return_value=1)
+        self.version = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_round_trip_and_case(self):
+        self.cache.set("prefix", "Dolo", PARAMS, ["m1"])
+        self.assertEqual(self.cache.get("prefix", "dolo", PARAMS), ["m1"])
+        self.assertIsNone(self.cache.get("prefix", "dolo", {**PARAMS, "limit": 5}))
+        self.assertIsNone(self.cache.get("substring", "dolo", PARAMS))
+
+    def test_substitutes_keys_are_case_sensitive(self):
+        self.cache.set("substitutes", "Ab1", PARAMS, ["m1"])
+        self.assertIsNone(self.cache.get("substitutes", "ab1", PARAMS))
+
+    def test_lru_eviction(self):
+        self.cache.set("prefix", "a", PARAMS, [1])
+        self.cache.set("prefix", "b", PARAMS, [2])
+        self.cache.get("prefix", "a", PARAMS)
+        self.cache.set("prefix", "c", PARAMS, [3])
+        self.assertEqual(self.cache.get("prefix", "a", PARAMS), [1])
+        self.assertIsNone(self.cache.get("prefix", "b", PARAMS))
+
+    def test_ttl(self):
+        self.cache.set("fuzzy", "dolo", PARAMS, [1])
+        self.assertIsNone(self.cache.get("fuzzy", "dolo", PARAMS))
+
+    def test_new_catalog_version_misses(self):
+        self.cache.set("prefix", "dolo", PARAMS, [1])
+        self.version.return_value = 2
+        self.assertIsNone(self.cache.get("prefix", "dolo", PARAMS))
+
+    def test_get_or_set_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return ["m1"]
+
+        self.assertEqual(self.cache.get_or_set("prefix", "dolo", PARAMS, compute), ["m1"])
+        self.assertEqual(self.cache.get_or_set("prefix", "Dolo", PARAMS, compute), ["m1"])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.stats()["modes"]["prefix"], {"hits": 1, "shared_hits": 0, "misses": 1})
+
+
+class CachedSearchViewTests(SearchTestCase):
+    @override_settings(SEARCH_CACHE={"ENABLED": True})
+    def test_repeated_search_is_a_hit(self):
+        search_cache.clear()
+        hits = search_cache.hits["substring"]
+        first = self.ids("search/substring", q="Tablet")
+        second = self.ids("search/substring", q="tablet")
+        self.assertEqual(first, second)
+        self.assertEqual(search_cache.hits["substring"], hits + 1)
@@ -0,0 +1,79 @@
+from django.test import SimpleTestCase
+
+from search.compositions import (
+    composition_key, ingredient_entries, parse_composition, parse_query, split_name,
+)
+from search.models import Medicine
+
+from .base import SearchTestCase
+
+
+class ParseCompositionTests(SimpleTestCase):
+    def test_parts_in_listed_order(self):
+        self.assertEqual(parse_composition("Tramadol (37.5mg) + Paracetamol (325 MG)"),
+                         [("tramadol", "37.5mg"), ("paracetamol", "325mg")])
+
+    def test_missing_strength_and_composition(self):
+        self.assertEqual(parse_composition("Calamine  Lotion"), [("calamine lotion", None)])
+        self.assertEqual(parse_composition(None), [])
+        self.assertEqual(parse_composition("  "), [])
+
+    def test_aliases_stay_out_of_the_name(self):
+        self.assertEqual(parse_composition("Vitamin B6 (Pyridoxine) (3mg)"), [("vitamin b6", "3mg")])
+
+    def test_split_name(self):
+        self.assertEqual(split_name("Vitamin B6 (Pyridoxine)"), ("vitamin b6", ["pyridoxine"]))
+        self.assertEqual(split_name("Ferrous Ascorbate (NA)"), ("ferrous ascorbate", []))
+        self.assertEqual(split_name("(Pyridoxine)"), ("pyridoxine", []))
+        self.assertEqual(split_name("Omega 3 (omega 3)"), ("omega 3", []))
+
+    def test_ingredient_entries(self):
+        self.assertEqual(ingredient_entries("Vitamin B6 (Pyridoxine) (3mg) + Vitamin B12 (15mcg)"), [
+            (0, "vitamin b6", "3mg"),
+            (0, "pyridoxine", "3mg"),
+            (1, "vitamin b12", "15mcg"),
+        ])
+
+    def test_composition_key(self):
+        key = composition_key("Amoxycillin (500mg) + Clavulanic Acid (125mg)")
+        self.assertEqual(composition_key("Clavulanic Acid (125 mg) + Amoxycillin (500mg)"), key)
+        self.assertNotEqual(composition_key("Amoxycillin (250mg) + Clavulanic Acid (125mg)"), key)
+        self.assertIsNone(composition_key(""))
+
+    def test_parse_query(self):
+        self.assertEqual(parse_query("Paracetamol"), ("paracetamol", None))
+        self.assertEqual(parse_query(" Paracetamol 500 mg "), ("paracetamol", "500mg"))
+        self.assertEqual(parse_query("ketoconazole 2% w/w"), ("ketoconazole", "2% w/w"))
+        self.assertEqual(parse_query("Vitamin B6 (Pyridoxine) (3mg)"), ("vitamin b6", "3mg"))
+
+
+class IngredientSearchViewTests(SearchTestCase):
+    def test_ingredient(self):
+        self.assertEqual(self.ids("search/ingredient", q="Paracetamol"), ["m6", "m2", "m1", "m8"])
+        self.assertEqual(self.ids("search/ingredient", q="paracetamol 650 mg"), ["m1", "m8"])
+
+    def test_each_medicine_once(self):
+        # both of Becosules' vitamins start with "vitamin b"
+        self.assertEqual(self.ids("search/ingredient", q="vitamin b"), ["m7"])
+
+    def test_alias(self):
+        self.assertEqual(self.ids("search/ingredient", q="pyridoxine"), ["m7"])
+
+    def test_no_ingredient(self):
+        self.assertEqual(self.ids("search/ingredient", q="(NA)"), [])
+        self.assertEqual(self.ids("search/ingredient", q="aspirin"), [])
+
+    def test_composition_keys_are_stored(self):
+        keys = dict(Medicine.objects.values_list("id", "composition_key"))
+        self.assertEqual(keys["m1"], keys["m8"])
+        self.assertNotEqual(keys["m1"], keys["m2"])
+
+
+class SubstitutesViewTests(SearchTestCase):
+    def test_same_composition(self):
+        self.assertEqual(self.ids("search/substitutes", id="m1"), ["m8"])
+        self.assertEqual(self.ids("search/substitutes", id="m8"), ["m1"])
+
+    def test_no_substitutes(self):
+        self.assertEqual(self.ids("search/substitutes", id="m3"), [])
+        self.assertEqual(self.ids("search/substitutes", id="missing"), [])
@@ -0,0 +1,104 @@
+from unittest.mock import MagicMock, patch
+
+from django.http import QueryDict
+from django.test import SimpleTestCase, override_settings
+from rest_framework import serializers
+
+from search.facets import _bucket_labels, facet_counts, filter_q, parse_filters
+
+from .base import SearchTestCase
+
+
+class ParseFiltersTests(SimpleTestCase):
+    def test_normalized(self):
+        params = QueryDict("manufacturer=Sun Pharma,Cipla&manufacturer=Cipla&type=allopathy"
+                           "&min_price=10.0&max_price=&in_stock=yes&hide_discontinued=0")
+        self.assertEqual(parse_filters(params), {
+            "manufacturer": ["Cipla", "Sun Pharma"], "type": ["allopathy"],
+            "min_price": "10.0", "in_stock": True,
+        })
+
+    def test_plain_dict(self):
+        self.assertEqual(parse_filters({"type": "a, b", "hide_discontinued": "1"}),
+                         {"type": ["a", "b"], "hide_discontinued": True})
+        self.assertEqual(parse_filters({}), {})
+
+    def test_invalid_price(self):
+        with self.assertRaises(serializers.ValidationError):
+            parse_filters(QueryDict("max_price=cheap"))
+
+    def test_filter_q(self):
+        self.assertEqual(str(filter_q({})), str(filter_q(None)))
+        q = filter_q({"manufacturer": ["Cipla"], "in_stock": True}, prefix="medicine__")
+        self.assertEqual(sorted(q.children), [("medicine__available", True),
+                                              ("medicine__manufacturer_name__in", ["Cipla"])])
+
+
+class FacetCountsTests(SimpleTestCase):
+    def test_bucket_labels(self):
+        self.assertEqual(_bucket_labels([0, 50, 100]), {0: "<0", 1: "0-50", 2: "50-100", 3: "100+"})
+
+    @override_settings(SEARCH_FACETS={"PRICE_BUCKETS": [50, 0], "MAX_VALUES": 1})
+    def test_rows_by_grouping_set(self):
+        # GROUPING(manufacturer_name, type, price_bucket, available, is_discontinued): 0 marks the grouped column
+        rows = [
+            (0b01111, "Cipla", None, None, None, None, 3),
+            (0b01111, "Sun", None, None, None, None, 4),
+            (0b10111, None, "allopathy", None, None, None, 7),
+            (0b11011, None, None, 2, None, None, 5),
+            (0b11011, None, None, 1, None, None, 2),
+            (0b11101, None, None, None, True, None, 7),
+            (0b11110, None, None, None, None, False, 7),
+            (0b11111, None, None, None, None, None, 7),
+        ]
+        matches = MagicMock()
+        matches.order_by().values().query.sql_with_params.return_value = ("SELECT 1", [])
+        with patch("search.facets.read_connection") as read_connection:
+            cursor = read_connection().cursor().__enter__()
+            cursor.fetchall.return_value = rows
+            result = facet_counts(matches)
+        self.assertEqual(cursor.execute.call_args.args[1], [[0, 50]])
+        self.assertEqual(result, {
+            "total": 7,
+            "manufacturer": [{"value": "Sun", "count": 4}],
+            "type": [{"value": "allopathy", "count": 7}],
+            "price": [{"value": "0-50", "count": 2}, {"value": "50+", "count": 5}],
+            "available": [{"value": True, "count": 7}],
+            "is_discontinued": [{"value": False, "count": 7}],
+        })
+
+
+class FilterViewTests(SearchTestCase):
+    def test_filters(self):
+        self.assertEqual(self.ids("search/prefix", q="c"), ["m6", "m2"])
+        self.assertEqual(self.ids("search/prefix", q="c", in_stock=1), ["m2"])
+        self.assertEqual(set(self.ids("search/substring", q="tablet", max_price="30")), {"m2", "m8"})
+        self.assertEqual(self.ids("search/substring", q="tablet", manufacturer="Pfizer Ltd"), ["m3"])
+        self.assertEqual(self.ids("search/fulltext", q="becosules", hide_discontinued=1), [])
+
+    def test_invalid_filter(self):
+        response = self.client.get("/api/search/prefix", {"q": "dolo", "min_price": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_facets(self):
+        body = self.get("search/prefix", q="dolo", facets=1, fields="id").json()
+        self.assertEqual(body["results"], [{"id": "m1"}, {"id": "m3"}])
+        facets = body["facets"]
+        self.assertEqual(facets["total"], 2)
+        self.assertEqual(facets["manufacturer"], [{"value": "Micro Labs Ltd", "count": 1},
+                                                  {"value": "Pfizer Ltd", "count": 1}])
+        self.assertEqual(facets["price"], [{"value": "0-50", "count": 2}])
+        self.assertEqual(facets["available"], [{"value": True, "count": 2}])
+
+    def test_facets_count_the_filtered_matches(self):
+        facets = self.get("search/prefix", q="c", facets=1, in_stock=1).json()["facets"]
+        self.assertEqual(facets["total"], 1)
+        self.assertEqual(facets["type"], [{"value": "allopathy", "count": 1}])
+
+    @override_settings(SEARCH_ENGINES={"unified": "fused", "fuzzy": "symspell"})
+    def test_candidate_engines_count_what_they_return(self):
+        for path, params in (("unified/", {}), ("search/fussy", {"threshold": 0.3})):
+            with self.subTest(path=path):
+                body = self.get(path, q="dolo", facets=1, **params).json()
+                self.assertTrue(body["results"])
+                self.assertEqual(body["facets"]["total"], len(body["results"]))
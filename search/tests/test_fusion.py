@@ -0,0 +1,40 @@
+from django.test import SimpleTestCase, override_settings
+
+from search.fusion import fuse
+
+from .base import SearchTestCase
+
+
+class FuseTests(SimpleTestCase):
+    def test_exact_then_prefix_then_fused_rank(self):
+        candidates = {
+            "fulltext": [("c", "Crocin Dolo Combo"), ("b", "Dolo 650 Tablet"), ("a", "Dolo")],
+            "trigram": [("d", "Dola Tablet")],
+        }
+        self.assertEqual(fuse("dolo", candidates, 10), ["a", "b", "c", "d"])
+
+    def test_found_by_more_sources_ranks_higher(self):
+        candidates = {
+            "fulltext": [("x", "Alpha Dolo"), ("y", "Beta Dolo")],
+            "substring": [("y", "Beta Dolo")],
+        }
+        self.assertEqual(fuse("dolo", candidates, 10), ["y", "x"])
+
+    def test_ties_prefer_shorter_names(self):
+        candidates = {"fulltext": [("long", "Dolo 650 Tablet")], "prefix": [("short", "Dolo 650")]}
+        self.assertEqual(fuse("dolo", candidates, 10), ["short", "long"])
+
+    def test_limit(self):
+        rows = [(str(i), f"Name {i}") for i in range(5)]
+        self.assertEqual(len(fuse("name", {"prefix": rows}, 3)), 3)
+
+
+class FusedUnifiedSearchViewTests(SearchTestCase):
+    @override_settings(SEARCH_ENGINES={"unified": "fused"})
+    def test_mid_word_match(self):
+        # neither a prefix nor a whole word: only the substring source finds it
+        self.assertIn("m3", self.ids("unified/", q="lonex"))
+
+    @override_settings(SEARCH_ENGINES={"unified": "fused"})
+    def test_exact_name_first(self):
+        self.assertEqual(self.ids("unified/", q="dolo 650 tablet")[0], "m1")
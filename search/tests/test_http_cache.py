@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from search.http_cache import add_headers, conditional, etag_for
+
+from .base import SearchTestCase
+
+PARAMS = {"limit": 20, "fields": ["id", "name"]}
+
+
+class EtagTests(SimpleTestCase):
+    def setUp(self):
+        patcher = patch("search.http_cache.get_catalog_version", return_value=3)
+        self.addCleanup(patcher.stop)
+        self.version = patcher.start()
+
+    def test_etag_identifies_the_result(self):
+        etag = etag_for("prefix", "Dolo ", PARAMS)
+        self.assertRegex(etag, r'^"v3-[0-9a-f]{20}"$')
+        self.assertEqual(etag_for("prefix", "dolo", dict(reversed(PARAMS.items()))), etag)
+        self.assertNotEqual(etag_for("substring", "dolo", PARAMS), etag)
+        self.assertNotEqual(etag_for("prefix", "dolo", {**PARAMS, "limit": 10}), etag)
+        self.version.return_value = 4
+        self.assertNotEqual(etag_for("prefix", "dolo", PARAMS), etag)
+
+    def test_case_sensitive_modes_keep_case(self):
+        self.assertNotEqual(etag_for("substitutes", "M1", PARAMS), etag_for("substitutes", "m1", PARAMS))
+
+    def test_conditional(self):
+        etag = etag_for("prefix", "dolo", PARAMS)
+        self.assertEqual(conditional(RequestFactory().get("/"), "prefix", "dolo", PARAMS), (etag, None))
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=f'"other", {etag}')
+        _, response = conditional(request, "prefix", "dolo", PARAMS)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    @override_settings(SEARCH_HTTP_CACHE={"ENABLED": False})
+    def test_disabled(self):
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(conditional(request, "prefix", "dolo", PARAMS), (None, None))
+        self.assertNotIn("ETag", add_headers(HttpResponse(), "prefix", None))
+
+    @override_settings(SEARCH_HTTP_CACHE={"DEFAULT_MAX_AGE": 30, "MAX_AGE": {"typeahead": 300}})
+    def test_headers(self):
+        response = add_headers(HttpResponse(), "typeahead", '"v3-x"')
+        self.assertEqual(response["Cache-Control"], "public, max-age=300")
+        self.assertEqual(response["Vary"], "Accept")
+        self.assertEqual(add_headers(HttpResponse(), "prefix", '"v3-x"')["Cache-Control"], "public, max-age=30")
+
+
+class ConditionalViewTests(SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = patch("search.http_cache.get_catalog_version", return_value=3)
+        self.addCleanup(patcher.stop)
+        patcher.start()
+
+    def test_not_modified(self):
+        response = self.get("search/prefix", q="dolo")
+        etag = response["ETag"]
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/search/prefix", {"q": "Dolo"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b"")
+        self.assertEqual(again["ETag"], etag)
+
+    def test_changed_request(self):
+        etag = self.get("search/prefix", q="dolo")["ETag"]
+        for params in ({"q": "dolo", "limit": 1}, {"q": "dolo", "facets": 1}, {"q": "dolo", "format": "api"}):
+            with self.subTest(params=params):
+                response = self.client.get("/api/search/prefix", params, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_per_mode_max_age(self):
+        self.assertEqual(self.get("search/substitutes", id="m1")["Cache-Control"], "public, max-age=300")
@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from decimal import Decimal
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TransactionTestCase
+
+from search.models import Medicine, MedicineIngredient, SpellingTerm
+
+from .base import CATALOG
+
+
+class ImportDataTests(TransactionTestCase):
+    """Runs the command's own transactions (and, for --fast, worker connections) against PostgreSQL."""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def write(self, name, records):
+        with open(os.path.join(self.path, name), "w", encoding="utf-8") as f:
+            json.dump(records, f)
+
+    def run_import(self, **options):
+        call_command("import_data", path=self.path, stdout=StringIO(), **options)
+
+    def assert_catalog(self, expected):
+        self.assertEqual(set(Medicine.objects.values_list("id", flat=True)), set(expected))
+        self.assertTrue(MedicineIngredient.objects.exists())
+        self.assertTrue(SpellingTerm.objects.filter(term="paracetamol").exists())
+
+    def test_fast_import(self):
+        self.write("a.json", CATALOG[:4])
+        # a duplicate id across files is merged once
+        self.write("b.json", CATALOG[4:] + [CATALOG[0]])
+        self.run_import(fast=True, workers=2)
+        self.assert_catalog(r["id"] for r in CATALOG)
+        # the merge computes name_tsv itself, with the per-row trigger disabled
+        self.assertFalse(Medicine.objects.filter(name_tsv__isnull=True).exists())
+
+    def test_fast_import_dropping_indexes(self):
+        self.write("a.json", CATALOG)
+        with connection.cursor() as cursor:
+            indexes = set(connection.introspection.get_constraints(cursor, Medicine._meta.db_table))
+        self.run_import(fast=True, drop_indexes=True)
+        self.assert_catalog(r["id"] for r in CATALOG)
+        with connection.cursor() as cursor:
+            self.assertEqual(set(connection.introspection.get_constraints(cursor, Medicine._meta.db_table)), indexes)
+
+    def test_drop_indexes_needs_fast(self):
+        with self.assertRaises(CommandError):
+            self.run_import(drop_indexes=True)
+
+    def test_orm_import(self):
+        self.write("a.json", CATALOG)
+        self.run_import()
+        self.assert_catalog(r["id"] for r in CATALOG)
+
+    def test_delta_upserts_changed_and_new_records(self):
+        self.write("a.json", CATALOG)
+        self.run_import()
+        changed = [{**CATALOG[0], "price": "33.00"}, *CATALOG[1:],
+                   {**CATALOG[1], "id": "m9", "name": "Crocin Pain Relief Tablet"}]
+        self.write("a.json", changed)
+        self.run_import(delta=True)
+        self.assertEqual(Medicine.objects.get(pk="m1").price, Decimal("33.00"))
+        self.assertTrue(Medicine.objects.filter(pk="m9").exists())
+        self.assertTrue(MedicineIngredient.objects.filter(medicine_id="m9").exists())
+
+    def test_delta_keeps_rows_missing_from_the_dump(self):
+        self.write("a.json", CATALOG)
+        self.run_import()
+        self.write("a.json", CATALOG[1:])
+        self.run_import(delta=True)
+        self.assertTrue(Medicine.objects.filter(pk="m1").exists())
+
+    def test_delta_prune(self):
+        self.write("a.json", CATALOG)
+        self.run_import()
+        self.write("a.json", CATALOG[1:])
+        self.run_import(delta=True, prune=True, max_delete_ratio=0.5)
+        self.assertFalse(Medicine.objects.filter(pk="m1").exists())
+
+    def test_delta_prune_refuses_a_partial_dump(self):
+        self.write("a.json", CATALOG)
+        self.run_import()
+        self.write("a.json", CATALOG[:2])
+        with self.assertRaises(CommandError):
+            self.run_import(delta=True, prune=True)
+        self.assertEqual(Medicine.objects.count(), len(CATALOG))
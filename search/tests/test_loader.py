@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from search.loader import copy_line, iter_records, load_row, record_hash, record_row
+
+
+class IterRecordsTests(SimpleTestCase):
+    def records(self, text, chunk_size=4):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+            f.write(text)
+        self.addCleanup(os.unlink, f.name)
+        return list(iter_records(f.name, chunk_size=chunk_size))
+
+    def test_streams_an_array_across_chunks(self):
+        text = '[\n {"id": 1, "name": "Dolo [650]"},\n {"id": 2, "name": "Crocin, \\"Advance\\""}\n]'
+        self.assertEqual(self.records(text), [{"id": 1, "name": "Dolo [650]"},
+                                              {"id": 2, "name": 'Crocin, "Advance"'}])
+        self.assertEqual(self.records(text, chunk_size=1 << 16), self.records(text))
+
+    def test_empty_array(self):
+        self.assertEqual(self.records("  [ ]  "), [])
+
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            self.records('{"id": 1}')
+
+    def test_unterminated(self):
+        with self.assertRaises(ValueError):
+            self.records('[{"id": 1}, ')
+
+
+class RowTests(SimpleTestCase):
+    def test_defaults(self):
+        row = record_row({"id": 7, "name": "Dolo"})
+        self.assertEqual(row[0], "7")
+        self.assertEqual(row[-2:], [False, True])
+        self.assertIsNone(row[6])
+
+    def test_hash_follows_content(self):
+        record = {"id": "m1", "name": "Dolo", "price": "30.91"}
+        self.assertEqual(record_hash(record_row(record)), record_hash(record_row(dict(record))))
+        self.assertNotEqual(record_hash(record_row(record)),
+                            record_hash(record_row({**record, "price": "31.00"})))
+        self.assertEqual(load_row(record)[-1], record_hash(record_row(record)))
+
+    def test_copy_line_escapes(self):
+        self.assertEqual(copy_line(["a\tb", None, True, False, "c\\d\ne"]),
+                         "a\\tb\t\\N\tt\tf\tc\\\\d\\ne\n")
@@ -0,0 +1,90 @@
+import asyncio
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from search import metrics
+from search.metrics import Histogram, Registry, RequestMetrics, SearchMetricsMiddleware, server_timing
+
+from .base import SearchTestCase
+
+
+class HistogramTests(SimpleTestCase):
+    def test_observe(self):
+        hist = Histogram((1, 5))
+        for value in (0, 1, 2, 9):
+            hist.observe(value)
+        # a value on a bound falls in that bound's bucket, as le= says
+        self.assertEqual(hist.counts, [2, 1, 1])
+        self.assertEqual((hist.sum, hist.count), (12, 4))
+
+
+class RegistryTests(SimpleTestCase):
+    def request(self, mode, rows, plan=None):
+        m = RequestMetrics()
+        m.mode, m.plan, m.rows, m.queries, m.db_s = mode, plan, rows, 2, 0.003
+        return m
+
+    def test_render_cumulative_buckets(self):
+        registry = Registry()
+        registry.observe(self.request('prefix', 3), 0.004)
+        registry.observe(self.request('prefix', 30), 0.02)
+        text = registry.render()
+        self.assertIn('search_rows_returned_bucket{mode="prefix",le="5"} 1', text)
+        self.assertIn('search_rows_returned_bucket{mode="prefix",le="50"} 2', text)
+        self.assertIn('search_rows_returned_bucket{mode="prefix",le="+Inf"} 2', text)
+        self.assertIn('search_rows_returned_sum{mode="prefix"} 33.000000', text)
+        self.assertIn('search_db_queries_count{mode="prefix"} 2', text)
+        self.assertIn('# TYPE search_request_duration_seconds histogram', text)
+        self.assertNotIn('search_router_plans_total{', text)
+
+    def test_render_plans(self):
+        registry = Registry()
+        registry.observe(self.request('unified', 1, plan='prefix'), 0.001)
+        registry.observe(self.request('unified', 1, plan='prefix'), 0.001)
+        self.assertIn('search_router_plans_total{mode="unified",plan="prefix"} 2', registry.render())
+
+    def test_server_timing(self):
+        m = self.request('unified', 1, plan='fused')
+        m.serialize_s = 0.0005
+        self.assertEqual(server_timing(m, 0.01),
+                         'db;dur=3.00;desc="2 queries", ser;dur=0.50, total;dur=10.00, plan;desc="fused"')
+
+
+class MiddlewareTests(SimpleTestCase):
+    def search_view(self, request):
+        metrics.set_mode('prefix')
+        metrics.add_rows(2)
+        metrics.add_db(0.001, queries=3)
+        return HttpResponse()
+
+    def test_tags_search_responses(self):
+        response = SearchMetricsMiddleware(self.search_view)(RequestFactory().get('/'))
+        self.assertTrue(response['Server-Timing'].startswith('db;dur=1.00;desc="3 queries"'))
+
+    def test_skips_other_responses(self):
+        response = SearchMetricsMiddleware(lambda request: HttpResponse())(RequestFactory().get('/'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_async(self):
+        async def view(request):
+            return self.search_view(request)
+        middleware = SearchMetricsMiddleware(view)
+        response = asyncio.run(middleware(RequestFactory().get('/')))
+        self.assertIn('Server-Timing', response)
+
+    def test_helpers_outside_a_request(self):
+        # no RequestMetrics: nothing to record, nothing raised
+        metrics.set_mode('prefix')
+        metrics.add_rows(1)
+        with metrics.timed_serialize():
+            pass
+
+
+class MetricsViewTests(SearchTestCase):
+    def test_search_request_is_recorded(self):
+        response = self.get("search/prefix", q="dolo")
+        self.assertIn('desc="', response['Server-Timing'])
+        text = self.client.get("/api/metrics").content.decode()
+        self.assertIn('search_rows_returned_count{mode="prefix"}', text)
+        self.assertIn('search_cache_entries', text)
@@ -0,0 +1,72 @@
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+from search.partitions import (
+    KEYS, PARENT, partition_bound, partition_groups, partition_key, partition_table,
+)
+
+from .base import SearchTestCase
+
+PARTITIONED = {mode: "partitioned" for mode in ("prefix", "substring", "fuzzy", "fulltext")}
+
+
+class PartitionKeyTests(SimpleTestCase):
+    def test_partition_key(self):
+        self.assertEqual(partition_key("Dolo 650"), "d")
+        self.assertEqual(partition_key("dolo"), "d")
+        self.assertEqual(partition_key("3D Cream"), "0")
+        self.assertEqual(partition_key("(R) Cream"), "_")
+        self.assertEqual(partition_key("Éclair"), "_")
+        self.assertEqual(partition_key(""), "_")
+
+    def test_tables_and_bounds(self):
+        self.assertEqual(partition_table("a"), f"{PARENT}_a")
+        self.assertEqual(partition_table("_"), f"{PARENT}_other")
+        self.assertEqual(partition_bound("0"), "FOR VALUES IN ('0')")
+        self.assertEqual(partition_bound("_"), "DEFAULT")
+
+    def test_groups_cover_every_partition_once(self):
+        for fanout in (0, 1, 4, len(KEYS), 100):
+            with self.subTest(fanout=fanout):
+                groups = partition_groups(fanout)
+                self.assertEqual(len(groups), max(1, min(fanout, len(KEYS))))
+                self.assertEqual(sorted(key for group in groups for key in group), sorted(KEYS))
+
+
+class PartitionedSearchViewTests(SearchTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        with connection.cursor() as cursor:
+            # load_catalog() sets name_tsv after the rows were projected
+            cursor.execute(f"UPDATE {PARENT} p SET name_tsv = m.name_tsv FROM search_medicine m WHERE p.id = m.id")
+
+    def test_rows_land_in_their_partition(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT id, initial FROM {PARENT} ORDER BY id")
+            rows = dict(cursor.fetchall())
+        self.assertEqual(rows["m4"], "z")
+        self.assertEqual(len(rows), 8)
+
+    def test_prefix_matches_the_database_engine(self):
+        expected = self.ids("search/prefix", q="Dolo")
+        with override_settings(SEARCH_ENGINES=PARTITIONED):
+            self.assertEqual(self.ids("search/prefix", q="Dolo"), expected)
+            self.assertEqual(self.ids("search/prefix", q="dolo_"), [])
+
+    def test_fan_out_matches_the_database_engine(self):
+        for path, params in [
+            ("search/substring", {"q": "tab"}),
+            ("search/fussy", {"q": "dolo tablet", "threshold": 0.3}),
+            ("search/fulltext", {"q": "tablet"}),
+        ]:
+            expected = set(self.ids(path, **params))
+            self.assertTrue(expected)
+            for fanout in (1, 4):
+                with self.subTest(path=path, fanout=fanout), \
+                        override_settings(SEARCH_ENGINES=PARTITIONED, SEARCH_PARTITIONS={"FANOUT": fanout}):
+                    self.assertEqual(set(self.ids(path, **params)), expected)
+
+    @override_settings(SEARCH_ENGINES=PARTITIONED)
+    def test_limit_keeps_the_best(self):
+        self.assertEqual(self.ids("search/substring", q="Dolo", limit=1), ["m1"])
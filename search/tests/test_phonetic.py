@@ -0,0 +1,64 @@
+from django.test import SimpleTestCase
+
+from search.models import Medicine, MedicinePhonetic
+from search.phonetic import name_keys, normalize, phonetic_keys, query_keys, sync_phonetic_keys
+
+from .base import SearchTestCase
+
+
+class PhoneticKeyTests(SimpleTestCase):
+    def test_sound_alike_spellings(self):
+        for spellings in [
+            ("Zyloric", "Ziloric", "Xyloric"),
+            ("Cefixime", "Sefixime"),
+            ("Erythromycin", "Eritromicin"),
+            ("Haemoglobin", "Hemoglobin"),
+            ("Ciprofloxacin", "Siprofloxasin"),
+        ]:
+            with self.subTest(spellings=spellings):
+                self.assertEqual(len({phonetic_keys(word) for word in spellings}), 1)
+
+    def test_keys(self):
+        self.assertEqual(phonetic_keys("Zyloric"), ("SLRK",))
+        self.assertEqual(phonetic_keys("Erythromycin"), ("ARTRMSN",))
+        # repeated sounds collapse only when adjacent
+        self.assertEqual(phonetic_keys("Anand"), ("ANNT",))
+
+    def test_alternate_key(self):
+        self.assertEqual(phonetic_keys("Gentamicin"), ("JNTMSN", "KNTMSN"))
+        self.assertEqual(phonetic_keys("Chlorzoxazone"), ("KLRSKSSN", "XLRSKSSN"))
+
+    def test_unusable_words(self):
+        self.assertEqual(phonetic_keys("ab"), ())
+        self.assertEqual(phonetic_keys("650"), ())
+        self.assertEqual(phonetic_keys("b12x"), ())
+
+    def test_normalize(self):
+        self.assertEqual(normalize("Xylo"), "zilo")
+        self.assertEqual(normalize("Sulpha"), "sulfa")
+        self.assertEqual(normalize("yeast"), "yeast")
+
+    def test_name_and_query_keys(self):
+        self.assertEqual(name_keys("Zyloric 100mg Tablet"), {"SLRK", "TBLT"})
+        self.assertEqual(name_keys(None), set())
+        self.assertEqual(query_keys("ziloric tablet Tablet 100"), [{"SLRK"}, {"TBLT"}])
+        self.assertEqual(query_keys("ab 12"), [])
+
+
+class PhoneticSearchViewTests(SearchTestCase):
+    def test_sounds_like(self):
+        self.assertEqual(self.ids("search/phonetic", q="ziloric"), ["m4"])
+        self.assertEqual(self.ids("search/phonetic", q="Crosin tablet"), ["m2"])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.ids("search/phonetic", q="ziloric syrup"), [])
+
+    def test_no_usable_word(self):
+        self.assertEqual(self.ids("search/phonetic", q="xx 10"), [])
+
+    def test_partial_sync(self):
+        Medicine.objects.filter(pk="m4").update(name="Allorin Tablet")
+        self.assertEqual(sync_phonetic_keys(["m4"]), len(name_keys("Allorin Tablet")))
+        self.assertEqual(self.ids("search/phonetic", q="ziloric"), [])
+        self.assertEqual(self.ids("search/phonetic", q="alorin"), ["m4"])
+        self.assertTrue(MedicinePhonetic.objects.filter(medicine_id="m1").exists())
@@ -0,0 +1,57 @@
+from django.test import SimpleTestCase
+
+from search.prefix_fulltext import parse
+
+from .base import SearchTestCase
+
+
+class ParseTests(SimpleTestCase):
+    def test_last_word_is_a_prefix(self):
+        self.assertEqual(parse("dolo 65"), "'dolo' & '65':*")
+
+    def test_or(self):
+        self.assertEqual(parse("crocin OR dolo"), "'crocin' | 'dolo':*")
+        self.assertEqual(parse("crocin | dolo"), "'crocin' | 'dolo':*")
+
+    def test_phrase(self):
+        self.assertEqual(parse('"dolo 650" tab'), "('dolo' <-> '650') & 'tab':*")
+        # a closed phrase is not being typed
+        self.assertEqual(parse('"dolo 650"'), "('dolo' <-> '650')")
+        # an open one is
+        self.assertEqual(parse('"dolo 65'), "('dolo' <-> '65':*)")
+
+    def test_negation(self):
+        self.assertEqual(parse("paracetamol -syrup"), "'paracetamol' & !'syrup'")
+        self.assertEqual(parse('paracetamol -"oral suspension"'),
+                         "'paracetamol' & !('oral' <-> 'suspension')")
+
+    def test_negated_or_branch_excludes_from_the_whole_query(self):
+        self.assertEqual(parse("dolo OR -syrup"), "'dolo' & !'syrup'")
+        self.assertEqual(parse("-syrup OR dolo"), "'dolo':* & !'syrup'")
+        self.assertEqual(parse("crocin OR dolo OR -syrup"), "('crocin' | 'dolo') & !'syrup'")
+
+    def test_only_negated_or_no_words(self):
+        for q in ("-syrup", "-syrup -gel", "-syrup OR -gel", "", "OR", "& | !"):
+            with self.subTest(q=q):
+                self.assertIsNone(parse(q))
+
+    def test_punctuation_never_reaches_the_tsquery(self):
+        self.assertEqual(parse("dolo's (650) & !tab:*"), "('dolo' <-> 's') & '650' & 'tab':*")
+
+    def test_weight_keeps_exclusions_unweighted(self):
+        self.assertEqual(parse("dolo -syrup 65", weight="A"), "'dolo':A & !'syrup' & '65':*A")
+
+
+class PrefixFullTextSearchViewTests(SearchTestCase):
+    def test_last_word_matches_as_a_prefix(self):
+        self.assertEqual(set(self.ids("search/fulltext/prefix", q="dolo 65")), {"m1"})
+        self.assertEqual(set(self.ids("search/fulltext/prefix", q="dol")), {"m1", "m3"})
+
+    def test_name_matches_rank_before_composition_matches(self):
+        ids = self.ids("search/fulltext/prefix", q="paracetamol OR crocin")
+        self.assertEqual(ids[0], "m2")
+
+    def test_excluded_word(self):
+        ids = self.ids("search/fulltext/prefix", q="paracetamol -syrup")
+        self.assertEqual(set(ids), {"m1", "m2", "m8"})
+        self.assertEqual(self.ids("search/fulltext/prefix", q="paracetamol OR -syrup"), ids)
@@ -0,0 +1,64 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from search.prefix_index import PrefixIndex
+
+from .base import SearchTestCase
+
+NAMES = [
+    ("m1", "dolo 650 tablet"),
+    ("m2", "crocin advance tablet"),
+    ("m3", "dolonex dt tablet"),
+    ("m8", "pacimol 650 tablet"),
+    ("m9", "dolo 650 syrup"),
+]
+
+
+class PrefixIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = PrefixIndex()
+        keys, ids = zip(*sorted((name, pk) for pk, name in NAMES))
+        self.index._data = ((keys, ids), 1)
+        patcher = patch("search.engines.get_catalog_version", return_value=1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_matches_in_key_order(self):
+        self.assertEqual(self.index.search("dolo", 10), ["m9", "m1", "m3"])
+        self.assertEqual(self.index.search("dolo 650 t", 10), ["m1"])
+
+    def test_limit(self):
+        self.assertEqual(self.index.search("dolo", 2), ["m9", "m1"])
+
+    def test_bounds(self):
+        # before the first key, after the last, and between two keys
+        self.assertEqual(self.index.search("a", 10), [])
+        self.assertEqual(self.index.search("z", 10), [])
+        self.assertEqual(self.index.search("dolp", 10), [])
+        self.assertEqual(self.index.search("pacimol 650 tablet", 10), ["m8"])
+        self.assertEqual(self.index.search("pacimol 650 tablets", 10), [])
+
+    def test_empty_prefix_matches_everything(self):
+        self.assertEqual(len(self.index.search("", 10)), len(NAMES))
+
+    def test_stale_version_rebuilds(self):
+        with patch("search.engines.get_catalog_version", return_value=2), \
+                patch.object(PrefixIndex, "build") as build:
+            self.index.ensure_fresh()
+        build.assert_called_once_with(2)
+
+
+class PrefixSearchViewTests(SearchTestCase):
+    def test_memory_and_database_engines_agree(self):
+        for q in ("dolo", "DOLO 6", "p", "zzz"):
+            with self.subTest(q=q):
+                with override_settings(SEARCH_ENGINES={"prefix": "memory"}):
+                    memory = self.ids("search/prefix", q=q)
+                with override_settings(SEARCH_ENGINES={"prefix": "database"}):
+                    database = self.ids("search/prefix", q=q)
+                self.assertEqual(memory, database)
+
+    def test_prefix_only(self):
+        self.assertEqual(self.ids("search/prefix", q="dolo"), ["m1", "m3"])
+        self.assertEqual(self.ids("search/prefix", q="650"), [])
@@ -0,0 +1,114 @@
+from unittest.mock import MagicMock, patch
+
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, override_settings
+
+from search.models import Medicine
+from search.prepared import _args
+from search.replicas import (
+    PRIMARY, ReplicaHealth, SearchReplicaRouter, read_alias, replica_reads,
+)
+
+from .base import SearchTestCase
+
+
+def replicas(**conf):
+    return override_settings(SEARCH_REPLICAS={"ALIASES": ["replica_1", "replica_2"], **conf})
+
+
+class ReplicaHealthTests(SimpleTestCase):
+    def setUp(self):
+        self.health = ReplicaHealth()
+        patcher = patch("search.replicas.connections", {
+            "replica_1": MagicMock(name="replica_1"), "replica_2": MagicMock(name="replica_2")})
+        self.addCleanup(patcher.stop)
+        self.connections = patcher.start()
+        self.lags = {"replica_1": 0.5, "replica_2": 0.5}
+        patcher = patch.object(ReplicaHealth, "_lag", lambda health, alias: self.lags[alias])
+        self.addCleanup(patcher.stop)
+        patcher.start()
+
+    def test_no_replicas(self):
+        self.assertEqual(self.health.choose(), PRIMARY)
+
+    @replicas()
+    def test_round_robin(self):
+        self.assertEqual([self.health.choose() for _ in range(3)], ["replica_1", "replica_2", "replica_1"])
+
+    @replicas()
+    def test_unreachable_replica_is_skipped(self):
+        self.connections["replica_1"].ensure_connection.side_effect = DatabaseError("refused")
+        with self.assertLogs("search.replicas", "WARNING"):
+            self.assertEqual([self.health.choose() for _ in range(2)], ["replica_2", "replica_2"])
+        self.assertEqual(self.health.stats(), {"replica_1": False, "replica_2": True})
+        # not retried before RETRY_AFTER
+        self.assertEqual(self.connections["replica_1"].ensure_connection.call_count, 1)
+
+    @replicas(MAX_LAG=10, RETRY_AFTER=0)
+    def test_lagging_replica_is_skipped(self):
+        self.lags["replica_1"] = 60
+        with self.assertLogs("search.replicas", "WARNING"):
+            self.assertEqual(self.health.choose(), "replica_2")
+        self.lags["replica_2"] = None
+        self.lags["replica_1"] = 1
+        # replica_2 was checked moments ago; replica_1 is back after RETRY_AFTER
+        self.assertEqual([self.health.choose() for _ in range(2)], ["replica_1", "replica_2"])
+
+    @replicas()
+    def test_primary_when_every_replica_is_down(self):
+        for alias in ("replica_1", "replica_2"):
+            self.connections[alias].ensure_connection.side_effect = DatabaseError("refused")
+        with self.assertLogs("search.replicas", "WARNING"):
+            self.assertEqual(self.health.choose(), PRIMARY)
+
+
+class RouterTests(SimpleTestCase):
+    @replicas()
+    def test_reads_inside_replica_reads(self):
+        router = SearchReplicaRouter()
+        self.assertIsNone(router.db_for_read(Medicine))
+        with patch("search.replicas.replica_health.choose", return_value="replica_2"), replica_reads():
+            self.assertEqual(read_alias(), "replica_2")
+            self.assertEqual(router.db_for_read(Medicine), "replica_2")
+            self.assertEqual(router.db_for_write(Medicine), PRIMARY)
+        self.assertEqual(read_alias(), PRIMARY)
+        self.assertTrue(router.allow_migrate(PRIMARY, "search"))
+        self.assertFalse(router.allow_migrate("replica_1", "search"))
+
+
+class PreparedArgsTests(SimpleTestCase):
+    def test_args(self):
+        self.assertEqual(_args("prefix", "Dolo", 5, None), ["dolo", "dolp", 5])
+        self.assertEqual(_args("substring", "50%", 5, None), ["50%", "%50\\%%", 5])
+        self.assertEqual(_args("fulltext", "dolo", 5, None), ["dolo", 5])
+        self.assertEqual(_args("fuzzy", "dolo", 5, 0.3), ["dolo", 5])
+
+
+class PreparedSearchViewTests(SearchTestCase):
+    PREPARED = {mode: "prepared" for mode in ("prefix", "substring", "fulltext", "fuzzy")}
+
+    def test_same_results_as_the_orm(self):
+        for path, params in [
+            ("search/prefix", {"q": "Dolo"}),
+            ("search/substring", {"q": "tab"}),
+            ("search/fulltext", {"q": "tablet"}),
+            ("search/fussy", {"q": "dolo tablet", "threshold": 0.3}),
+        ]:
+            expected = self.get(path, **params).json()
+            self.assertTrue(expected)
+            with self.subTest(path=path), override_settings(SEARCH_ENGINES=self.PREPARED):
+                rows = self.get(path, **params).json()
+                if path == "search/prefix":
+                    self.assertEqual(rows, expected)
+                else:
+                    self.assertCountEqual(rows, expected)
+
+    @override_settings(SEARCH_ENGINES=PREPARED)
+    def test_statements_are_prepared_once_per_connection(self):
+        self.ids("search/prefix", q="dolo")
+        self.ids("search/prefix", q="crocin")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM pg_prepared_statements")
+            names = [name for name, in cursor.fetchall()]
+        self.assertEqual(names.count("search_prefix"), 1)
+        self.assertEqual(self.ids("search/prefix", q="dolo_"), [])
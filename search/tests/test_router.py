@@ -0,0 +1,59 @@
+from django.test import SimpleTestCase, override_settings
+
+from search.router import PLANS, classify, plan_for
+
+from .base import SearchTestCase
+
+
+class ClassifyTests(SimpleTestCase):
+    def test_shapes(self):
+        for q, kind in [
+            ("pa", "short"),
+            (" -- ", "short"),
+            ("Tablet", "stopwords"),
+            ("syrup 100 ml", "numeric"),
+            ("650mg", "numeric"),
+            ("augmentin 625 duo tab", "long"),
+            ("dolo 650", "multiword"),
+            ("paracetmol", "word"),
+            ("paracetmol tablet", "word"),
+        ]:
+            with self.subTest(q=q):
+                self.assertEqual(classify(q).kind, kind)
+
+    def test_counts(self):
+        shape = classify(" Dolo 650 Tablet ")
+        self.assertEqual((shape.length, shape.tokens, shape.content_tokens, shape.has_digits),
+                         (15, 3, 2, True))
+
+    def test_default_plans(self):
+        self.assertEqual(plan_for("pa")[0], "prefix")
+        self.assertEqual(plan_for("dolo 650")[0], "prefix_fulltext")
+        self.assertEqual(plan_for("paracetmol")[0], "fused")
+        self.assertEqual(PLANS["fused"], ("prefix", "fulltext", "substring", "trigram"))
+
+    @override_settings(SEARCH_ROUTES={"multiword": "trigram", "word": "nonsense"})
+    def test_overridden_routes(self):
+        self.assertEqual(plan_for("dolo 650")[0], "trigram")
+        # an unknown plan falls back to running every source
+        self.assertEqual(plan_for("paracetmol")[0], "fused")
+
+
+@override_settings(SEARCH_ENGINES={"unified": "fused"}, SEARCH_METRICS_ENABLED=True)
+class UnifiedRouterViewTests(SearchTestCase):
+    def plan(self, q):
+        response = self.get("unified/", q=q)
+        return self.ids("unified/", q=q), response["Server-Timing"].split('plan;desc=')[1].strip('"')
+
+    def test_short_query_is_never_widened(self):
+        self.assertEqual(self.plan("pa"), (["m8"], "prefix"))
+
+    def test_short_plan_is_widened(self):
+        ids, plan = self.plan("dolo 650")
+        self.assertEqual(ids[0], "m1")
+        self.assertEqual(plan, "prefix_fulltext+widened")
+
+    def test_did_you_mean(self):
+        ids, plan = self.plan("dolonx")
+        self.assertEqual(ids[0], "m3")
+        self.assertEqual(plan, "fused+corrected")
@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from search.models import Medicine
+from search.renderers import dumps, dumps_lines
+from search.serializers import (
+    MEDICINE_FIELDS, MedicineSerializer, parse_fields, project_rows, serialize_rows,
+)
+
+from .base import SearchTestCase
+
+ROW = ("m1", "s1", "Dolo 650 Tablet", "Micro Labs Ltd", None, "allopathy", Decimal("30.9"),
+       "strip of 15 tablets", "Paracetamol (650mg)", False, True)
+
+
+class SerializerTests(SimpleTestCase):
+    def test_parse_fields(self):
+        self.assertEqual(parse_fields(None), MEDICINE_FIELDS)
+        self.assertEqual(parse_fields(" name, id ,"), ["id", "name"])
+        with self.assertRaises(serializers.ValidationError):
+            parse_fields("id,password")
+
+    def test_rows_serialize_like_the_model_serializer(self):
+        expected = MedicineSerializer(Medicine(**dict(zip(MEDICINE_FIELDS, ROW)))).data
+        self.assertEqual(serialize_rows([ROW], MEDICINE_FIELDS), [expected])
+        self.assertEqual(expected["price"], "30.90")
+
+    def test_project_rows(self):
+        self.assertEqual(project_rows([ROW], ["id", "price"]), [{"id": "m1", "price": "30.90"}])
+        self.assertEqual(project_rows([ROW[:2] + (None,) * 9], ["price"]), [{"price": None}])
+
+
+class RendererTests(SimpleTestCase):
+    def test_same_bytes_as_drf(self):
+        data = [{"id": "m1", "name": "Dolo 650 é", "available": True, "price": None, "n": 3}]
+        self.assertEqual(dumps(data), JSONRenderer().render(data))
+        self.assertEqual(dumps_lines(data), JSONRenderer().render(data[0]) + b"\n")
+
+
+class FieldProjectionViewTests(SearchTestCase):
+    def test_fields(self):
+        rows = self.get("search/prefix", q="dolo", fields="name,id").json()
+        self.assertEqual(rows[0], {"id": "m1", "name": "Dolo 650 Tablet"})
+
+    def test_unknown_field(self):
+        response = self.client.get("/api/search/prefix", {"q": "dolo", "fields": "secret"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from search.singleflight import SingleFlight, single_flight
+
+from .base import SearchTestCase
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.gate = threading.Event()
+        self.calls = 0
+
+    def slow(self, value="rows"):
+        def compute():
+            self.calls += 1
+            self.gate.wait(5)
+            return value
+        return compute
+
+    def start_leader(self, compute):
+        results = []
+        leader = threading.Thread(target=lambda: results.append(self.flight.do("k", compute, "prefix")))
+        leader.start()
+        while not self.flight.stats()["in_flight"]:
+            time.sleep(0.001)
+        return leader, results
+
+    def test_waiters_share_the_leader_result(self):
+        leader, results = self.start_leader(self.slow())
+        waiters = [threading.Thread(target=lambda: results.append(self.flight.do("k", self.slow("own"), "prefix")))
+                   for _ in range(4)]
+        for thread in waiters:
+            thread.start()
+        # let the waiters reach the in-flight call before it finishes
+        time.sleep(0.2)
+        self.gate.set()
+        for thread in (leader, *waiters):
+            thread.join()
+        self.assertEqual(results, ["rows"] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flight.stats(), {"in_flight": 0, "modes": {"prefix": {"leader": 1, "collapsed": 4}}})
+
+    def test_other_keys_do_not_wait(self):
+        leader, _ = self.start_leader(self.slow())
+        self.assertEqual(self.flight.do("other", lambda: "other"), "other")
+        self.gate.set()
+        leader.join()
+
+    @override_settings(SEARCH_SINGLE_FLIGHT={"WAIT": 0.01})
+    def test_waiter_gives_up(self):
+        leader, results = self.start_leader(self.slow())
+        self.assertEqual(self.flight.do("k", lambda: "own", "prefix"), "own")
+        self.gate.set()
+        leader.join()
+        self.assertEqual(results, ["rows"])
+        self.assertEqual(self.flight.stats()["modes"]["prefix"], {"leader": 1, "timeout": 1})
+
+    def test_leader_error_reaches_waiters(self):
+        def fail():
+            self.gate.wait(5)
+            raise ValueError("boom")
+
+        errors = []
+
+        def call():
+            try:
+                self.flight.do("k", fail)
+            except ValueError as exc:
+                errors.append(exc)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        while not self.flight.stats()["in_flight"]:
+            time.sleep(0.001)
+        waiter = threading.Thread(target=call)
+        waiter.start()
+        time.sleep(0.2)
+        self.gate.set()
+        leader.join()
+        waiter.join()
+        self.assertEqual(len(errors), 2)
+        self.assertIs(errors[0], errors[1])
+        # the failed call is gone; the next one runs again
+        self.assertEqual(self.flight.do("k", lambda: "rows"), "rows")
+
+    @override_settings(SEARCH_SINGLE_FLIGHT={"ENABLED": False})
+    def test_disabled(self):
+        self.assertEqual(self.flight.do("k", lambda: "rows", "prefix"), "rows")
+        self.assertEqual(self.flight.stats(), {"in_flight": 0, "modes": {}})
+
+
+class SingleFlightViewTests(SearchTestCase):
+    def test_searches_run_as_leaders(self):
+        before = single_flight.outcomes[("prefix", "leader")]
+        self.get("search/prefix", q="dolo")
+        self.assertEqual(single_flight.outcomes[("prefix", "leader")], before + 1)
+        text = self.client.get("/api/metrics").content.decode()
+        self.assertIn(f'search_single_flight_requests_total{{mode="prefix",outcome="leader"}} {before + 1}', text)
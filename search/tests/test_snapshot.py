@@ -0,0 +1,106 @@
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+from search import snapshot
+from search.catalog import read_catalog_version
+from search.prefix_index import prefix_index
+from search.snapshot import Snapshot, StringColumn, load_snapshot, write_snapshot
+
+from .base import SearchTestCase
+
+ROWS = [
+    ("m7", "Becosules Capsule", "becosules capsule", Decimal("45.00"), True, True),
+    ("m1", "Dolo 650 Tablet", "dolo 650 tablet", Decimal("30.905"), True, False),
+    ("m9", "Éclair Gel", "éclair gel", None, False, False),
+]
+
+
+class SnapshotTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "catalog.snap")
+        snapshot._mapped.clear()
+        self.addCleanup(snapshot._mapped.clear)
+
+    def test_round_trip(self):
+        self.assertEqual(write_snapshot(self.path, 7, iter(ROWS)), 3)
+        snap = Snapshot(self.path)
+        self.assertEqual((len(snap), snap.version), (3, 7))
+        self.assertEqual(list(snap.ids), ["m7", "m1", "m9"])
+        self.assertEqual(list(snap.names), [row[1] for row in ROWS])
+        self.assertEqual(list(snap.keys), [row[2] for row in ROWS])
+        # cents, rounded half up
+        self.assertEqual([snap.price(i) for i in range(3)], [Decimal("45"), Decimal("30.91"), None])
+        self.assertEqual([snap.available(i) for i in range(3)], [True, True, False])
+        self.assertEqual([snap.is_discontinued(i) for i in range(3)], [True, False, False])
+
+    def test_empty(self):
+        write_snapshot(self.path, 1, [])
+        snap = Snapshot(self.path)
+        self.assertEqual((len(snap), list(snap.ids)), (0, []))
+
+    def test_string_column(self):
+        write_snapshot(self.path, 1, ROWS)
+        keys = Snapshot(self.path).keys
+        self.assertIsInstance(keys, StringColumn)
+        self.assertEqual(keys[-1], "éclair gel")
+        self.assertEqual(keys[1:], ["dolo 650 tablet", "éclair gel"])
+        with self.assertRaises(IndexError):
+            keys[3]
+
+    def test_not_a_snapshot(self):
+        with open(self.path, "wb") as f:
+            f.write(b"x" * snapshot.HEADER.size)
+        with self.assertRaises(ValueError):
+            Snapshot(self.path)
+        with override_settings(SEARCH_SNAPSHOT_PATH=self.path), self.assertLogs("search.snapshot", "WARNING"):
+            self.assertIsNone(load_snapshot(1))
+
+    def test_load_snapshot(self):
+        self.assertIsNone(load_snapshot(1))
+        with override_settings(SEARCH_SNAPSHOT_PATH=self.path):
+            self.assertIsNone(load_snapshot(1))
+            write_snapshot(self.path, 2, ROWS)
+            snap = load_snapshot(2)
+            self.assertEqual(len(snap), 3)
+            # mapped once per file
+            self.assertIs(load_snapshot(2), snap)
+            with self.assertLogs("search.snapshot", "INFO"):
+                self.assertIsNone(load_snapshot(3))
+            # a new file replaces the mapping
+            write_snapshot(self.path, 3, ROWS[:1])
+            self.assertEqual(len(load_snapshot(3)), 1)
+
+
+class SnapshotExportTests(SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "catalog.snap")
+        self.addCleanup(snapshot._mapped.clear)
+
+    def test_command_needs_a_path(self):
+        with override_settings(SEARCH_SNAPSHOT_PATH=None), self.assertRaises(CommandError):
+            call_command("export_snapshot", path=None, stdout=StringIO())
+
+    def test_prefix_index_uses_the_snapshot(self):
+        call_command("export_snapshot", path=self.path, stdout=StringIO())
+        version = read_catalog_version()
+        snap = Snapshot(self.path)
+        self.assertEqual(list(snap.keys), sorted(snap.keys))
+        self.assertEqual(snap.ids[0], "m5")
+
+        expected = self.ids("search/prefix", q="d")
+        with override_settings(SEARCH_SNAPSHOT_PATH=self.path, SEARCH_ENGINES={"prefix": "memory"}), \
+                patch("search.engines.get_catalog_version", return_value=version):
+            prefix_index.refresh()
+            self.assertEqual(self.ids("search/prefix", q="d"), expected)
+            self.assertIsInstance(prefix_index.snapshot[0], StringColumn)
@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from search.spelling import SpellIndex, deletes, did_you_mean, edit_distance, spelling_enabled
+
+from .base import SearchTestCase
+
+# as SpellingTerm.objects.order_by('-frequency', 'term') returns them
+VOCABULARY = ["tablet", "paracetamol", "dolo", "crocin", "dole", "dolonex"]
+
+
+class EditDistanceTests(SimpleTestCase):
+    def test_deletes(self):
+        self.assertEqual(deletes("abc", 1), {"abc", "bc", "ac", "ab"})
+        self.assertEqual(deletes("aa", 2), {"aa", "a", ""})
+        self.assertEqual(deletes("abc", 0), {"abc"})
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("tablet", "tablet", 2), 0)
+        self.assertEqual(edit_distance("tablte", "tablet", 2), 1)
+        self.assertEqual(edit_distance("paracetmol", "paracetamol", 2), 1)
+        self.assertEqual(edit_distance("kitten", "sitting", 3), 3)
+
+    def test_bounded(self):
+        self.assertEqual(edit_distance("kitten", "sitting", 2), 3)
+        self.assertEqual(edit_distance("a", "abcd", 2), 3)
+
+
+class SpellIndexTests(SimpleTestCase):
+    def setUp(self):
+        patcher = patch("search.engines.get_catalog_version", return_value=1)
+        self.addCleanup(patcher.stop)
+        patcher.start()
+        with patch("search.spelling.SpellingTerm") as terms:
+            terms.objects.order_by().values_list().iterator.return_value = iter(VOCABULARY)
+            self.index = SpellIndex()
+            self.index.build(1)
+
+    def test_load(self):
+        self.assertEqual(len(self.index), 6)
+        vocabulary = self.index.snapshot
+        self.assertEqual(vocabulary.sorted_terms, sorted(VOCABULARY))
+        self.assertEqual(vocabulary.deletes["tablet"], [0])
+        self.assertEqual(sorted(vocabulary.deletes["dol"]), [2, 4])
+        self.assertEqual(vocabulary.deletes["dolne"], [5])
+
+    def test_is_known(self):
+        self.assertTrue(self.index.is_known("dolo"))
+        self.assertTrue(self.index.is_known("dolon"))
+        self.assertFalse(self.index.is_known("dolx"))
+        self.assertFalse(self.index.is_known("zzz"))
+
+    def test_lookup(self):
+        self.assertEqual(self.index.lookup("paracetmol"), "paracetamol")
+        self.assertEqual(self.index.lookup("tablte"), "tablet")
+        # a short word gets one edit only
+        self.assertEqual(self.index.lookup("crocn"), "crocin")
+        self.assertIsNone(self.index.lookup("crcn"))
+        # equally close: the more frequent term
+        self.assertEqual(self.index.lookup("dolr"), "dolo")
+
+    def test_correct(self):
+        self.assertEqual(self.index.correct("Paracetmol 650 tab"), "paracetamol 650 tab")
+        self.assertEqual(self.index.correct("dolonx DT"), "dolonex DT")
+        # known words, words still being typed, short and unknown words stay
+        self.assertEqual(self.index.correct("Dolo dolon xyzzyq"), "Dolo dolon xyzzyq")
+
+    def test_did_you_mean(self):
+        with patch("search.spelling.spell_index", self.index):
+            self.assertEqual(did_you_mean("paracetmol"), "paracetamol")
+            self.assertIsNone(did_you_mean("Paracetamol"))
+            with override_settings(SEARCH_SPELLING={"DID_YOU_MEAN": False}):
+                self.assertIsNone(did_you_mean("paracetmol"))
+
+    def test_spelling_enabled(self):
+        with override_settings(SEARCH_ENGINES={}):
+            self.assertFalse(spelling_enabled())
+        with override_settings(SEARCH_ENGINES={"fuzzy": "symspell"}):
+            self.assertTrue(spelling_enabled())
+        with override_settings(SEARCH_ENGINES={"unified": "fused"}):
+            self.assertTrue(spelling_enabled())
+            with override_settings(SEARCH_SPELLING={"DID_YOU_MEAN": False}):
+                self.assertFalse(spelling_enabled())
+
+
+class SpellingViewTests(SearchTestCase):
+    @override_settings(SEARCH_ENGINES={"fuzzy": "symspell"})
+    def test_symspell_fuzzy_engine(self):
+        self.assertEqual(self.ids("search/fussy", q="dolonx")[0], "m3")
+        # corrected to a composition word: the full-text path finds it
+        self.assertEqual(set(self.ids("search/fussy", q="Paracetmol")), {"m1", "m2", "m6", "m8"})
+        self.assertEqual(self.ids("search/fussy", q="xyzzyq"), [])
+
+    @override_settings(SEARCH_ENGINES={"unified": "fused"})
+    def test_did_you_mean_header(self):
+        response = self.get("unified/", q="becosuls")
+        self.assertEqual(response["X-Did-You-Mean"], "becosules")
+        self.assertEqual(response.json()[0]["id"], "m7")
+        self.assertNotIn("X-Did-You-Mean", self.get("unified/", q="becosules"))
+
+    @override_settings(SEARCH_ENGINES={"unified": "fused"})
+    def test_html_suggestion(self):
+        response = self.client.get("/api/", {"q": "becosuls"})
+        self.assertContains(response, 'Did you mean <a href="?q=becosules">becosules</a>?')
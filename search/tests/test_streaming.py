@@ -0,0 +1,47 @@
+import json
+
+from django.test import override_settings
+
+from search.models import Medicine
+from search.streaming import CONTENT_TYPE, ndjson_chunks
+
+from .base import SearchTestCase
+
+
+class StreamingTests(SearchTestCase):
+    def stream(self, path, **params):
+        response = self.get(path, **params)
+        self.assertEqual(response["Content-Type"], CONTENT_TYPE)
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    @override_settings(SEARCH_STREAM_CHUNK_SIZE=3)
+    def test_chunks(self):
+        chunks = list(ndjson_chunks(Medicine.objects.order_by("pk"), ["id"]))
+        self.assertEqual(chunks, [b'{"id":"m1"}\n{"id":"m2"}\n{"id":"m3"}\n',
+                                  b'{"id":"m4"}\n{"id":"m5"}\n{"id":"m6"}\n',
+                                  b'{"id":"m7"}\n{"id":"m8"}\n'])
+
+    @override_settings(SEARCH_STREAM_CHUNK_SIZE=1)
+    def test_search_stream_matches_the_json_response(self):
+        for path, q in (("search/prefix", "d"), ("search/substring", "tab"), ("search/fulltext", "tablet")):
+            with self.subTest(path=path):
+                self.assertEqual(self.stream(path, q=q, stream=1), self.get(path, q=q).json())
+
+    def test_limit_and_fields(self):
+        self.assertEqual(self.stream("search/prefix", q="d", stream=1, limit=1, fields="id,price"),
+                         [{"id": "m1", "price": "30.91"}])
+
+    def test_empty_query(self):
+        response = self.client.get("/api/search/prefix", {"q": " ", "stream": "1"})
+        self.assertEqual((response.status_code, response.content), (200, b""))
+
+    def test_export(self):
+        response = self.get("search/export", fields="id")
+        self.assertIn("X-Catalog-Version", response)
+        self.assertTrue(response["Content-Disposition"].startswith('attachment; filename="medicines-v'))
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(rows, [{"id": f"m{i}"} for i in range(1, 9)])
+
+    def test_filtered_export(self):
+        rows = self.stream("search/export", fields="id", manufacturer="Pfizer Ltd")
+        self.assertEqual(rows, [{"id": "m3"}, {"id": "m7"}])
@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from search.trigram_index import TrigramIndex, similarity, trigrams
+
+from .base import SearchTestCase
+
+NAMES = [
+    ("m1", "Dolo 650 Tablet"),
+    ("m2", "Crocin Advance Tablet"),
+    ("m3", "Dolonex DT Tablet"),
+    ("m4", "Paracetamol 500mg Tablet"),
+    ("m5", "Paracip 500 Tablet"),
+]
+
+
+class TrigramTests(SimpleTestCase):
+    def test_trigrams_like_show_trgm(self):
+        self.assertEqual(trigrams("Dolo"), {"  d", " do", "dol", "olo", "lo "})
+        # words are padded separately; punctuation splits words
+        self.assertEqual(trigrams("a-b"), {"  a", " a ", "  b", " b "})
+        self.assertEqual(trigrams("--"), set())
+
+    def test_similarity_like_pg_trgm(self):
+        self.assertEqual(similarity("word", "word"), 1.0)
+        self.assertEqual(similarity("word", "WORD"), 1.0)
+        # SELECT similarity('word', 'two words') -> 0.36363637
+        self.assertAlmostEqual(similarity("word", "two words"), 4 / 11)
+        self.assertEqual(similarity("abc", "xyz"), 0.0)
+        self.assertEqual(similarity("", "word"), 0.0)
+
+
+class TrigramIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = TrigramIndex()
+        with patch("search.trigram_index.Medicine") as medicine:
+            medicine.objects.values_list.return_value.iterator.return_value = NAMES
+            self.index._data = (self.index.load(), 1)
+        patcher = patch("search.engines.get_catalog_version", return_value=1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fuzzy_matches_similarity(self):
+        for q in ("dolo", "paracetmol", "tablet"):
+            with self.subTest(q=q):
+                expected = sorted(
+                    ((pk, name) for pk, name in NAMES if similarity(name, q) >= 0.3),
+                    key=lambda row: (-similarity(row[1], q), row[1]))
+                self.assertEqual(self.index.fuzzy(q, 10, 0.3), [pk for pk, _ in expected])
+
+    def test_fuzzy_threshold_and_limit(self):
+        self.assertEqual(self.index.fuzzy("paracetmol", 10, 0.99), [])
+        self.assertEqual(len(self.index.fuzzy("tablet", 2, 0.0)), 2)
+
+    def test_substring_is_case_insensitive_containment(self):
+        self.assertEqual(set(self.index.substring("LONEX", 10)), {"m3"})
+        self.assertEqual(set(self.index.substring("par", 10)), {"m4", "m5"})
+        self.assertEqual(self.index.substring("tablet x", 10), [])
+
+    def test_substring_without_inner_trigram_scans(self):
+        # "0 t" has no inner trigram within a word, so every name is checked
+        self.assertEqual(set(self.index.substring("0 t", 10)), {"m1", "m5"})
+
+
+class TrigramSearchViewTests(SearchTestCase):
+    def test_memory_and_database_engines_agree(self):
+        for path, q, extra in (("search/substring", "tab", {}), ("search/substring", "olo", {}),
+                               ("search/fussy", "dolo tablet", {"threshold": 0.3})):
+            with self.subTest(path=path, q=q):
+                mode = "substring" if "substring" in path else "fuzzy"
+                with override_settings(SEARCH_ENGINES={mode: "memory"}):
+                    memory = self.ids(path, q=q, **extra)
+                with override_settings(SEARCH_ENGINES={mode: "database"}):
+                    database = self.ids(path, q=q, **extra)
+                self.assertEqual(memory, database)
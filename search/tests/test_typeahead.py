@@ -0,0 +1,92 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from search.typeahead import CandidateSet, TypeaheadCache, narrow, typeahead_cache
+
+from .base import SearchTestCase
+
+KEYS = ("dolo 650 tablet", "dolonex dt tablet", "dolopar tablet", "domstal tablet")
+
+
+def candidates(keys=KEYS, bound=None):
+    return CandidateSet(keys, tuple((key,) for key in keys), bound)
+
+
+class NarrowTests(SimpleTestCase):
+    def test_complete_set(self):
+        rows, narrowed = narrow(candidates(), "dolo", 10)
+        self.assertEqual(rows, [("dolo 650 tablet",), ("dolonex dt tablet",), ("dolopar tablet",)])
+        self.assertEqual(narrowed.keys, KEYS[:3])
+        self.assertIsNone(narrowed.bound)
+
+    def test_bound_past_the_prefix(self):
+        # the cap cut the fetch at "domstal", after every "dolo" name
+        rows, narrowed = narrow(candidates(bound="domstal tablet"), "dolo", 10)
+        self.assertEqual(len(rows), 3)
+        self.assertIsNone(narrowed.bound)
+
+    def test_enough_matches_before_the_bound(self):
+        rows, narrowed = narrow(candidates(KEYS[:3], bound="dolopar tablet"), "dolo", 2)
+        self.assertEqual(rows, [("dolo 650 tablet",), ("dolonex dt tablet",)])
+        self.assertEqual(narrowed.bound, "dolopar tablet")
+
+    def test_too_few_matches_before_the_bound(self):
+        self.assertIsNone(narrow(candidates(KEYS[:3], bound="dolopar tablet"), "dolo", 5))
+
+
+class TypeaheadCacheTests(SimpleTestCase):
+    def setUp(self):
+        patcher = patch("search.typeahead.get_catalog_version", return_value=1)
+        self.addCleanup(patcher.stop)
+        patcher.start()
+        patcher = patch("search.typeahead.fetch", side_effect=lambda prefix, cap, filters=None: candidates(
+            tuple(key for key in KEYS if key.startswith(prefix))))
+        self.addCleanup(patcher.stop)
+        self.fetch = patcher.start()
+
+    def test_narrows_cached_candidates(self):
+        cache = TypeaheadCache()
+        self.assertEqual(len(cache.search("d", 10)), 4)
+        self.assertEqual(cache.search("dolo", 10), list(candidates().rows[:3]))
+        self.assertEqual(cache.search("dolon", 10), [("dolonex dt tablet",)])
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertEqual(cache.stats(), {"entries": 3, "outcomes": {"fetched": 1, "narrowed": 2}})
+
+    def test_filters_and_versions_do_not_share(self):
+        cache = TypeaheadCache()
+        cache.search("d", 10)
+        cache.search("do", 10, {"in_stock": True})
+        with patch("search.typeahead.get_catalog_version", return_value=2):
+            cache.search("do", 10)
+        self.assertEqual(self.fetch.call_count, 3)
+
+    @override_settings(SEARCH_TYPEAHEAD={"MAX_ENTRIES": 1})
+    def test_lru(self):
+        cache = TypeaheadCache()
+        cache.search("a", 10)
+        cache.search("d", 10)
+        cache.search("a", 10)
+        self.assertEqual(self.fetch.call_count, 3)
+        cache.clear()
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+class TypeaheadViewTests(SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        typeahead_cache.clear()
+
+    def test_same_results_as_prefix_search(self):
+        for q in ("D", "Do", "Dol", "Dolo", "Dolon", "Dolonx", "c"):
+            with self.subTest(q=q):
+                self.assertEqual(self.get("search/typeahead", q=q).json(), self.get("search/prefix", q=q).json())
+
+    @override_settings(SEARCH_TYPEAHEAD={"CANDIDATES": 1})
+    def test_capped_candidates_go_back_to_the_database(self):
+        self.assertEqual(self.ids("search/typeahead", q="d", limit=1), ["m1"])
+        self.assertEqual(self.ids("search/typeahead", q="dolon", limit=1), ["m3"])
+        self.assertEqual(typeahead_cache.stats()["outcomes"].get("fetched"), 2)
+
+    def test_filters(self):
+        self.assertEqual(self.ids("search/typeahead", q="c", in_stock=1), ["m2"])
@@ -0,0 +1,136 @@
+# search/trigram_index.py
+import heapq
+import re
+from array import array
+from collections import Counter, namedtuple
+
+from .engines import CatalogIndex
+from .models import Medicine
+
+try:  # optional: vectorised posting-list counting
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# pg_trgm splits on anything that is not alphanumeric
+_WORD_RE = re.compile(r'[^\W_]+')
+
+_Snapshot = namedtuple('_Snapshot', 'ids names keys sizes postings')
+
+
+def trigrams(text):
+    """Set of trigrams for `text`, as pg_trgm's show_trgm() builds it (lowercased, words padded '  w ')."""
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a, b):
+    """pg_trgm similarity(): shared trigrams / trigrams in either string."""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    shared = len(ta & tb)
+    return shared / (len(ta) + len(tb) - shared)
+
+
+class TrigramIndex(CatalogIndex):
+    """
+    In-process trigram -> posting-list index over Medicine.name.
+
+    Documents are numbered 0..N-1; each posting list is an `array('I')` of document
+    numbers. Fuzzy search counts shared trigrams per document across the query's
+    posting lists; substring search intersects the lists of the query's inner
+    trigrams and verifies the survivors with a plain `in` check.
+    """
+    empty = _Snapshot((), (), (), array('H'), {})
+
+    def __len__(self):
+        return len(self._data[0].ids)
+
+    def load(self):
+        ids, names, keys = [], [], []
+        sizes = array('H')
+        postings = {}
+        rows = Medicine.objects.values_list('id', 'name').iterator(chunk_size=5000)
+        for doc, (pk, name) in enumerate(rows):
+            grams = trigrams(name)
+            ids.append(pk)
+            names.append(name)
+            keys.append(name.lower())
+            sizes.append(min(len(grams), 0xFFFF))
+            for gram in grams:
+                plist = postings.get(gram)
+                if plist is None:
+                    plist = postings[gram] = array('I')
+                plist.append(doc)
+        return _Snapshot(tuple(ids), tuple(names), tuple(keys), sizes, postings)
+
+    def _shared_counts(self, snap, grams):
+        """{doc: number of `grams` it contains} for every doc sharing at least one trigram."""
+        lists = [snap.postings[g] for g in grams if g in snap.postings]
+        if not lists:
+            return {}
+        if np is not None:
+            counts = np.bincount(np.concatenate([np.frombuffer(p, dtype=np.uintc) for p in lists]))
+            docs = np.flatnonzero(counts)
+            return dict(zip(docs.tolist(), counts[docs].tolist()))
+        counter = Counter()
+        for plist in lists:
+            counter.update(plist)
+        return counter
+
+    def _top(self, snap, scored, limit):
+        # same order as the ORM path: similarity desc, then name
+        best = heapq.nsmallest(limit, scored, key=lambda ds: (-ds[1], snap.names[ds[0]], ds[0]))
+        return [snap.ids[doc] for doc, _ in best]
+
+    def fuzzy(self, q, limit, threshold):
+        """Ids of names with similarity(name, q) >= threshold, best first."""
+        snap = self.snapshot
+        grams = trigrams(q)
+        if not grams:
+            return []
+        nq = len(grams)
+        scored = []
+        for doc, shared in self._shared_counts(snap, grams).items():
+            sim = shared / (nq + snap.sizes[doc] - shared)
+            if sim >= threshold:
+                scored.append((doc, sim))
+        return self._top(snap, scored, limit)
+
+    def substring(self, q, limit):
+        """Ids of names containing q (case-insensitive), ordered by similarity then name."""
+        snap = self.snapshot
+        needle = q.lower()
+        # every inner trigram of a query fragment also occurs in any name containing the query
+        inner = {frag[i:i + 3]
+                 for frag in _WORD_RE.findall(needle)
+                 for i in range(len(frag) - 2)}
+        if inner:
+            if any(g not in snap.postings for g in inner):
+                return []
+            lists = sorted((snap.postings[g] for g in inner), key=len)
+            candidates = set(lists[0])
+            for plist in lists[1:]:
+                candidates.intersection_update(plist)
+                if not candidates:
+                    return []
+        else:
+            candidates = range(len(snap.ids))
+        matches = [doc for doc in candidates if needle in snap.keys[doc]]
+        if not matches:
+            return []
+        grams = trigrams(q)
+        nq = len(grams)
+        shared = self._shared_counts(snap, grams) if grams else {}
+        scored = []
+        for doc in matches:
+            c = shared.get(doc, 0)
+            scored.append((doc, c / (nq + snap.sizes[doc] - c) if nq else 0.0))
+        return self._top(snap, scored, limit)
+
+
+trigram_index = TrigramIndex()
@@ -0,0 +1,135 @@
+# search/typeahead.py
+"""
+Incremental prefix search for search-as-you-type.
+
+A keystroke sequence "p", "pa", "par", ... asks for nested result sets: every
+name starting with "para" also starts with "par". The first keystroke fetches
+up to CANDIDATES rows for its prefix, sorted by lower(name) in byte order,
+and keeps them in a process-wide LRU. Later keystrokes walk back from the
+query to the longest cached prefix and narrow that set with two binary
+searches. That takes microseconds and needs no database round trip.
+
+A candidate set knows its coverage: either it holds every match of its
+prefix, or it holds every match up to `bound`, its last key, because the
+fetch hit the cap. Narrowing to a longer prefix is exact when the set is
+complete, when `bound` already sorts past every key of the new prefix, or
+when at least `limit` matches were found (they are the first ones in order).
+Otherwise the query goes back to the database. The cache is shared by
+every session in the worker, so users typing the same prefixes help each
+other, and keys carry the catalog version.
+"""
+import json
+import threading
+from bisect import bisect_left
+from collections import Counter, OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db.models.functions import Collate, Lower
+
+from .catalog import get_catalog_version
+from .facets import filter_q
+from .models import Medicine
+from .serializers import MEDICINE_FIELDS
+
+DEFAULTS = {
+    "CANDIDATES": 200,
+    "MAX_ENTRIES": 2000,
+}
+
+# sorts after every real character, so `prefix + _HIGH` bounds all keys starting with prefix
+_HIGH = '\U0010ffff'
+
+# keys: lower(name) per row; rows: MEDICINE_FIELDS tuples; bound: None when complete
+CandidateSet = namedtuple('CandidateSet', 'keys rows bound')
+
+
+def typeahead_settings():
+    return {**DEFAULTS, **getattr(settings, "SEARCH_TYPEAHEAD", {})}
+
+
+def narrow(candidates, prefix, limit):
+    """
+    (rows, narrowed set) for `prefix` from a set fetched for a shorter prefix,
+    or None when the set cannot answer it exactly.
+    """
+    lo = bisect_left(candidates.keys, prefix)
+    hi = bisect_left(candidates.keys, prefix + _HIGH, lo)
+    if candidates.bound is None or candidates.bound >= prefix + _HIGH:
+        bound = None
+    elif hi - lo >= limit:
+        bound = candidates.bound
+    else:
+        return None
+    narrowed = CandidateSet(candidates.keys[lo:hi], candidates.rows[lo:hi], bound)
+    return list(narrowed.rows[:limit]), narrowed
+
+
+def fetch(prefix, cap, filters=None):
+    """CandidateSet with the first `cap` matches of `prefix`, in byte order of lower(name)."""
+    rows = list(Medicine.objects
+                .annotate(lower_name=Lower('name'))
+                .filter(lower_name__startswith=prefix)
+                .filter(filter_q(filters))
+                # byte order, so Python's bisect agrees with the database sort
+                .order_by(Collate('lower_name', 'C'), 'id')
+                .values_list('lower_name', *MEDICINE_FIELDS)[:cap])
+    keys = tuple(r[0] for r in rows)
+    bound = keys[-1] if len(rows) == cap else None
+    return CandidateSet(keys, tuple(r[1:] for r in rows), bound)
+
+
+class TypeaheadCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sets = OrderedDict()
+        self.outcomes = Counter()
+
+    def _key(self, version, filters, prefix):
+        return (version, json.dumps(filters, sort_keys=True) if filters else '', prefix)
+
+    def _put(self, key, candidates, max_entries):
+        with self._lock:
+            self._sets[key] = candidates
+            self._sets.move_to_end(key)
+            while len(self._sets) > max_entries:
+                self._sets.popitem(last=False)
+
+    def _longest_cached(self, version, filters, prefix):
+        # the query itself, then ever shorter prefixes of it
+        with self._lock:
+            for end in range(len(prefix), 0, -1):
+                key = self._key(version, filters, prefix[:end])
+                candidates = self._sets.get(key)
+                if candidates is not None:
+                    self._sets.move_to_end(key)
+                    return candidates
+        return None
+
+    def search(self, prefix, limit, filters=None):
+        """MEDICINE_FIELDS tuples of the first `limit` names starting with `prefix` (lowercased)."""
+        conf = typeahead_settings()
+        version = get_catalog_version()
+        candidates = self._longest_cached(version, filters, prefix)
+        if candidates is not None:
+            found = narrow(candidates, prefix, limit)
+            if found is not None:
+                rows, narrowed = found
+                if len(narrowed.keys) != len(candidates.keys):
+                    self._put(self._key(version, filters, prefix), narrowed, conf["MAX_ENTRIES"])
+                self.outcomes['narrowed'] += 1
+                return rows
+        candidates = fetch(prefix, max(limit, conf["CANDIDATES"]), filters)
+        self._put(self._key(version, filters, prefix), candidates, conf["MAX_ENTRIES"])
+        self.outcomes['fetched'] += 1
+        return list(candidates.rows[:limit])
+
+    def clear(self, **kwargs):
+        # catalog_updated receiver
+        with self._lock:
+            self._sets.clear()
+
+    def stats(self):
+        return {"entries": len(self._sets), "outcomes": dict(self.outcomes)}
+
+
+typeahead_cache = TypeaheadCache()
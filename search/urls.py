@@ -1,12 +1,34 @@
 # search/urls.py
 from django.urls import path
-from .views import PrefixSearchView, SubstringSearchView, FullTextSearchView, FuzzySearchView,search_view,UnifiedSearchView
+from . import async_views
+from .metrics import metrics_view
+from .views import (
+    PrefixSearchView, SubstringSearchView, FullTextSearchView, FuzzySearchView, search_view, UnifiedSearchView,
+    BatchSearchView, AutocompleteView, IngredientSearchView, SubstitutesView, TypeaheadView,
+    CatalogExportView, PhoneticSearchView, PrefixFullTextSearchView,
+)
 
 urlpatterns = [
     path('search/prefix', PrefixSearchView.as_view(), name='search-prefix'),
     path('search/substring', SubstringSearchView.as_view(), name='search-substring'),
     path('search/fulltext', FullTextSearchView.as_view(), name='search-fulltext'),
+    path('search/fulltext/prefix', PrefixFullTextSearchView.as_view(), name='search-fulltext-prefix'),
     path('search/fussy', FuzzySearchView.as_view(), name='search-fuzzy'),
+    path('search/phonetic', PhoneticSearchView.as_view(), name='search-phonetic'),
+    path('search/autocomplete', AutocompleteView.as_view(), name='search-autocomplete'),
+    path('search/typeahead', TypeaheadView.as_view(), name='search-typeahead'),
+    path('search/ingredient', IngredientSearchView.as_view(), name='search-ingredient'),
+    path('search/substitutes', SubstitutesView.as_view(), name='search-substitutes'),
+    path('search/batch', BatchSearchView.as_view(), name='search-batch'),
+    path('search/export', CatalogExportView.as_view(), name='search-export'),
+    path('metrics', metrics_view, name='search-metrics'),
     path("", search_view, name="search"),
      path('unified/', UnifiedSearchView.as_view(), name='search-unified'),
+
+    # async variants (serve under ASGI), backed by the psycopg 3 connection pool
+    path('async/search/prefix', async_views.async_prefix_search, name='async-search-prefix'),
+    path('async/search/substring', async_views.async_substring_search, name='async-search-substring'),
+    path('async/search/fulltext', async_views.async_fulltext_search, name='async-search-fulltext'),
+    path('async/search/fuzzy', async_views.async_fuzzy_search, name='async-search-fuzzy'),
+    path('async/unified/', async_views.async_unified_search, name='async-search-unified'),
 ]
@@ -1,4 +1,6 @@
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.decorators import method_decorator
 
 # Create your views here.
 # search/views.py
@@ -7,135 +9,447 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.db.models.functions import Lower
 from django.db.models import F,Q
-from django.db.models import F, Q, Case, When, Value, FloatField
+from django.db.models import F, Q, Case, When, Value, FloatField, Exists, OuterRef
 from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.contrib.postgres.search import TrigramSimilarity
-from .models import Medicine
-from .serializers import MedicineSerializer
+from .models import Medicine, MedicineIngredient
+from .compositions import parse_query as parse_ingredient_query
+from .serializers import MEDICINE_FIELDS, parse_fields, serialize_rows
+from .streaming import CONTENT_TYPE as NDJSON, ndjson_response
+from .renderers import FastJSONRenderer
+from rest_framework.renderers import BrowsableAPIRenderer
 from django.db.models.functions import Length
+from .engines import FUSED, MEMORY, PARTITIONED, PREPARED, SYMSPELL, engine_for, hydrate_rows
+from . import partitions
+from .phonetic import phonetic_matches
+from . import prefix_fulltext
+from .prepared import prepared_search
+from .replicas import read_connection, reads_from_replica, similarity_threshold
+from .router import routed_ids, routed_search
+from .spelling import did_you_mean, spell_index, spelled_ids
+from .typeahead import typeahead_cache
+from .cache import search_cache
+from .facets import candidate_facets, facet_counts, facet_settings, filter_q, flag, parse_filters
+from .autocomplete import autocomplete_settings, lookup as lookup_completions
+from .catalog import get_catalog_version
+from . import http_cache, metrics
+from .batch import MODES as BATCH_MODES, run_batch
+from django.conf import settings
+from .prefix_index import prefix_index
+from .trigram_index import trigram_index
 
 DEFAULT_LIMIT = 20
 
-class PrefixSearchView(APIView):
+
+@method_decorator(reads_from_replica, name='dispatch')
+class SearchAPIView(APIView):
+    """
+    Shared request handling for the JSON search endpoints.
+
+    Subclasses set `mode` and implement `search(q, limit, fields, ...)` returning
+    serialized rows; results are memoized in `search_cache` per (mode, q, params,
+    catalog version). Rows are read as `values_list` tuples of only the requested
+    `fields=` columns and turned into dicts directly, skipping model instances
+    and MedicineSerializer.
+
+    Filters (search/facets.py) reach `search()` as `filters=`; with `facets=1`
+    the response becomes {"results": [...], "facets": {...}}, counted over
+    `matches()`, the mode's unsliced match query.
+
+    Reads go to a replica when SEARCH_REPLICAS lists any (search/replicas.py).
+
+    Responses carry an ETag of (catalog version, mode, q, params) and a per-mode
+    Cache-Control (search/http_cache.py); a matching If-None-Match is answered
+    with 304 before any search runs.
+
+    With `stream=1` the mode's database ranking, `ordered()`, is streamed as
+    NDJSON from a server-side cursor (search/streaming.py). This skips the cache
+    and in-memory engines, and `limit` applies only when given.
+    """
+    mode = None
+    query_param = 'q'
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get_params(self, request):
+        params = {
+            'limit': int(request.GET.get('limit', DEFAULT_LIMIT)),
+            'fields': parse_fields(request.GET.get('fields')),
+        }
+        filters = parse_filters(request.GET)
+        if filters:
+            # only when given, so unfiltered searches keep sharing cache entries with /search/batch
+            params['filters'] = filters
+        return params
+
     def get(self, request):
-        q = request.GET.get('q', '').strip()
-        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+        q = request.GET.get(self.query_param, '').strip()
+        if flag(request.GET.get('stream', '')):
+            return self.stream(request, q)
         if not q:
             return Response([], status=status.HTTP_200_OK)
-        # Use lower(name) functional match to use the btree index
-        lower_q = q.lower()
-        qs = (Medicine.objects
-              .annotate(lower_name=Lower('name'))
-              .filter(lower_name__startswith=lower_q)
-              .order_by('lower_name')[:limit])
-        return Response(MedicineSerializer(qs, many=True).data)
-
-class SubstringSearchView(APIView):
-    def get(self, request):
-        q = request.GET.get('q', '').strip()
-        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+        metrics.set_mode(self.mode)
+        params = self.get_params(request)
+        with_facets = flag(request.GET.get('facets', ''))
+        etag, not_modified = http_cache.conditional(request, self.mode, q, {
+            **params, 'facets': with_facets, 'format': request.accepted_renderer.format})
+        if not_modified is not None:
+            return not_modified
+        data = search_cache.get_or_set(self.mode, q, params, lambda: self.search(q, **params))
+        metrics.add_rows(len(data))
+        if with_facets:
+            facets = search_cache.get_or_set(f'{self.mode}-facets', q, params,
+                                             lambda: self.facets(q, **params))
+            return http_cache.add_headers(Response({'results': data, 'facets': facets}), self.mode, etag)
+        return http_cache.add_headers(Response(data), self.mode, etag)
+
+    def stream(self, request, q):
         if not q:
-            return Response([], status=status.HTTP_200_OK)
+            return HttpResponse(b'', content_type=NDJSON)
+        # its own mode label: the timing covers the first chunk only, not the whole body
+        metrics.set_mode(f'{self.mode}-stream')
+        params = self.get_params(request)
+        fields = params.pop('fields')
+        limit = params.pop('limit')
+        qs = self.ordered(q, **params)
+        if 'limit' in request.GET:
+            qs = qs[:limit]
+        return ndjson_response(qs, fields, self.columns(fields), threshold=params.get('threshold'))
+
+    def search(self, q, limit, fields, filters=None):
+        raise NotImplementedError
+
+    def matches(self, q, filters=None):
+        """Unsliced Medicine queryset of everything this mode matches, filters applied."""
+        raise NotImplementedError
+
+    def ordered(self, q, filters=None):
+        """`matches()` in the mode's database ranking order, unsliced."""
+        raise NotImplementedError
+
+    def columns(self, fields):
+        # values_list() columns of `ordered()` rows for the `fields=` names
+        return fields
+
+    def facets(self, q, limit, fields, filters=None, **extra):
+        return facet_counts(self.matches(q, filters=filters, **extra))
+
+    def rows(self, qs, fields):
+        # qs is ordered and sliced; fetch only the projected columns
+        return serialize_rows(list(qs.values_list(*fields)), fields)
+
+    def rows_for_ids(self, ids, fields):
+        return serialize_rows(hydrate_rows(ids, fields), fields)
+
+
+class PrefixSearchView(SearchAPIView):
+    mode = 'prefix'
+
+    def search(self, q, limit, fields, filters=None):
+        if engine_for('prefix') == MEMORY and not filters:
+            # sorted in-process index: two binary searches, then fetch only `limit` rows by pk
+            return self.rows_for_ids(prefix_index.search(q.lower(), limit), fields)
+        if engine_for('prefix') == PARTITIONED and not filters:
+            # one partition and its (much smaller) lower_name btree
+            return self.rows_for_ids(partitions.prefix_ids(q, limit), fields)
+        if engine_for('prefix') == PREPARED and not filters:
+            return prepared_search('prefix', q, limit, fields)
+        return self.rows(self.ordered(q, filters)[:limit], fields)
+
+    def matches(self, q, filters=None):
+        # Use lower(name) functional match to use the btree index
+        return (Medicine.objects
+                .annotate(lower_name=Lower('name'))
+                .filter(lower_name__startswith=q.lower())
+                .filter(filter_q(filters)))
+
+    def ordered(self, q, filters=None):
+        return self.matches(q, filters).order_by('lower_name')
+
+class AutocompleteView(PrefixSearchView):
+    """
+    Typeahead over the precomputed `search_completion` table: one pk lookup per
+    keystroke for prefixes up to SEARCH_AUTOCOMPLETE['MAX_PREFIX'] characters.
+    Longer prefixes, larger limits, extra fields or a stale/missing table fall
+    back to the prefix search (ordered by name rather than by score).
+    """
+    mode = 'autocomplete'
+    STORED_FIELDS = ['id', 'name']
+
+    def get_params(self, request):
+        raw = request.GET.get('fields')
+        return {
+            'limit': int(request.GET.get('limit', 10)),
+            'fields': parse_fields(raw) if raw else list(self.STORED_FIELDS),
+        }
+
+    def search(self, q, limit, fields, filters=None):
+        conf = autocomplete_settings()
+        key = q.lower()
+        if (not filters and len(key) <= conf['MAX_PREFIX'] and limit <= conf['TOP_K']
+                and set(fields) <= set(self.STORED_FIELDS)):
+            entries = lookup_completions(key, get_catalog_version())
+            if entries is not None:
+                at = [self.STORED_FIELDS.index(f) for f in fields]
+                return serialize_rows([[e[i] for i in at] for e in entries[:limit]], fields)
+        return super().search(q, limit, fields, filters)
+
+class TypeaheadView(PrefixSearchView):
+    """
+    Prefix search for search-as-you-type: each keystroke that extends an earlier
+    prefix is answered by narrowing that prefix's cached candidates in memory
+    (search/typeahead.py). Same results and order as the prefix search.
+    """
+    mode = 'typeahead'
+
+    def search(self, q, limit, fields, filters=None):
+        rows = typeahead_cache.search(q.lower(), limit, filters)
+        if fields != MEDICINE_FIELDS:
+            at = [MEDICINE_FIELDS.index(f) for f in fields]
+            rows = [[row[i] for i in at] for row in rows]
+        return serialize_rows(rows, fields)
+
+class SubstringSearchView(SearchAPIView):
+    mode = 'substring'
+
+    def search(self, q, limit, fields, filters=None):
+        if engine_for('substring') == MEMORY and not filters:
+            return self.rows_for_ids(trigram_index.substring(q, limit), fields)
+        if engine_for('substring') == PARTITIONED and not filters:
+            return self.rows_for_ids(partitions.substring_ids(q, limit), fields)
+        if engine_for('substring') == PREPARED and not filters:
+            return prepared_search('substring', q, limit, fields)
+        return self.rows(self.ordered(q, filters)[:limit], fields)
+
+    def matches(self, q, filters=None):
+        return Medicine.objects.filter(name__icontains=q).filter(filter_q(filters))
+
+    def ordered(self, q, filters=None):
         # ILIKE '%q%' + order by trigram similarity
-        qs = (Medicine.objects
-              .annotate(sim=TrigramSimilarity('name', q))
-              .filter(name__icontains=q)
-              .order_by('-sim', 'name')[:limit])
-        return Response(MedicineSerializer(qs, many=True).data)
+        return (self.matches(q, filters)
+                .annotate(sim=TrigramSimilarity('name', q))
+                .order_by('-sim', 'name'))
 
-class FullTextSearchView(APIView):
-    def get(self, request):
-        q = request.GET.get('q', '').strip()
-        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
-        if not q:
-            return Response([], status=status.HTTP_200_OK)
-        query = SearchQuery(q, config='simple')  # 'simple' avoids stemming; choose 'english' if needed
+class FullTextSearchView(SearchAPIView):
+    mode = 'fulltext'
+
+    def search(self, q, limit, fields, filters=None):
+        if engine_for('fulltext') == PARTITIONED and not filters:
+            return self.rows_for_ids(partitions.fulltext_ids(q, limit), fields)
+        if engine_for('fulltext') == PREPARED and not filters:
+            return prepared_search('fulltext', q, limit, fields)
+        return self.rows(self.ordered(q, filters)[:limit], fields)
+
+    def matches(self, q, filters=None):
         # Use the materialized tsvector column name_tsv (populated by trigger) for best performance
-        qs = (Medicine.objects
-              .annotate(rank=SearchRank(F('name_tsv'), query))
-              .filter(name_tsv__search=q)
-              .order_by('-rank')[:limit])
-        return Response(MedicineSerializer(qs, many=True).data)
+        # SearchVectorField has no __search lookup; compare with a (plainto_)tsquery.
+        # 'simple' like the trigger's vectors: the server's default config may stem or drop words
+        return Medicine.objects.filter(name_tsv=SearchQuery(q, config='simple')).filter(filter_q(filters))
 
-class FuzzySearchView(APIView):
-    def get(self, request):
-        q = request.GET.get('q', '').strip()
-        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
-        threshold = float(request.GET.get('threshold', 0.3))  # tuneable
-        if not q:
-            return Response([], status=status.HTTP_200_OK)
-        qs = (Medicine.objects
-              .annotate(sim=TrigramSimilarity('name', q))
-              .filter(sim__gte=threshold)
-              .order_by('-sim')[:limit])
-        return Response(MedicineSerializer(qs, many=True).data)
+    def ordered(self, q, filters=None):
+        query = SearchQuery(q, config='simple')  # 'simple' avoids stemming; choose 'english' if needed
+        return (self.matches(q, filters)
+                .annotate(rank=SearchRank(F('name_tsv'), query))
+                .order_by('-rank'))
+
+class PrefixFullTextSearchView(SearchAPIView):
+    """
+    Full text for search-as-you-type: the last word matches as a prefix, with
+    AND/OR/"phrase"/-exclude syntax, ranked by ts_rank_cd over a capped
+    candidate set (search/prefix_fulltext.py).
+    """
+    mode = 'fulltext_prefix'
+
+    def search(self, q, limit, fields, filters=None):
+        return self.rows_for_ids(prefix_fulltext.prefix_fulltext_ids(q, limit, filters), fields)
+
+    def matches(self, q, filters=None):
+        return prefix_fulltext.matches(q, filters)
+
+    def ordered(self, q, filters=None):
+        # streaming exports everything, so this ranks every match
+        return prefix_fulltext.ranked(self.matches(q, filters), q)
+
+class FuzzySearchView(SearchAPIView):
+    mode = 'fuzzy'
+
+    def get_params(self, request):
+        params = super().get_params(request)
+        params['threshold'] = float(request.GET.get('threshold', 0.3))  # tuneable
+        return params
+
+    def search(self, q, limit, fields, threshold, filters=None):
+        if engine_for('fuzzy') == MEMORY and not filters:
+            return self.rows_for_ids(trigram_index.fuzzy(q, limit, threshold), fields)
+        if engine_for('fuzzy') == PARTITIONED and not filters:
+            return self.rows_for_ids(partitions.fuzzy_ids(q, limit, threshold), fields)
+        if engine_for('fuzzy') == PREPARED and not filters:
+            return prepared_search('fuzzy', q, limit, fields, threshold)
+        if engine_for('fuzzy') == SYMSPELL:
+            # correct the words, then an index-backed prefix/full-text search; threshold does not apply
+            return self.rows_for_ids(spelled_ids(spell_index.correct(q), limit, filters), fields)
+        with similarity_threshold(threshold):
+            return self.rows(self.ordered(q, filters, threshold)[:limit], fields)
+
+    def facets(self, q, limit, fields, threshold, filters=None):
+        if engine_for('fuzzy') == SYMSPELL:
+            # what the engine returns, not every name over the threshold
+            ids = spelled_ids(spell_index.correct(q), facet_settings()["MAX_CANDIDATES"], filters)
+            return candidate_facets(ids)
+        with similarity_threshold(threshold):
+            return super().facets(q, limit, fields, filters=filters, threshold=threshold)
+
+    def matches(self, q, filters=None, threshold=0.3):
+        # `%` can use the trigram GIN index, a filter on similarity() cannot; evaluate the queryset
+        # inside similarity_threshold(threshold) so `%` matches at `threshold`, not the default 0.3
+        return (Medicine.objects
+                .filter(name__trigram_similar=q)
+                .annotate(sim=TrigramSimilarity('name', q))
+                .filter(sim__gte=threshold)
+                .filter(filter_q(filters)))
+
+    def ordered(self, q, filters=None, threshold=0.3):
+        return self.matches(q, filters, threshold).order_by('-sim')
     
 
+class PhoneticSearchView(SearchAPIView):
+    """
+    Names that sound like the query, e.g. `q=ziloric` finds Zyloric. Candidates
+    come from an exact lookup of the words' phonetic keys (search/phonetic.py),
+    so trigram similarity only ranks them and needs no threshold.
+    """
+    mode = 'phonetic'
+
+    def search(self, q, limit, fields, filters=None):
+        return self.rows(self.ordered(q, filters)[:limit], fields)
+
+    def matches(self, q, filters=None):
+        return phonetic_matches(q).filter(filter_q(filters))
+
+    def ordered(self, q, filters=None):
+        return (self.matches(q, filters)
+                .annotate(sim=TrigramSimilarity('name', q))
+                .order_by('-sim', 'name'))
+
+
+@reads_from_replica
 def search_view(request):
     query = request.GET.get("q", "").strip()
     
     results = []
+    suggestion = None
 
+    etag = None
     if query:
-        search_query = SearchQuery(query, config='simple')
-        
-        # 1. Annotate: Calculate all necessary scores first.
-        qs = Medicine.objects.annotate(
-            trigram_sim=TrigramSimilarity('name', query), 
-            rank=SearchRank(F('name_tsv'), search_query),
-            relevance_boost=Case(
-                When(name__iexact=query, then=Value(1.0)), 
-                When(name__istartswith=query, then=Value(0.9)),
-                default=Value(0.0),
-                output_field=FloatField()
-            )
+        metrics.set_mode('html')
+        # the page echoes the query as typed, so it is part of the validator
+        etag, not_modified = http_cache.conditional(request, 'html', query, {'limit': 20, 'q': query})
+        if not_modified is not None:
+            return not_modified
+        results = search_cache.get_or_set('html', query, {'limit': 20}, lambda: _html_results(query))
+        metrics.add_rows(len(results))
+        if engine_for('unified') == FUSED:
+            suggestion = did_you_mean(query)
+
+    response = render(request, "search.html", {
+        "results": results,
+        "query": query,
+        "suggestion": suggestion,
+    })
+    return http_cache.add_headers(response, 'html', etag)
+
+def _html_results(query):
+    if engine_for('unified') == FUSED:
+        return routed_search(query, 20, threshold=0.15)
+    search_query = SearchQuery(query, config='simple')
+    
+    # 1. Annotate: Calculate all necessary scores first.
+    qs = Medicine.objects.annotate(
+        trigram_sim=TrigramSimilarity('name', query), 
+        rank=SearchRank(F('name_tsv'), search_query),
+        relevance_boost=Case(
+            When(name__iexact=query, then=Value(1.0)), 
+            When(name__istartswith=query, then=Value(0.9)),
+            default=Value(0.0),
+            output_field=FloatField()
         )
+    )
+    
+    # 2. Build the Comprehensive Filter (Single .filter() call with OR logic)
+    # This ensures we include results if they satisfy ANY of the following:
+    
+    combined_filter = (
+        # A) Full-Text Search Match
+        Q(name_tsv=search_query) | 
         
-        # 2. Build the Comprehensive Filter (Single .filter() call with OR logic)
-        # This ensures we include results if they satisfy ANY of the following:
+        # B) Substring/Prefix Match (covers "Ava" in "Avastin")
+        Q(name__icontains=query) | 
         
-        combined_filter = (
-            # A) Full-Text Search Match
-            Q(name_tsv=search_query) | 
-            
-            # B) Substring/Prefix Match (covers "Ava" in "Avastin")
-            Q(name__icontains=query) | 
-            
-            # C) Fuzzy Match (Covers "Avastn" using the annotated similarity score)
-            Q(trigram_sim__gte=0.15)  # <-- Use a low threshold (0.1) for max typo tolerance
-        )
-        
-        # 3. Apply Filter and Ordering
-        results = qs.filter(
-            combined_filter
-        ).order_by(
+        # C) Fuzzy Match (Covers "Avastn" using the annotated similarity score)
+        Q(trigram_sim__gte=0.15)  # <-- Use a low threshold (0.1) for max typo tolerance
+    )
+    
+    # 3. Apply Filter and Ordering
+    results = qs.filter(
+        combined_filter
+    ).order_by(
+        '-relevance_boost', 
+        Length('name'),
+        '-rank', 
+        '-trigram_sim', 
+        'name' 
+    )[:20]
+    
+    return list(results)
+
+class UnifiedSearchView(SearchAPIView):
+    mode = 'unified'
+
+    def get(self, request):
+        response = super().get(request)
+        if response.status_code == status.HTTP_200_OK and engine_for('unified') == FUSED:
+            # the "did you mean" query whose hits lead the results (search/router.py)
+            corrected = did_you_mean(request.GET.get(self.query_param, '').strip())
+            if corrected is not None:
+                response['X-Did-You-Mean'] = corrected
+        return response
+
+    def search(self, q, limit, fields, filters=None):
+        if engine_for('unified') == FUSED:
+            # bounded top-K queries on the indexes the query shape needs, merged with reciprocal rank fusion
+            return self.rows_for_ids(routed_ids(q, limit, threshold=0.2, filters=filters), fields)
+
+        # --- Response ---
+        return self.rows(self.ordered(q, filters)[:limit], fields)
+
+    def ordered(self, q, filters=None):
+        return self.matches(q, filters).order_by(
+            # Final ordering logic:
+            # 1. Exact/Prefix matches get priority
             '-relevance_boost', 
-            Length('name'),
+            # 2. Results are ordered by FTS Rank
             '-rank', 
+            # 3. Then by Trigram Similarity (fuzzy score)
             '-trigram_sim', 
+            # 4. Fallback to alphabetical order
             'name' 
-        )[:20]
-        
-    return render(request, "search.html", {
-        "results": results,
-        "query": query,
-    })
+        )
 
-class UnifiedSearchView(APIView):
-    def get(self, request):
-        q = request.GET.get('q', '').strip()
-        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
-        
-        if not q:
-            # Return an empty list if the query is empty
-            return Response([], status=status.HTTP_200_OK)
+    def facets(self, q, limit, fields, filters=None):
+        if engine_for('unified') == FUSED:
+            # the router's ranked ids, not the OR'ed scan below, which it never runs
+            ids = routed_ids(q, facet_settings()["MAX_CANDIDATES"], threshold=0.2, filters=filters)
+            return candidate_facets(ids)
+        return super().facets(q, limit, fields, filters=filters)
+
+    def matches(self, q, filters=None):
+        # the database engine's matched set
 
         # --- Base Search Components ---
         
         # 1. Full-text Search (Requires 'name_tsv' on the model)
         # Use a more sophisticated config like 'english' if needed, but 'simple' is fast.
         search_query = SearchQuery(q, config='simple')
-        fulltext_filter = Q(name_tsv__search=search_query)
+        fulltext_filter = Q(name_tsv=search_query)
 
         # 2. Prefix Search (Case-insensitive start)
         prefix_filter = Q(name__icontains=q) # Use icontains and let ranking handle it, or istartswith for strict prefix
@@ -157,7 +471,7 @@ class UnifiedSearchView(APIView):
         # --- Annotation and Ranking ---
 
         # Annotate with PostgreSQL Trigram Similarity and Full-Text Search Rank
-        qs = Medicine.objects.annotate(
+        return Medicine.objects.annotate(
             # Calculate Trigram Similarity (for fuzzy and general relevance)
             trigram_sim=TrigramSimilarity('name', q),
             
@@ -180,17 +494,125 @@ class UnifiedSearchView(APIView):
             # AND filter: Only include results that are above a minimum fuzzy threshold 
             # (optional, but good for filtering out irrelevant trigram noise)
             trigram_sim__gt=0.2 
-        ).order_by(
-            # Final ordering logic:
-            # 1. Exact/Prefix matches get priority
-            '-relevance_boost', 
-            # 2. Results are ordered by FTS Rank
-            '-rank', 
-            # 3. Then by Trigram Similarity (fuzzy score)
-            '-trigram_sim', 
-            # 4. Fallback to alphabetical order
-            'name' 
-        )[:limit]
-        
-        # --- Response ---
-        return Response(MedicineSerializer(qs, many=True).data)
\ No newline at end of file
+        ).filter(filter_q(filters))
+
+
+class IngredientSearchView(SearchAPIView):
+    """
+    Medicines containing an ingredient, e.g. `q=Paracetamol` or `q=Paracetamol 500mg`.
+    Matches the normalized ingredient, or an alias given in parentheses in the
+    composition ("pyridoxine"), exactly or as a prefix (plus the strength when
+    given) on the ingredient btree. Each medicine is listed once, exact
+    ingredient matches first.
+    """
+    mode = 'ingredient'
+
+    def search(self, q, limit, fields, filters=None):
+        return self.rows(self.ordered(q, filters)[:limit], fields)
+
+    def ordered(self, q, filters=None):
+        ingredient, strength = parse_ingredient_query(q)
+        # one row per medicine however many of its ingredients match; exact ingredient matches first
+        exact = self.ingredient_rows(ingredient, strength).filter(medicine=OuterRef('pk'), ingredient=ingredient)
+        return (self.matches(q, filters)
+                .annotate(exact=Exists(exact))
+                .order_by('-exact', 'name', 'id'))
+
+    def ingredient_rows(self, ingredient, strength):
+        rows = MedicineIngredient.objects.filter(ingredient__startswith=ingredient)
+        if strength:
+            rows = rows.filter(strength=strength)
+        return rows
+
+    def matches(self, q, filters=None):
+        ingredient, strength = parse_ingredient_query(q)
+        if not ingredient:
+            return Medicine.objects.none()
+        medicine_ids = self.ingredient_rows(ingredient, strength).values('medicine_id')
+        return Medicine.objects.filter(pk__in=medicine_ids).filter(filter_q(filters))
+
+class SubstitutesView(SearchAPIView):
+    """
+    `?id=<medicine id>` -> other medicines with the same composition (same
+    ingredients and strengths), cheapest first, from the (composition_key, price) index.
+    """
+    mode = 'substitutes'
+    query_param = 'id'
+
+    def search(self, q, limit, fields, filters=None):
+        return self.rows(self.ordered(q, filters)[:limit], fields)
+
+    def ordered(self, q, filters=None):
+        return self.matches(q, filters).order_by(F('price').asc(nulls_last=True), 'name')
+
+    def matches(self, q, filters=None):
+        key = Medicine.objects.filter(pk=q).values_list('composition_key', flat=True).first()
+        if key is None:
+            return Medicine.objects.none()
+        return Medicine.objects.filter(composition_key=key).exclude(pk=q).filter(filter_q(filters))
+
+
+@method_decorator(reads_from_replica, name='dispatch')
+class CatalogExportView(APIView):
+    """
+    GET -> the whole catalog (or the `manufacturer=`, `min_price=`, ... filtered
+    part of it) as NDJSON in id order, streamed from a server-side cursor.
+    `fields=` picks the columns like the search endpoints.
+    """
+
+    def get(self, request):
+        metrics.set_mode('export')
+        fields = parse_fields(request.GET.get('fields'))
+        qs = Medicine.objects.filter(filter_q(parse_filters(request.GET))).order_by('pk')
+        version = get_catalog_version()
+        response = ndjson_response(qs, fields, filename=f'medicines-v{version}.ndjson')
+        response['X-Catalog-Version'] = str(version)
+        return response
+
+
+@method_decorator(reads_from_replica, name='dispatch')
+class BatchSearchView(APIView):
+    """
+    POST {"items": [{"id": "a", "mode": "prefix", "q": "parac", "limit": 10}, ...]}
+    -> {"results": {"a": [...], ...}}, ranked like the single-query endpoints.
+    """
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def post(self, request):
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list):
+            return Response({'detail': 'Expected a list of items.'}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = getattr(settings, 'SEARCH_BATCH_MAX_ITEMS', 100)
+        if len(items) > max_items:
+            return Response({'detail': f'At most {max_items} items per batch.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        normalized, results = [], {}
+        for idx, item in enumerate(items):
+            if not isinstance(item, dict):
+                return Response({'detail': f'Item {idx} is not an object.'}, status=status.HTTP_400_BAD_REQUEST)
+            item_id = str(item.get('id', idx))
+            mode = item.get('mode', 'prefix')
+            if mode not in BATCH_MODES:
+                return Response({'detail': f'Item {item_id}: unsupported mode {mode!r}.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            q = str(item.get('q', '')).strip()
+            fields = item.get('fields')
+            if isinstance(fields, list):
+                fields = ','.join(map(str, fields))
+            try:
+                params = {'limit': int(item.get('limit', DEFAULT_LIMIT)), 'fields': parse_fields(fields)}
+                if mode == 'fuzzy':
+                    params['threshold'] = float(item.get('threshold', 0.3))
+            except (TypeError, ValueError):
+                return Response({'detail': f'Item {item_id}: invalid limit or threshold.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if not q:
+                results[item_id] = []
+                continue
+            normalized.append({'id': item_id, 'mode': mode, 'q': q, 'params': params})
+
+        metrics.set_mode('batch')
+        results.update(run_batch(normalized))
+        metrics.add_rows(sum(len(rows) for rows in results.values()))
+        return Response({'results': results})